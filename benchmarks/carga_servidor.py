@@ -0,0 +1,183 @@
+"""Teste de carga da API de métricas (valdash.servidor): latência por rota (p50/p90/p99) e vazão.
+
+Sobe uma instância local em outro processo (ou usa --url de uma já em execução), envia um log
+sintético (gerador_partidas.py, semente fixa) e dispara consultas de várias conexões
+simultâneas, com keep-alive:
+
+    python benchmarks/carga_servidor.py                                  # 20 mil linhas, 16 conexões, 2000 pedidos
+    python benchmarks/carga_servidor.py --linhas 100000 --conexoes 64 --pedidos 10000
+    python benchmarks/carga_servidor.py --url http://127.0.0.1:8765
+
+Antes da carga, mede o envio a frio (vários uploads simultâneos do mesmo arquivo, que devem
+resultar em um só cálculo no servidor) e o primeiro PDF. A carga mistura resumo do dataset,
+métricas de mapa, composições, páginas de H2H e o PDF já em cache.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+PASTA_PROJETO = os.path.dirname(PASTA_BENCHMARKS)
+sys.path.insert(0, PASTA_PROJETO)
+
+from gerador_partidas import gerar_partidas  # noqa: E402
+
+# Rota -> peso na mistura de consultas
+PESOS_ROTAS = {'resumo': 30, 'mapa': 20, 'composicoes': 15, 'h2h': 30, 'pdf': 5}
+PERCENTIS = [50, 90, 99]
+
+
+class ConexaoHTTP:
+    """Cliente HTTP/1.1 mínimo sobre asyncio, com a conexão mantida entre pedidos."""
+
+    def __init__(self, host, porta):
+        self.host, self.porta = host, porta
+        self.leitor = self.escritor = None
+
+    async def abrir(self):
+        self.leitor, self.escritor = await asyncio.open_connection(self.host, self.porta)
+        return self
+
+    async def pedir(self, metodo, caminho, corpo=b''):
+        """Retorna (status, bytes da resposta)."""
+        self.escritor.write(f"{metodo} {caminho} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(corpo)}\r\n\r\n".encode('latin-1') + corpo)
+        await self.escritor.drain()
+        status = int((await self.leitor.readline()).split()[1])
+        cabecalhos = {}
+        while (linha := await self.leitor.readline()) not in (b'\r\n', b''):
+            nome, _, valor = linha.decode('latin-1').partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        return status, await self.leitor.readexactly(int(cabecalhos.get('content-length', 0)))
+
+    async def fechar(self):
+        self.escritor.close()
+        await self.escritor.wait_closed()
+
+
+def iniciar_servidor_local(processos):
+    """Sobe `python -m valdash.servidor` em uma porta livre. Retorna (processo, url)."""
+    comando = [sys.executable, "-m", "valdash.servidor", "--porta", "0", "--silencioso"]
+    if processos:
+        comando += ["--processos", str(processos)]
+    processo = subprocess.Popen(comando, cwd=PASTA_PROJETO, stdout=subprocess.PIPE, text=True)
+    linha = processo.stdout.readline()
+    if not linha.startswith("Servindo em "):
+        processo.kill()
+        raise RuntimeError(f"o servidor não iniciou: {linha!r}")
+    return processo, linha.split()[-1]
+
+async def medir(conexao, metodo, caminho, corpo=b''):
+    inicio = time.perf_counter()
+    status, dados = await conexao.pedir(metodo, caminho, corpo)
+    return (time.perf_counter() - inicio) * 1000, status, dados
+
+def _caminho_aleatorio(rota, id_dataset, mapas, sorteio):
+    base = f"/datasets/{id_dataset}"
+    mapa = quote(sorteio.choice(mapas))
+    if rota == 'resumo':
+        return base
+    if rota == 'mapa':
+        return f"{base}/mapas/{mapa}"
+    if rota == 'composicoes':
+        return f"{base}/composicoes?mapa={mapa}&min_partidas={sorteio.choice([1, 5, 20])}"
+    if rota == 'h2h':
+        ordem = sorteio.choice(['score', 'win_rate', 'partidas'])
+        return f"{base}/h2h?mapa={mapa}&ordenar_por={ordem}&pagina={sorteio.randint(1, 5)}&min_partidas={sorteio.choice([1, 3])}"
+    return f"{base}/relatorio.pdf"
+
+async def executar_carga(host, porta, id_dataset, mapas, conexoes, pedidos, semente):
+    """Dispara `pedidos` consultas divididas entre `conexoes` conexões. Retorna ([(rota, ms, status)], segundos)."""
+    sorteio = random.Random(semente)
+    rotas = sorteio.choices(list(PESOS_ROTAS), weights=list(PESOS_ROTAS.values()), k=pedidos)
+    fila = iter((rota, _caminho_aleatorio(rota, id_dataset, mapas, sorteio)) for rota in rotas)
+    medicoes = []
+
+    async def trabalhador():
+        conexao = await ConexaoHTTP(host, porta).abrir()
+        try:
+            for rota, caminho in fila:
+                ms, status, _ = await medir(conexao, "GET", caminho)
+                medicoes.append((rota, ms, status))
+        finally:
+            await conexao.fechar()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(conexoes)))
+    return medicoes, time.perf_counter() - inicio
+
+def formatar_latencias(rotulo, tempos_ms, erros=0):
+    percentis = np.percentile(tempos_ms, PERCENTIS)
+    return (f"  {rotulo:<14} {len(tempos_ms):>6} pedidos  {erros:>4} erros  "
+            + "  ".join(f"p{p} {valor:8.2f} ms" for p, valor in zip(PERCENTIS, percentis))
+            + f"  máx {max(tempos_ms):8.2f} ms")
+
+async def principal(args, url):
+    partes = urlsplit(url)
+    host, porta = partes.hostname, partes.port
+    conteudo = gerar_partidas(args.linhas, semente=args.semente).to_csv(index=False).encode('utf-8')
+    print(f"Servidor {url} | {args.linhas} linhas ({len(conteudo) / 1024 / 1024:.1f} MB) | "
+          f"{args.conexoes} conexões | {args.pedidos} pedidos")
+
+    # Envio a frio: uploads simultâneos do mesmo arquivo
+    envios = [await ConexaoHTTP(host, porta).abrir() for _ in range(args.uploads_simultaneos)]
+    resultados = await asyncio.gather(*(medir(conexao, "POST", "/datasets?nome=carga.csv", conteudo) for conexao in envios))
+    for conexao in envios:
+        await conexao.fechar()
+    falhas = [status for _, status, _ in resultados if status != 200]
+    if falhas:
+        raise RuntimeError(f"upload falhou: {falhas} {resultados[0][2][:300]!r}")
+    resumo = json.loads(resultados[0][2])
+    id_dataset, mapas = resumo['dataset'], list(resumo['mapas'])
+
+    conexao = await ConexaoHTTP(host, porta).abrir()
+    ms_pdf, status_pdf, pdf = await medir(conexao, "GET", f"/datasets/{id_dataset}/relatorio.pdf")
+    _, _, saude = await medir(conexao, "GET", "/saude")
+    await conexao.fechar()
+    cache = json.loads(saude)['cache']
+    print("\nA frio:")
+    print(formatar_latencias("upload", [ms for ms, _, _ in resultados]))
+    print(f"  {'pdf':<14} {ms_pdf:.0f} ms (status {status_pdf}, {len(pdf) / 1024:.0f} KB)")
+    print(f"  cache: {cache['faltas']} falta(s), {cache['esperas']} espera(s) pelo cálculo de outro pedido")
+
+    medicoes, segundos = await executar_carga(host, porta, id_dataset, mapas, args.conexoes, args.pedidos, args.semente)
+    print(f"\nCarga: {len(medicoes)} pedidos em {segundos:.2f}s ({len(medicoes) / segundos:.0f} pedidos/s)")
+    for rota in PESOS_ROTAS:
+        da_rota = [(ms, status) for nome, ms, status in medicoes if nome == rota]
+        if da_rota:
+            print(formatar_latencias(rota, [ms for ms, _ in da_rota], sum(status != 200 for _, status in da_rota)))
+    print(formatar_latencias("todas", [ms for _, ms, _ in medicoes], sum(status != 200 for _, _, status in medicoes)))
+    return 1 if any(status != 200 for _, _, status in medicoes) else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="instância já em execução (padrão: sobe uma local)")
+    parser.add_argument("--processos", type=int, default=None, help="processos de trabalho da instância local")
+    parser.add_argument("--linhas", type=int, default=20_000, help="linhas do log sintético (padrão: 20000)")
+    parser.add_argument("--conexoes", type=int, default=16, help="conexões simultâneas (padrão: 16)")
+    parser.add_argument("--pedidos", type=int, default=2000, help="consultas na fase de carga (padrão: 2000)")
+    parser.add_argument("--uploads-simultaneos", type=int, default=4, help="uploads simultâneos do mesmo arquivo a frio (padrão: 4)")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    processo = None
+    url = args.url
+    if url is None:
+        processo, url = iniciar_servidor_local(args.processos)
+    try:
+        return asyncio.run(principal(args, url))
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""Suíte de benchmarks do pipeline: tempo e pico de memória por etapa, com baseline e alerta de regressão.
+
+Para cada tamanho, gera um log sintético (gerador_partidas.py, semente fixa) em CSV na memória
+e mede cada etapa: leitura do CSV, processar_dados, calcular_metricas (global), dashboard com
+as métricas de cada mapa, sinergia de agentes, intervalos de confiança
+(Wilson e bootstrap de todos os confrontos), tabela H2H do PDF, relatório PDF completo, índice por data (e uma
+consulta de período com taxas móveis), cubo de filtros (e uma consulta filtrada) e leitura em blocos.
+
+    python benchmarks/executar_benchmarks.py                         # 1k, 100k e 1M linhas
+    python benchmarks/executar_benchmarks.py --tamanhos 1000 100000 --salvar-baseline
+    python benchmarks/executar_benchmarks.py --tamanhos 1000 100000 --comparar
+
+O tempo é medido sem tracemalloc (que deixa as alocações mais lentas); o pico de memória vem
+de uma segunda execução da etapa com tracemalloc ligado. Com --comparar, uma etapa é regressão
+se ficar acima da baseline pela tolerância relativa e por uma margem mínima absoluta (para não
+acusar ruído em etapas de milissegundos); nesse caso o script sai com código 1.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(PASTA_BENCHMARKS))
+
+from gerador_partidas import gerar_partidas  # noqa: E402
+from valdash.leitura import contar_csv_em_blocos  # noqa: E402
+from valdash.cubo import CuboPartidas  # noqa: E402
+from valdash.intervalos import intervalo_bootstrap, intervalo_wilson  # noqa: E402
+from valdash.metricas import calcular_metricas, metricas_de_contagens, montar_dashboard  # noqa: E402
+from valdash.periodos import IndiceTemporal  # noqa: E402
+from valdash.processamento import processar_dados  # noqa: E402
+from valdash.sinergia import sinergia_agentes  # noqa: E402
+
+TAMANHOS_PADRAO = [1_000, 100_000, 1_000_000]
+BASELINE_PADRAO = os.path.join(PASTA_BENCHMARKS, "resultados", "baseline.json")
+# Margens mínimas para considerar regressão, além da tolerância relativa
+MARGEM_TEMPO_S = 0.05
+MARGEM_MEMORIA_MB = 2.0
+
+
+def _etapa_ler_csv(contexto):
+    contexto['df_original'] = pd.read_csv(io.BytesIO(contexto['csv']))
+
+def _etapa_processar_dados(contexto):
+    contexto['df_processado'] = processar_dados(contexto['df_original'].copy())
+
+def _etapa_calcular_metricas(contexto):
+    contexto['metricas_globais'] = calcular_metricas(contexto['df_processado'])
+
+def _etapa_metricas_por_mapa(contexto):
+    contexto['dashboard'] = montar_dashboard(contexto['df_processado'])
+
+def _etapa_sinergia_agentes(contexto):
+    # Matrizes agente x agente dos dois lados: global e de cada mapa
+    _, metricas_globais, metricas_detalhadas_por_mapa, _ = contexto['dashboard']
+    for metricas in [metricas_globais, *metricas_detalhadas_por_mapa.values()]:
+        for lado in ('Nossa', 'Adversária'):
+            sinergia_agentes(metricas['composicao_stats'], lado)
+
+def _etapa_intervalos_confianca(contexto):
+    # Wilson e bootstrap sobre todos os confrontos H2H de todos os mapas (milhares de grupos) de uma vez
+    _, _, metricas_detalhadas_por_mapa, _ = contexto['dashboard']
+    h2h = pd.concat([metricas['h2h_stats'] for metricas in metricas_detalhadas_por_mapa.values()], ignore_index=True)
+    intervalo_wilson(h2h['total_vitorias_nossa_comp'], h2h['total_partidas_disputadas'])
+    intervalo_bootstrap(h2h['total_vitorias_nossa_comp'], h2h['total_partidas_disputadas'])
+
+def _etapa_tabela_h2h(contexto):
+    from valdash.relatorio_pdf import create_h2h_table_reportlab
+    contexto['tabela_h2h'] = create_h2h_table_reportlab(contexto['metricas_globais']['h2h_stats'])
+
+def _etapa_relatorio_pdf(contexto):
+    from valdash.relatorio_pdf import gerar_relatorio_pdf
+    mapas_unicos, metricas_globais, metricas_detalhadas_por_mapa, df_map_ranking = contexto['dashboard']
+    contexto['pdf'] = gerar_relatorio_pdf(metricas_globais, df_map_ranking, metricas_detalhadas_por_mapa, mapas_unicos)
+
+def _etapa_indice_temporal(contexto):
+    contexto['indice_temporal'] = IndiceTemporal(contexto['df_processado'])
+
+def _etapa_consulta_periodo(contexto):
+    # Um intervalo de 90 dias e as taxas móveis de 30 dias de todos os mapas, como na aba de período
+    indice = contexto['indice_temporal']
+    indice.metricas_periodo(indice.ultimo - pd.Timedelta(days=90), indice.ultimo)
+    indice.taxas_moveis('win_rate_geral_partidas_nosso_time', 30)
+
+def _etapa_montar_cubo(contexto):
+    contexto['cubo'] = CuboPartidas(contexto['df_processado'])
+
+def _etapa_consulta_cubo(contexto):
+    # Filtro por dois adversários e lado CT vencido, agrupado por mapa, como na aba de filtros
+    cubo = contexto['cubo']
+    filtros = {'time_adversario': cubo.valores('time_adversario')[:2], 'nosso_time_venceu_lado_ct': [True]}
+    metricas_de_contagens(cubo.contagens(filtros))
+
+def _etapa_leitura_em_blocos(contexto):
+    contexto['contagens_blocos'] = contar_csv_em_blocos(io.BytesIO(contexto['csv']))
+
+# Em ordem: cada etapa usa o que as anteriores deixaram no contexto
+ETAPAS = {
+    'ler_csv': _etapa_ler_csv,
+    'processar_dados': _etapa_processar_dados,
+    'calcular_metricas': _etapa_calcular_metricas,
+    'metricas_por_mapa': _etapa_metricas_por_mapa,
+    'sinergia_agentes': _etapa_sinergia_agentes,
+    'intervalos_confianca': _etapa_intervalos_confianca,
+    'tabela_h2h_pdf': _etapa_tabela_h2h,
+    'relatorio_pdf': _etapa_relatorio_pdf,
+    'indice_temporal': _etapa_indice_temporal,
+    'consulta_periodo': _etapa_consulta_periodo,
+    'montar_cubo': _etapa_montar_cubo,
+    'consulta_cubo': _etapa_consulta_cubo,
+    'leitura_em_blocos': _etapa_leitura_em_blocos,
+}
+
+def medir_etapa(funcao, contexto, repeticoes=1):
+    """Executa a etapa e retorna (menor tempo em segundos, pico de memória em MB)."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(contexto)
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    try:
+        funcao(contexto)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(tempos), pico / 1024 / 1024
+
+def executar(tamanhos, etapas, parametros_gerador, repeticoes=1, ao_medir=None):
+    """Mede as etapas para cada tamanho. Retorna {'<linhas>:<etapa>': {'linhas', 'etapa', 'tempo_s', 'pico_mb'}}."""
+    resultados = {}
+    for linhas in tamanhos:
+        contexto = {'csv': gerar_partidas(linhas, **parametros_gerador).to_csv(index=False).encode()}
+        for nome, funcao in ETAPAS.items():
+            if nome not in etapas:
+                continue
+            tempo_s, pico_mb = medir_etapa(funcao, contexto, repeticoes)
+            resultados[f"{linhas}:{nome}"] = {'linhas': linhas, 'etapa': nome, 'tempo_s': round(tempo_s, 4), 'pico_mb': round(pico_mb, 2)}
+            if ao_medir:
+                ao_medir(resultados[f"{linhas}:{nome}"])
+    return resultados
+
+def comparar_com_baseline(resultados, baseline, tolerancia_tempo, tolerancia_memoria):
+    """Lista de (chave, descrição) das etapas que regrediram em relação à baseline."""
+    regressoes = []
+    for chave, atual in resultados.items():
+        anterior = baseline.get(chave)
+        if anterior is None:
+            continue
+        if atual['tempo_s'] > anterior['tempo_s'] * (1 + tolerancia_tempo) and atual['tempo_s'] - anterior['tempo_s'] > MARGEM_TEMPO_S:
+            regressoes.append((chave, f"tempo {anterior['tempo_s']:.3f}s -> {atual['tempo_s']:.3f}s"))
+        if atual['pico_mb'] > anterior['pico_mb'] * (1 + tolerancia_memoria) and atual['pico_mb'] - anterior['pico_mb'] > MARGEM_MEMORIA_MB:
+            regressoes.append((chave, f"memória {anterior['pico_mb']:.1f}MB -> {atual['pico_mb']:.1f}MB"))
+    return regressoes
+
+def _formatar_medicao(medicao, baseline=None):
+    texto = f"{medicao['linhas']:>9} linhas  {medicao['etapa']:<19} {medicao['tempo_s'] * 1000:10.1f} ms  {medicao['pico_mb']:8.1f} MB"
+    anterior = (baseline or {}).get(f"{medicao['linhas']}:{medicao['etapa']}")
+    if anterior:
+        texto += f"   (baseline {anterior['tempo_s'] * 1000:.1f} ms, {anterior['pico_mb']:.1f} MB)"
+    return texto
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede tempo e pico de memória de cada etapa do pipeline.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO)
+    parser.add_argument("--etapas", nargs="+", choices=list(ETAPAS), default=list(ETAPAS))
+    parser.add_argument("--repeticoes", type=int, default=1, help="execuções cronometradas por etapa (vale a menor)")
+    parser.add_argument("--mapas", type=int, default=7)
+    parser.add_argument("--composicoes", type=int, default=40)
+    parser.add_argument("--adversarios", type=int, default=12)
+    parser.add_argument("--taxa-invalidos", type=float, default=0.02)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--salvar-baseline", nargs="?", const=BASELINE_PADRAO, default=None, metavar="ARQUIVO")
+    parser.add_argument("--comparar", nargs="?", const=BASELINE_PADRAO, default=None, metavar="ARQUIVO")
+    parser.add_argument("--tolerancia-tempo", type=float, default=0.25, help="aumento relativo aceito no tempo (padrão 25%%)")
+    parser.add_argument("--tolerancia-memoria", type=float, default=0.10, help="aumento relativo aceito no pico de memória (padrão 10%%)")
+    args = parser.parse_args(argv)
+
+    parametros_gerador = {'mapas': args.mapas, 'composicoes': args.composicoes, 'adversarios': args.adversarios,
+                          'taxa_invalidos': args.taxa_invalidos, 'semente': args.semente}
+    baseline = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            dados_baseline = json.load(arquivo)
+        if dados_baseline['gerador'] != parametros_gerador:
+            print(f"Aviso: baseline gerada com outros parâmetros ({dados_baseline['gerador']})", file=sys.stderr)
+        baseline = dados_baseline['resultados']
+
+    resultados = executar(args.tamanhos, args.etapas, parametros_gerador, args.repeticoes,
+                          ao_medir=lambda medicao: print(_formatar_medicao(medicao, baseline), flush=True))
+
+    if args.salvar_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.salvar_baseline)), exist_ok=True)
+        with open(args.salvar_baseline, "w", encoding="utf-8") as arquivo:
+            json.dump({'gerador': parametros_gerador, 'python': platform.python_version(), 'pandas': pd.__version__,
+                       'maquina': platform.node(), 'resultados': resultados}, arquivo, indent=2, ensure_ascii=False)
+        print(f"Baseline salva em {args.salvar_baseline}")
+
+    if baseline is not None:
+        regressoes = comparar_com_baseline(resultados, baseline, args.tolerancia_tempo, args.tolerancia_memoria)
+        for chave, descricao in regressoes:
+            print(f"REGRESSÃO {chave}: {descricao}")
+        if regressoes:
+            return 1
+        print("Sem regressões em relação à baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
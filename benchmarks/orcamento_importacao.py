@@ -0,0 +1,69 @@
+"""Orçamento de tempo de importação dos pontos de entrada.
+
+Cada entrada é importada em um processo Python novo (várias vezes, vale o menor tempo).
+O script falha (código 1) se alguma passar do orçamento ou carregar um módulo proibido,
+por exemplo o Streamlit no núcleo ou o ReportLab antes de um PDF ser pedido.
+
+    python benchmarks/orcamento_importacao.py [--repeticoes 5]
+
+Os orçamentos têm folga para máquinas mais lentas; ao mudar imports, rode o script e
+ajuste aqui se a mudança for intencional.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (rótulo, código importado, orçamento em segundos, módulos que não podem ser carregados)
+ORCAMENTOS = [
+    ("import valdash", "import valdash", 0.05, ["pandas", "reportlab", "streamlit"]),
+    ("CLI (processo principal)", "import valdash.cli", 0.15, ["pandas", "reportlab", "streamlit"]),
+    ("núcleo: leitura + métricas", "import valdash.leitura, valdash.metricas", 1.0, ["reportlab", "streamlit"]),
+    ("histórico", "import valdash.historico", 1.0, ["reportlab", "streamlit"]),
+    ("relatório PDF", "import valdash.relatorio_pdf", 1.2, ["streamlit"]),
+    # O ReportLab só entra nos processos de trabalho que geram o PDF
+    ("API HTTP (processo principal)", "import valdash.servidor", 1.0, ["reportlab", "streamlit"]),
+    # Sem servidor o Streamlit roda em "bare mode": o upload volta vazio e só a tela inicial é montada
+    ("interface: tela inicial", "import runpy; runpy.run_path('generate_valdash_app.py')", 1.0, ["pandas", "reportlab"]),
+]
+
+PROGRAMA_MEDICAO = """
+import json, sys, time
+sys.path.insert(0, {raiz!r})
+inicio = time.perf_counter()
+exec({codigo!r})
+segundos = time.perf_counter() - inicio
+print(json.dumps({{'segundos': segundos, 'carregados': [m for m in {proibidos!r} if m in sys.modules]}}))
+"""
+
+def medir_importacao(codigo, proibidos, repeticoes):
+    """Menor tempo de importação entre `repeticoes` processos novos e os módulos proibidos que foram carregados."""
+    programa = PROGRAMA_MEDICAO.format(raiz=RAIZ, codigo=codigo, proibidos=proibidos)
+    tempos, carregados = [], set()
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, "-c", programa], cwd=RAIZ, capture_output=True, text=True, check=True)
+        medicao = json.loads(saida.stdout.strip().splitlines()[-1])
+        tempos.append(medicao['segundos'])
+        carregados.update(medicao['carregados'])
+    return min(tempos), sorted(carregados)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Confere o tempo de importação de cada ponto de entrada contra o orçamento.")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    falhas = 0
+    for rotulo, codigo, orcamento, proibidos in ORCAMENTOS:
+        segundos, carregados = medir_importacao(codigo, proibidos, args.repeticoes)
+        ok = segundos <= orcamento and not carregados
+        falhas += not ok
+        detalhe = f" carregou {', '.join(carregados)}" if carregados else ""
+        print(f"{'ok  ' if ok else 'FALHA'} {rotulo:<28} {segundos * 1000:8.1f} ms (orçamento {orcamento * 1000:.0f} ms){detalhe}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
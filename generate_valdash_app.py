@@ -1,211 +1,15 @@
 import streamlit as st
-import pandas as pd
 import io
+import hashlib
+import os
+import time
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
 
-# Adicionar imports para ReportLab
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-
-# Funções auxiliares para processar os placares
-def extrair_scores(placar_str, nosso_time_primeiro=True):
-    """Extrai os scores de uma string 'X-Y'."""
-    try:
-        parts = str(placar_str).split('-')
-        if len(parts) == 2:
-            score1 = int(parts[0].strip())
-            score2 = int(parts[1].strip())
-            return (score1, score2) if nosso_time_primeiro else (score2, score1)
-        return None, None # Retornar None para indicar falha na extração
-    except:
-        return None, None
-
-def processar_dados(df):
-    """Processa o DataFrame para cálculos."""
-    df = df.rename(columns={
-        'Data do jogo': 'data_jogo',
-        'Hora do jogo': 'hora_jogo',
-        'Time adversario': 'time_adversario',
-        'Mapa jogado': 'mapa',
-        'Placar final do jogo': 'placar_final_str',
-        'Placar lado CT': 'placar_ct_str',
-        'Placar lado TR': 'placar_tr_str',
-        'Pistol CT': 'pistol_ct_resultado',
-        'Pistol TR': 'pistol_tr_resultado',
-        'Composicao': 'composicao_nossa',
-        'Composicao adversaria': 'composicao_adversaria'
-    })
-
-    scores_finais = df['placar_final_str'].apply(lambda x: pd.Series(extrair_scores(x)))
-    df['placar_final_nosso'] = scores_finais[0]
-    df['placar_final_adv'] = scores_finais[1]
-
-    scores_ct = df['placar_ct_str'].apply(lambda x: pd.Series(extrair_scores(x)))
-    df['placar_ct_nosso_como_ct'] = scores_ct[0]
-    df['placar_ct_adv_como_tr'] = scores_ct[1]
-
-    scores_tr = df['placar_tr_str'].apply(lambda x: pd.Series(extrair_scores(x)))
-    df['placar_tr_nosso_como_tr'] = scores_tr[0]
-    df['placar_tr_adv_como_ct'] = scores_tr[1]
-
-    df['pistol_ct_resultado'] = df['pistol_ct_resultado'].astype(str).str.lower().str.strip()
-    df['pistol_tr_resultado'] = df['pistol_tr_resultado'].astype(str).str.lower().str.strip()
-
-    def limpar_composicao(comp_str):
-        if pd.isna(comp_str) or str(comp_str).strip() == '':
-            return tuple()
-        agentes = sorted([agente.strip() for agente in str(comp_str).split(',') if agente.strip()])
-        return tuple(agentes) if agentes else tuple()
-
-    df['composicao_nossa_clean'] = df['composicao_nossa'].apply(limpar_composicao)
-    df['composicao_adversaria_clean'] = df['composicao_adversaria'].apply(limpar_composicao)
-
-    df['nosso_time_venceu_partida'] = df['placar_final_nosso'].notna() & df['placar_final_adv'].notna() & (df['placar_final_nosso'] > df['placar_final_adv'])
-    df['nosso_time_venceu_lado_ct'] = df['placar_ct_nosso_como_ct'].notna() & df['placar_ct_adv_como_tr'].notna() & (df['placar_ct_nosso_como_ct'] > df['placar_ct_adv_como_tr'])
-    df['nosso_time_venceu_lado_tr'] = df['placar_tr_nosso_como_tr'].notna() & df['placar_tr_adv_como_ct'].notna() & (df['placar_tr_nosso_como_tr'] > df['placar_tr_adv_como_ct'])
-
-    return df
-
-def get_color_category(rate):
-    if pd.isna(rate): return 'Neutra (50%)'
-    if rate > 50: return 'Positiva (>50%)'
-    elif rate < 50: return 'Negativa (<50%)'
-    else: return 'Neutra (50%)'
-
-def calcular_metricas(df_filtrado, nome_do_mapa_ou_geral="geral"):
-    if df_filtrado.empty:
-        return {
-            "nome_mapa_ou_contexto": nome_do_mapa_ou_geral,
-            "win_rate_geral_partidas_nosso_time": 0, "total_partidas_jogadas_nosso_time": 0,
-            "win_rate_ct_rounds": 0, "total_ct_rounds_jogados": 0,
-            "win_rate_tr_rounds": 0, "total_tr_rounds_jogados": 0,
-            "win_rate_pistol_ct": 0, "total_pistols_ct_disputados": 0,
-            "win_rate_pistol_tr": 0, "total_pistols_tr_disputados": 0,
-            "composicao_stats": pd.DataFrame(), "h2h_stats": pd.DataFrame(),
-            "melhor_nossa_composicao_info": {"composicao": "N/A", "win_rate_partidas": 0, "partidas_jogadas": 0, "raw_composicao": tuple()} # Ajustado
-        }
-
-    total_partidas_jogadas = len(df_filtrado)
-
-    vitorias_partida_nosso_time = df_filtrado['nosso_time_venceu_partida'].sum()
-    win_rate_geral_partidas_nosso_time = (vitorias_partida_nosso_time / total_partidas_jogadas) * 100 if total_partidas_jogadas > 0 else 0
-
-    vitorias_lado_ct_nosso_time = df_filtrado['nosso_time_venceu_lado_ct'].sum()
-    win_rate_lado_ct = (vitorias_lado_ct_nosso_time / total_partidas_jogadas) * 100 if total_partidas_jogadas > 0 else 0
-
-    vitorias_lado_tr_nosso_time = df_filtrado['nosso_time_venceu_lado_tr'].sum()
-    win_rate_lado_tr = (vitorias_lado_tr_nosso_time / total_partidas_jogadas) * 100 if total_partidas_jogadas > 0 else 0
-
-    vitorias_pistol_ct_nosso_time = (df_filtrado['pistol_ct_resultado'] == 'win').sum()
-    win_rate_pistol_ct_nosso_time = (vitorias_pistol_ct_nosso_time / total_partidas_jogadas) * 100 if total_partidas_jogadas > 0 else 0
-
-    vitorias_pistol_tr_nosso_time = (df_filtrado['pistol_tr_resultado'] == 'win').sum()
-    win_rate_pistol_tr_nosso_time = (vitorias_pistol_tr_nosso_time / total_partidas_jogadas) * 100 if total_partidas_jogadas > 0 else 0
-
-    # --- Estatísticas de Composição por Partida ---
-    comp_data_partida = []
-    for _, row in df_filtrado.iterrows():
-        nossa_comp_val = str(row['composicao_nossa_clean'])
-        adv_comp_val = str(row['composicao_adversaria_clean'])
-        nosso_time_venceu = row['nosso_time_venceu_partida']
-
-        if nossa_comp_val != '()':
-            comp_data_partida.append({
-                'composicao': nossa_comp_val,
-                'tipo': 'Nossa',
-                'partida_ganha': 1 if nosso_time_venceu else 0,
-                'partida_jogada': 1
-            })
-        if adv_comp_val != '()':
-            comp_data_partida.append({
-                'composicao': adv_comp_val,
-                'tipo': 'Adversária',
-                'partida_ganha': 1 if not nosso_time_venceu else 0, # Vitória da comp adversária
-                'partida_jogada': 1
-            })
-
-    composicao_stats_df = pd.DataFrame()
-    # Removido 'lado' de melhor_nossa_composicao_info, pois agora é por partida
-    melhor_nossa_composicao_info = {"composicao": "N/A", "win_rate_partidas": 0, "partidas_jogadas": 0, "raw_composicao": tuple()}
-
-
-    if comp_data_partida:
-        comp_df_partida = pd.DataFrame(comp_data_partida)
-        if not comp_df_partida.empty:
-            # Agrupar por composição e tipo, sem 'lado'
-            composicao_stats_df = comp_df_partida.groupby(['composicao', 'tipo']).agg(
-                total_partidas_ganhas=('partida_ganha', 'sum'),
-                total_partidas_jogadas=('partida_jogada', 'sum')
-            ).reset_index()
-            composicao_stats_df['win_rate_partidas'] = (composicao_stats_df['total_partidas_ganhas'] / composicao_stats_df['total_partidas_jogadas'] * 100).fillna(0)
-            # 'cor_win_rate' agora se baseia em 'win_rate_partidas'
-            composicao_stats_df['cor_win_rate'] = composicao_stats_df['win_rate_partidas'].apply(get_color_category)
-
-            nossas_comps_stats_df = composicao_stats_df[composicao_stats_df['tipo'] == 'Nossa'].copy()
-            if not nossas_comps_stats_df.empty:
-                # Ordenar por win_rate_partidas e depois por total_partidas_jogadas
-                nossas_comps_stats_df = nossas_comps_stats_df.sort_values(
-                    by=['win_rate_partidas', 'total_partidas_jogadas'],
-                    ascending=[False, False]
-                )
-                top_comp_row = nossas_comps_stats_df.iloc[0]
-                try:
-                    comp_tuple = eval(top_comp_row['composicao'])
-                    cleaned_comp_str = ", ".join(comp_tuple) if isinstance(comp_tuple, tuple) else top_comp_row['composicao']
-                except:
-                    cleaned_comp_str = top_comp_row['composicao']
-
-                melhor_nossa_composicao_info = {
-                    "composicao": cleaned_comp_str,
-                    "win_rate_partidas": top_comp_row['win_rate_partidas'], # Nova chave
-                    "partidas_jogadas": top_comp_row['total_partidas_jogadas'], # Nova chave
-                    "raw_composicao": top_comp_row['composicao']
-                    # "lado" foi removido
-                }
-    # Fim da Estatística de Composição por Partida
-
-    h2h_data = []
-    for _, row in df_filtrado.iterrows():
-        nossa_comp_h2h = str(row['composicao_nossa_clean'])
-        adv_comp_h2h = str(row['composicao_adversaria_clean'])
-        if nossa_comp_h2h == '()' or adv_comp_h2h == '()': continue
-        h2h_data.append({'nossa_composicao': nossa_comp_h2h, 'composicao_adversaria': adv_comp_h2h,
-                            'vitoria_nossa_comp': int(row['nosso_time_venceu_partida']), 'partidas_disputadas': 1})
-
-    h2h_stats_df = pd.DataFrame()
-    if h2h_data:
-        h2h_df = pd.DataFrame(h2h_data)
-        if not h2h_df.empty:
-            h2h_stats_df = h2h_df.groupby(['nossa_composicao', 'composicao_adversaria']).agg(
-                total_vitorias_nossa_comp=('vitoria_nossa_comp', 'sum'),
-                total_partidas_disputadas=('partidas_disputadas', 'sum')
-            ).reset_index()
-            h2h_stats_df['win_rate_vs_adv_comp'] = (h2h_stats_df['total_vitorias_nossa_comp'] / h2h_stats_df['total_partidas_disputadas'] * 100).fillna(0)
-            try:
-                h2h_stats_df['nossa_composicao'] = h2h_stats_df['nossa_composicao'].apply(lambda x: ", ".join(eval(x)) if isinstance(eval(x), tuple) else x)
-                h2h_stats_df['composicao_adversaria'] = h2h_stats_df['composicao_adversaria'].apply(lambda x: ", ".join(eval(x)) if isinstance(eval(x), tuple) else x)
-            except:
-                pass
-            h2h_stats_df = h2h_stats_df.sort_values(by=['win_rate_vs_adv_comp'], ascending=False)
-
-    return {
-        "nome_mapa_ou_contexto": nome_do_mapa_ou_geral,
-        "win_rate_geral_partidas_nosso_time": win_rate_geral_partidas_nosso_time,
-        "total_partidas_jogadas_nosso_time": total_partidas_jogadas,
-        "win_rate_ct_rounds": win_rate_lado_ct,
-        "total_ct_rounds_jogados": total_partidas_jogadas,
-        "win_rate_tr_rounds": win_rate_lado_tr,
-        "total_tr_rounds_jogados": total_partidas_jogadas,
-        "win_rate_pistol_ct": win_rate_pistol_ct_nosso_time,
-        "total_pistols_ct_disputados": total_partidas_jogadas,
-        "win_rate_pistol_tr": win_rate_pistol_tr_nosso_time,
-        "total_pistols_tr_disputados": total_partidas_jogadas,
-        "composicao_stats": composicao_stats_df, # Agora baseado em partidas
-        "h2h_stats": h2h_stats_df,
-        "melhor_nossa_composicao_info": melhor_nossa_composicao_info # Agora baseado em partidas
-    }
+# pandas e o núcleo (pacote valdash, sem Streamlit) só são importados quando um arquivo é
+# carregado, e o ReportLab só quando um PDF é pedido: a tela inicial abre sem eles.
+from valdash import EXTENSOES_SUPORTADAS
+from valdash.instrumentacao import Instrumentacao, anexar_jsonl, etapa, usar_instrumentacao
 
 
 def get_color_for_percentage_text(value):
@@ -214,7 +18,14 @@ def get_color_for_percentage_text(value):
     elif value < 50: return "red"
     else: return "orange"
 
-def exibir_metricas_card(label, value, total_label="", total_value="", is_percentage=True):
+def formatar_intervalo(intervalo):
+    """'IC 95%: 60.00–85.81%' para um par (inferior, superior); vazio sem intervalo."""
+    if intervalo is None or pd.isna(intervalo[0]):
+        return ""
+    return f"IC 95%: {intervalo[0]:.2f}–{intervalo[1]:.2f}%"
+
+def html_metricas_card(label, value, total_label="", total_value="", is_percentage=True, intervalo=None):
+    """HTML de um card de métrica (para juntar vários cards em um único st.markdown)."""
     color = get_color_for_percentage_text(value) if is_percentage else "black"
     if pd.isna(value):
         formatted_value = "N/A"
@@ -236,296 +47,658 @@ def exibir_metricas_card(label, value, total_label="", total_value="", is_percen
     if "Win Rate TR (Rounds)" in label:
         label = label.replace("(Rounds)", "(Lados Vencidos)")
     details_html = f'<span style="font-size: 0.8em; color: #777;">{details_text}</span>' if details_text else ""
-    st.markdown(f"""
-    <div style="border: 1px solid #e0e0e0; border-radius: 5px; padding: 10px; margin-bottom:10px; text-align: center;">
-        <span style="font-size: 0.9em; color: #555;">{label}</span><br>
-        <span style="font-size: 1.75em; color: {color}; font-weight: bold;">{formatted_value}</span><br>
-        {details_html}
-    </div>""", unsafe_allow_html=True)
-
-def style_win_rate_h2h(val):
-    if pd.isna(val): return 'color: grey'
-    color = 'red' if val < 50 else ('orange' if val == 50 else 'green')
-    return f'color: {color}; font-weight: bold;'
-
-# --- Funções para Geração de PDF ---
-def get_reportlab_color(value):
-    if pd.isna(value): return colors.grey
-    if value > 50: return colors.Color(0, 0.6, 0)
-    elif value < 50: return colors.red
-    else: return colors.orange
-
-def add_metric_to_story(story, styles, label, value, total_label="", total_value="", is_percentage=True, indent=0):
-    color = get_reportlab_color(value) if is_percentage else colors.black
-    if pd.isna(value):
-        formatted_value = "N/A"
-    elif is_percentage:
-        formatted_value = f"{value:.2f}%"
-    else:
-        try:
-            formatted_value = f"{int(value)}" if pd.api.types.is_number(value) else str(value)
-        except ValueError:
-            formatted_value = str(value)
-
-    label_style = ParagraphStyle('MetricLabel', parent=styles['Normal'], fontName='Helvetica-Bold', spaceBefore=6, leftIndent=indent)
-    value_style = ParagraphStyle('MetricValue', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=14,textColor=color, spaceBefore=2, leftIndent=indent)
-    details_style = ParagraphStyle('MetricDetails', parent=styles['Normal'], fontSize=8, textColor=colors.dimgrey, spaceBefore=1, leftIndent=indent)
-
-    details_text_pdf = f"{total_value} {total_label}" if total_label and total_value is not None else ""
-    if "rounds CT jogados" in total_label or "rounds TR jogados" in total_label:
-        details_text_pdf = details_text_pdf.replace("rounds", "partidas (lados)").replace("jogados", "jogadas")
-    if "pistols CT disputados" in total_label or "pistols TR disputados" in total_label:
-        details_text_pdf = details_text_pdf.replace("pistols", "partidas com pistol").replace("disputados", "disputadas")
-    label_pdf = label
-    if "Win Rate CT (Rounds)" in label:
-        label_pdf = label.replace("(Rounds)", "(Lados Vencidos)")
-    if "Win Rate TR (Rounds)" in label:
-        label_pdf = label.replace("(Rounds)", "(Lados Vencidos)")
-
-    story.append(Paragraph(label_pdf, label_style))
-    story.append(Paragraph(formatted_value, value_style))
-    if details_text_pdf:
-        story.append(Paragraph(details_text_pdf, details_style))
-    story.append(Spacer(1, 0.1*inch))
-
-def create_h2h_table_reportlab(h2h_stats_df):
-    if h2h_stats_df is None or h2h_stats_df.empty:
-        return Paragraph("Não há dados de confrontos diretos (H2H) para exibir.", getSampleStyleSheet()['Normal'])
-    df_display = h2h_stats_df.copy()
-    df_display['win_rate_vs_adv_comp_display'] = df_display['win_rate_vs_adv_comp'].apply(lambda x: f"{x:.2f}%" if not pd.isna(x) else "N/A")
-    data = [["Nossa Composição", "Composição Adversária", "Vitórias da Nossa Comp.", "Partidas Disputadas", "Win Rate vs Adv."]]
-    for _, row in df_display.iterrows():
-        data.append([
-            Paragraph(str(row['nossa_composicao']), getSampleStyleSheet()['Normal']),
-            Paragraph(str(row['composicao_adversaria']), getSampleStyleSheet()['Normal']),
-            str(row['total_vitorias_nossa_comp']),
-            str(row['total_partidas_disputadas']),
-            Paragraph(str(row['win_rate_vs_adv_comp_display']), ParagraphStyle('WR', textColor=get_reportlab_color(row['win_rate_vs_adv_comp'])))
-        ])
-    col_widths = [2*inch, 2*inch, 0.8*inch, 0.8*inch, 1*inch]
-    table = Table(data, colWidths=col_widths)
-    style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),('TOPPADDING', (0,0), (-1,0), 10),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('FONTSIZE', (0,0), (-1,-1), 8),
-        ('LEFTPADDING', (0,0), (-1,-1), 3),('RIGHTPADDING', (0,0), (-1,-1), 3),
-    ])
-    table.setStyle(style)
-    return table
-
-def gerar_relatorio_pdf(metricas_globais, df_map_ranking, metricas_detalhadas_por_mapa, mapas_unicos_ordenados):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=(8.5*inch, 11*inch), leftMargin=0.5*inch, rightMargin=0.5*inch, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    story = []
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('Title', parent=styles['h1'], fontName='Helvetica-Bold', fontSize=18, alignment=TA_CENTER, spaceAfter=0.2*inch)
-    h2_style = ParagraphStyle('Heading2', parent=styles['h2'], fontName='Helvetica-Bold', fontSize=14, spaceBefore=0.2*inch, spaceAfter=0.1*inch)
-    h3_style = ParagraphStyle('Heading3', parent=styles['h3'], fontName='Helvetica-Bold', fontSize=11, spaceBefore=0.15*inch, spaceAfter=0.05*inch)
-    normal_style = ParagraphStyle('BodyText', parent=styles['Normal'], fontSize=9) # Renomeado para evitar modificar o default
-
-    story.append(Paragraph("Relatório Analítico de Partidas 📊", title_style))
-    story.append(Paragraph("🌎 Visão Geral Global", h2_style))
-    total_partidas_globais = metricas_globais.get('total_partidas_jogadas_nosso_time', 0)
-    add_metric_to_story(story, styles, "Win Rate Lado CT", metricas_globais['win_rate_ct_rounds'], "partidas analisadas", total_partidas_globais)
-    add_metric_to_story(story, styles, "Win Rate Pistol CT", metricas_globais['win_rate_pistol_ct'], "partidas analisadas", total_partidas_globais)
-    add_metric_to_story(story, styles, "Win Rate Lado TR", metricas_globais['win_rate_tr_rounds'], "partidas analisadas", total_partidas_globais)
-    add_metric_to_story(story, styles, "Win Rate Pistol TR", metricas_globais['win_rate_pistol_tr'], "partidas analisadas", total_partidas_globais)
-
-    story.append(Spacer(1, 0.2*inch))
-    story.append(Paragraph("🏆 Ranking de Mapas", h2_style))
-    if not df_map_ranking.empty:
-        ranking_data = [["Rank", "Mapa", "Win Rate (Partidas)", "Total Partidas", "Melhor Composição Nossa"]] # Label ajustado
-        df_map_ranking_pdf = df_map_ranking.reset_index(drop=True)
-        for i, row in df_map_ranking_pdf.iterrows():
-            wr_partidas_text = f"{row['win_rate_geral_partidas_nosso_time']:.2f}%"
-            comp_info_mapa = metricas_detalhadas_por_mapa.get(row['mapa'], {}).get('melhor_nossa_composicao_info', {})
-
-            comp_str = comp_info_mapa.get('composicao', 'N/A')
-            wr_comp_partidas = comp_info_mapa.get('win_rate_partidas', 0) # Usar win_rate_partidas
-            partidas_jog_comp = comp_info_mapa.get('partidas_jogadas', 0) # Usar partidas_jogadas
-            comp_details_str = f"{comp_str} (WR Partidas: {wr_comp_partidas:.2f}%, {partidas_jog_comp} partidas)"
-
-            ranking_data.append([
-                str(i + 1),
-                Paragraph(str(row['mapa']), normal_style),
-                Paragraph(wr_partidas_text, ParagraphStyle('WR_Rank', parent=normal_style, textColor=get_reportlab_color(row['win_rate_geral_partidas_nosso_time']))),
-                str(row['total_partidas']),
-                Paragraph(comp_details_str, normal_style)
-            ])
-        map_ranking_table = Table(ranking_data, colWidths=[0.5*inch, 1.2*inch, 1.2*inch, 0.8*inch, 3.3*inch])
-        map_ranking_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.darkgrey),('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('TOPPADDING', (0,0), (-1,0), 8),('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('FONTSIZE', (0,0), (-1,-1), 7),
-        ]))
-        story.append(map_ranking_table)
+    texto_intervalo = formatar_intervalo(intervalo)
+    if texto_intervalo:
+        details_html += f'<br><span style="font-size: 0.75em; color: #777;">{texto_intervalo}</span>'
+    # Sem indentação: em um bloco com vários cards, linhas recuadas virariam bloco de código no Markdown
+    return (f'<div style="border: 1px solid #e0e0e0; border-radius: 5px; padding: 10px; margin-bottom:10px; text-align: center;">'
+            f'<span style="font-size: 0.9em; color: #555;">{label}</span><br>'
+            f'<span style="font-size: 1.75em; color: {color}; font-weight: bold;">{formatted_value}</span><br>'
+            f'{details_html}</div>')
+
+def html_grade_taxas(taxas, total_label, total_value):
+    """Cards de lados e pistols em duas colunas (CT à esquerda, TR à direita), como um só bloco HTML."""
+    intervalos = taxas.get('intervalos_taxas') or {}
+    cards = [
+        html_metricas_card(rotulo, taxas[taxa], total_label, total_value, intervalo=intervalos.get(taxa))
+        for taxa, rotulo in [('win_rate_ct_rounds', "Win Rate CT (Rounds)"), ('win_rate_tr_rounds', "Win Rate TR (Rounds)"),
+                             ('win_rate_pistol_ct', "Win Rate Pistol CT"), ('win_rate_pistol_tr', "Win Rate Pistol TR")]
+    ]
+    return f'<div style="display: grid; grid-template-columns: 1fr 1fr; column-gap: 1rem;">{"".join(cards)}</div>'
+
+# --- Tabela H2H ---
+# Os confrontos vêm de um ConfrontosH2H (ordenações prontas) e são exibidos por página; a
+# formatação vem do column_config, sem Styler (que gera o HTML de todas as células).
+TAMANHO_PAGINA_H2H = 50
+ROTULOS_ORDENACAO_H2H = {'score': "Score (IC 95% inferior)", 'win_rate': "Win rate", 'partidas': "Partidas disputadas", 'vitorias': "Vitórias"}
+COLUNAS_CONFIG_H2H = {
+    'nossa_composicao': st.column_config.TextColumn("Nossa Composição", width="large"),
+    'composicao_adversaria': st.column_config.TextColumn("Composição Adversária", width="large"),
+    'total_vitorias_nossa_comp': st.column_config.NumberColumn("Vitórias da Nossa Comp.", format="%d"),
+    'total_partidas_disputadas': st.column_config.NumberColumn("Partidas Disputadas", format="%d"),
+    'win_rate_vs_adv_comp': st.column_config.ProgressColumn("Win Rate vs Adv.", min_value=0, max_value=100, format="%.2f%%"),
+    'ic_inferior': st.column_config.NumberColumn("IC 95% (mín.)", format="%.2f%%"),
+    'ic_superior': st.column_config.NumberColumn("IC 95% (máx.)", format="%.2f%%"),
+    'score_ranking': None,
+}
+
+def exibir_tabela_h2h(chave, confrontos):
+    """Confrontos com mínimo de partidas, ordenação, filtro por nossa composição e paginação."""
+    col_min, col_ordem, col_comp, col_pagina = st.columns([0.2, 0.2, 0.4, 0.2])
+    min_partidas = int(col_min.number_input("Mínimo de partidas", min_value=1, value=1, key=f"h2h_min_{chave}"))
+    ordenar_por = col_ordem.selectbox("Ordenar por", list(ROTULOS_ORDENACAO_H2H), format_func=ROTULOS_ORDENACAO_H2H.get, key=f"h2h_ordem_{chave}")
+    nossa_composicao = col_comp.selectbox("Nossa composição", confrontos.nossas_composicoes(),
+                                          index=None, placeholder="Todas", key=f"h2h_comp_{chave}")
+    if nossa_composicao is not None:
+        selecionados = confrontos.da_composicao(nossa_composicao, min_partidas)
+        st.dataframe(selecionados, hide_index=True, width="stretch", column_config=COLUNAS_CONFIG_H2H)
+        st.caption(f"{len(selecionados)} confronto(s) de {nossa_composicao} com pelo menos {min_partidas} partida(s).")
+        return
+    total = confrontos.contar(min_partidas)
+    if total == 0:
+        st.write(f"Nenhum confronto com pelo menos {min_partidas} partida(s)."); return
+    paginas = -(-total // TAMANHO_PAGINA_H2H)
+    chave_pagina = f"h2h_pagina_{chave}"
+    # A página vive só no session_state (o widget não recebe value=); mudar o mínimo de
+    # partidas pode reduzir o número de páginas
+    st.session_state.setdefault(chave_pagina, 1)
+    if st.session_state[chave_pagina] > paginas:
+        st.session_state[chave_pagina] = paginas
+    pagina = int(col_pagina.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, key=chave_pagina))
+    st.dataframe(confrontos.pagina(pagina, TAMANHO_PAGINA_H2H, ordenar_por, min_partidas), hide_index=True, width="stretch",
+                 column_config=COLUNAS_CONFIG_H2H)
+    inicio = (pagina - 1) * TAMANHO_PAGINA_H2H
+    st.caption(f"Confrontos {inicio + 1}–{min(inicio + TAMANHO_PAGINA_H2H, total)} de {total} com pelo menos {min_partidas} partida(s).")
+
+@st.fragment
+def exibir_h2h_mapa(chave, confrontos):
+    """Tabela H2H de um mapa como fragmento: paginar ou filtrar não reexecuta a página."""
+    exibir_tabela_h2h(chave, confrontos)
+
+# --- Cache entre reruns e sessões ---
+# O Streamlit reexecuta o script inteiro a cada interação. Cada etapa abaixo fica em um
+# armazém único do processo (valdash.armazem), pela chave (tipo, hash do conteúdo do
+# arquivo): um dataset já visto não é reprocessado, nem por outra sessão que suba o mesmo
+# arquivo, e uploads simultâneos do mesmo arquivo fazem um só cálculo. O armazém é limitado
+# em memória (VALDASH_CACHE_MB, em MB) e descarta o que foi usado há mais tempo.
+# Os objetos retornados são compartilhados entre reruns e sessões e não devem ser modificados.
+LIMITE_MB_ARMAZEM = float(os.environ.get("VALDASH_CACHE_MB", "1024"))
+
+@st.cache_resource
+def armazem_datasets():
+    from valdash.armazem import ArmazemCompartilhado
+    return ArmazemCompartilhado(limite_mb=LIMITE_MB_ARMAZEM)
+
+def armazenado(chave, calcular, mensagem=None):
+    """Resultado de `calcular()` pelo armazém compartilhado, com um spinner enquanto for preciso calcular (ou esperar)."""
+    armazem = armazem_datasets()
+    if mensagem is None or chave in armazem:
+        return armazem.obter(chave, calcular)
+    with st.spinner(mensagem):
+        return armazem.obter(chave, calcular)
+
+def hash_conteudo(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()
+
+# Acima deste tamanho um CSV é lido em blocos e só as contagens ficam em memória
+LIMITE_BYTES_LEITURA_EM_BLOCOS = 50 * 1024 * 1024
+
+def carregar_dataset(hash_arquivo, conteudo, nome_arquivo):
+    """Lê e processa o arquivo. Retorna (df_processado, resumo da validação), ou (None, None) se não houver linhas."""
+    def ler():
+        df_processado = ler_partidas(io.BytesIO(conteudo), nome_arquivo)
+        if df_processado is None:
+            return None, None
+        return df_processado, resumir_validacao(df_processado)
+    # Só o hash na chave: o mesmo arquivo com outro nome (de outro técnico) aproveita o resultado
+    return armazenado(('dataset', hash_arquivo), ler, "Processando dados...")
+
+def contar_dataset_em_blocos(hash_arquivo, conteudo):
+    return armazenado(('contagens_em_blocos', hash_arquivo), lambda: contar_csv_em_blocos(io.BytesIO(conteudo)), "Processando dados em blocos...")
+
+def calcular_metricas_dataset(hash_arquivo, df_processado):
+    return armazenado(('dashboard', hash_arquivo), lambda: montar_dashboard(df_processado), "Calculando métricas...")
+
+def calcular_metricas_contagens_dataset(hash_arquivo, contagens):
+    return armazenado(('dashboard_contagens', hash_arquivo), lambda: montar_dashboard_de_contagens(contagens), "Calculando métricas...")
+
+# Histórico local: o arquivo pode ser trocado pela variável de ambiente VALDASH_HISTORICO
+CAMINHO_HISTORICO = os.environ.get("VALDASH_HISTORICO", "valdash_historico.sqlite")
+
+def ingerir_upload_no_historico(hash_arquivo, conteudo, df_processado=None):
+    """Grava o upload no histórico uma vez por sessão. Retorna (partidas novas, versão do histórico).
+
+    Sem df_processado (arquivos grandes), o CSV é gravado bloco a bloco.
+    """
+    chave_sessao = f"historico_ingerido_{hash_arquivo}"
+    with closing(abrir_historico(CAMINHO_HISTORICO)) as conexao:
+        if chave_sessao not in st.session_state:
+            with etapa("ingerir_historico"):
+                if df_processado is not None:
+                    st.session_state[chave_sessao] = ingerir_no_historico(conexao, df_processado)
+                else:
+                    st.session_state[chave_sessao] = sum(ingerir_no_historico(conexao, bloco) for bloco in ler_csv_em_blocos(io.BytesIO(conteudo)))
+        return st.session_state[chave_sessao], versao_historico(conexao)
+
+def calcular_metricas_historico(caminho_historico, versao):
+    """Métricas de todo o histórico, lidas dos agregados (não relê as partidas)."""
+    def calcular():
+        with closing(abrir_historico(caminho_historico)) as conexao:
+            contagens = contagens_do_historico(conexao)
+        return montar_dashboard_de_contagens(contagens)
+    return armazenado(('dashboard_historico', caminho_historico, versao), calcular, "Calculando métricas do histórico...")
+
+# Índice por data/hora para a aba de período: construído uma vez por dataset, depois cada
+# intervalo é respondido pelas contagens acumuladas, sem refiltrar as partidas
+def indexar_por_data(partidas):
+    with etapa("indice_temporal", linhas=len(partidas)):
+        return IndiceTemporal(partidas)
+
+def indice_temporal_dataset(chave_dataset, df_processado):
+    return armazenado(('indice_temporal', chave_dataset), lambda: indexar_por_data(df_processado), "Indexando partidas por data...")
+
+def indice_temporal_historico(caminho_historico, versao):
+    def calcular():
+        with closing(abrir_historico(caminho_historico)) as conexao:
+            return indexar_por_data(partidas_do_historico(conexao))
+    return armazenado(('indice_temporal_historico', caminho_historico, versao), calcular, "Indexando o histórico por data...")
+
+ROTULOS_TAXAS = {
+    'win_rate_geral_partidas_nosso_time': "Win Rate Geral (Partidas)",
+    'win_rate_ct_rounds': "Win Rate CT (Rounds)",
+    'win_rate_tr_rounds': "Win Rate TR (Rounds)",
+    'win_rate_pistol_ct': "Win Rate Pistol CT",
+    'win_rate_pistol_tr': "Win Rate Pistol TR",
+}
+
+def exibir_cards_taxas(taxas, total_label, total_value):
+    """Cards de win rate geral, lados e pistols para um recorte (período, filtros...), em um único st.markdown."""
+    intervalo_geral = (taxas.get('intervalos_taxas') or {}).get('win_rate_geral_partidas_nosso_time')
+    st.markdown(html_metricas_card("Win Rate Geral (Partidas)", taxas['win_rate_geral_partidas_nosso_time'], total_label, total_value, intervalo=intervalo_geral)
+                + html_grade_taxas(taxas, total_label, total_value), unsafe_allow_html=True)
+
+# Atalhos de período, contados a partir do dia da última partida
+DIAS_PERIODOS_RECENTES = {"Últimos 7 dias": 7, "Últimos 30 dias": 30, "Últimos 90 dias": 90}
+
+def intervalo_do_periodo(chave_dataset, indice):
+    """Escolha do período na aba. Retorna (inicio, fim) como Timestamps, com o fim no último instante do dia."""
+    primeiro_dia, ultimo_dia = indice.primeiro.date(), indice.ultimo.date()
+    opcao = st.radio("Período", ["Tudo", *DIAS_PERIODOS_RECENTES, "Personalizado"], horizontal=True, key=f"periodo_{chave_dataset}")
+    if opcao in DIAS_PERIODOS_RECENTES:
+        inicio_dia = max(primeiro_dia, ultimo_dia - pd.Timedelta(days=DIAS_PERIODOS_RECENTES[opcao] - 1))
+        fim_dia = ultimo_dia
+    elif opcao == "Personalizado" and primeiro_dia < ultimo_dia:
+        inicio_dia, fim_dia = st.slider(
+            "Intervalo de datas", min_value=primeiro_dia, max_value=ultimo_dia, value=(primeiro_dia, ultimo_dia),
+            format="DD/MM/YYYY", key=f"intervalo_{chave_dataset}", help="Ex.: do início de um patch até hoje.")
     else:
-        story.append(Paragraph("Não há dados suficientes para gerar o ranking de mapas.", normal_style))
-    story.append(PageBreak())
-
-    for mapa_nome in mapas_unicos_ordenados:
-        metricas_mapa = metricas_detalhadas_por_mapa.get(mapa_nome)
-        if not metricas_mapa: continue
-        story.append(Paragraph(f"🗺️ Análise do Mapa: {mapa_nome}", h2_style))
-        total_partidas_mapa = metricas_mapa.get('total_partidas_jogadas_nosso_time', 0)
-        add_metric_to_story(story, styles, f"Win Rate Geral no {mapa_nome}", metricas_mapa['win_rate_geral_partidas_nosso_time'], "partidas jogadas", total_partidas_mapa)
-        story.append(Spacer(1, 0.1*inch))
-        add_metric_to_story(story, styles, "Win Rate Lado CT", metricas_mapa['win_rate_ct_rounds'], "partidas analisadas", total_partidas_mapa, indent=0.2*inch)
-        add_metric_to_story(story, styles, "Win Rate Pistol CT", metricas_mapa['win_rate_pistol_ct'], "partidas analisadas", total_partidas_mapa, indent=0.2*inch)
-        add_metric_to_story(story, styles, "Win Rate Lado TR", metricas_mapa['win_rate_tr_rounds'], "partidas analisadas", total_partidas_mapa, indent=0.2*inch)
-        add_metric_to_story(story, styles, "Win Rate Pistol TR", metricas_mapa['win_rate_pistol_tr'], "partidas analisadas", total_partidas_mapa, indent=0.2*inch)
-
-        story.append(Spacer(1, 0.2*inch))
-        # Atualizar label para refletir que a melhor comp é por partida
-        story.append(Paragraph(f"✨ Melhor Composição no mapa {mapa_nome} (baseado em Win Rate de Partidas)", h3_style))
-        melhor_comp_info = metricas_mapa['melhor_nossa_composicao_info']
-        if melhor_comp_info['composicao'] != "N/A":
-            comp_text = f"Composição: {melhor_comp_info['composicao']}" # Lado não é mais relevante aqui
-            # Usar win_rate_partidas e partidas_jogadas
-            wr_text = f"Win Rate (Partidas): {melhor_comp_info.get('win_rate_partidas', 0):.2f}% ({melhor_comp_info.get('partidas_jogadas', 0)} partidas jogadas)"
-            story.append(Paragraph(comp_text, normal_style))
-            story.append(Paragraph(wr_text, ParagraphStyle('CompWR', parent=normal_style, textColor=get_reportlab_color(melhor_comp_info.get('win_rate_partidas', 0)))))
-        else:
-            story.append(Paragraph("Não há dados suficientes de nossas composições neste mapa.", normal_style))
-
-        story.append(Spacer(1, 0.2*inch))
-        story.append(Paragraph(f"⚔️ Confrontos: Nossa Composição vs. Composição Adversária em {mapa_nome} (Resultado da Partida)", h3_style))
-        h2h_stats_df_mapa = metricas_mapa.get('h2h_stats')
-        story.append(create_h2h_table_reportlab(h2h_stats_df_mapa))
-        if mapa_nome != mapas_unicos_ordenados[-1]: story.append(PageBreak())
-    doc.build(story)
-    buffer.seek(0)
-    return buffer.getvalue()
+        inicio_dia, fim_dia = primeiro_dia, ultimo_dia
+    return pd.Timestamp(inicio_dia), pd.Timestamp(fim_dia) + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+
+@st.fragment
+def exibir_aba_periodo(chave_dataset, indice):
+    """Métricas do período escolhido e taxas móveis. Roda como fragmento: mexer nos filtros não reexecuta a página."""
+    if indice.vazio:
+        st.info("Nenhuma partida com data válida para a análise por período."); return
+    inicio, fim = intervalo_do_periodo(chave_dataset, indice)
+    with etapa("metricas_periodo"):
+        tabela = indice.metricas_periodo(inicio, fim)
+    global_periodo = tabela.loc[NOME_GLOBAL]
+    partidas_periodo = int(global_periodo['total_partidas'])
+    st.caption(f"{partidas_periodo} partida(s) entre {inicio:%d/%m/%Y} e {fim:%d/%m/%Y}."
+               + (f" {indice.partidas_sem_data} partida(s) sem data ficam de fora." if indice.partidas_sem_data else ""))
+    if partidas_periodo == 0:
+        st.info("Nenhuma partida no período escolhido."); return
+
+    exibir_cards_taxas(global_periodo, "partidas no período", partidas_periodo)
+
+    st.subheader("🗺️ Por mapa no período")
+    por_mapa = tabela.drop(index=NOME_GLOBAL)
+    por_mapa = por_mapa[por_mapa['total_partidas'] > 0].reset_index()
+    st.dataframe(
+        por_mapa[['mapa', 'total_partidas', *ROTULOS_TAXAS]], hide_index=True, width="stretch",
+        column_config={'mapa': "Mapa", 'total_partidas': "Partidas",
+                       **{taxa: st.column_config.NumberColumn(rotulo, format="%.2f%%") for taxa, rotulo in ROTULOS_TAXAS.items()}})
+
+    st.subheader("📈 Win rate móvel")
+    col_taxa, col_janela, col_mapas = st.columns([0.3, 0.2, 0.5])
+    taxa = col_taxa.selectbox("Taxa", list(ROTULOS_TAXAS), format_func=ROTULOS_TAXAS.get, key=f"taxa_movel_{chave_dataset}")
+    janela_dias = col_janela.number_input("Janela (dias)", min_value=1, max_value=365, value=30, key=f"janela_movel_{chave_dataset}")
+    mapas = col_mapas.multiselect("Séries", [NOME_GLOBAL, *indice.por_mapa], default=[NOME_GLOBAL], key=f"mapas_movel_{chave_dataset}")
+    if mapas:
+        with etapa("taxas_moveis"):
+            taxas = indice.taxas_moveis(taxa, int(janela_dias), mapas, inicio, fim)
+        st.line_chart(taxas, y_label=f"{ROTULOS_TAXAS[taxa]} (%)")
+        st.caption(f"Cada ponto: partidas dos {int(janela_dias)} dias até aquele dia. Dias sem partidas na janela ficam em branco.")
+
+# Cubo de contagens para a aba de filtros: montado uma vez por dataset, cada combinação de
+# filtros soma as células do cubo em vez de refiltrar as partidas e recalcular as métricas
+def montar_cubo(partidas):
+    with etapa("montar_cubo", linhas=len(partidas)):
+        return CuboPartidas(partidas)
+
+def cubo_dataset(chave_dataset, df_processado):
+    return armazenado(('cubo', chave_dataset), lambda: montar_cubo(df_processado), "Montando o cubo de filtros...")
+
+def cubo_historico(caminho_historico, versao):
+    def calcular():
+        with closing(abrir_historico(caminho_historico)) as conexao:
+            return montar_cubo(partidas_do_historico(conexao, COLUNAS_PARTIDAS_HISTORICO))
+    return armazenado(('cubo_historico', caminho_historico, versao), calcular, "Montando o cubo de filtros do histórico...")
+
+ROTULOS_DIMENSOES_CUBO = {
+    'mapa': "Mapa",
+    'time_adversario': "Adversário",
+    'composicao_nossa_clean': "Nossa composição",
+    'composicao_adversaria_clean': "Composição adversária",
+    'nosso_time_venceu_lado_ct': "Lado CT",
+    'nosso_time_venceu_lado_tr': "Lado TR",
+    'pistol_ct_resultado': "Pistol CT",
+    'pistol_tr_resultado': "Pistol TR",
+}
+ROTULOS_RESULTADOS = {True: "Vencido", False: "Perdido", 'win': "Vencido", 'lose': "Perdido"}
+
+@st.fragment
+def exibir_aba_filtros(chave_dataset, cubo):
+    """Métricas do recorte escolhido nos filtros, somadas do cubo. Roda como fragmento: os filtros não reexecutam a página."""
+    filtros = {}
+    colunas_filtros = st.columns(4)
+    for i, (dimensao, rotulo) in enumerate(ROTULOS_DIMENSOES_CUBO.items()):
+        filtros[dimensao] = colunas_filtros[i % 4].multiselect(
+            rotulo, cubo.valores(dimensao), format_func=lambda valor: ROTULOS_RESULTADOS.get(valor, valor),
+            placeholder="Todos", key=f"filtro_{dimensao}_{chave_dataset}")
+    coluna_grupo = st.radio("Agrupar por", DIMENSOES_AGRUPAMENTO, format_func=ROTULOS_DIMENSOES_CUBO.get, horizontal=True, key=f"grupo_filtros_{chave_dataset}")
+
+    with etapa("consulta_cubo"):
+        metricas_filtro, metricas_por_grupo = metricas_de_contagens(cubo.contagens(filtros, coluna_grupo), "Filtro", coluna_grupo)
+    partidas_filtro = metricas_filtro['total_partidas_jogadas_nosso_time']
+    st.caption(f"{partidas_filtro} de {cubo.partidas} partida(s) no recorte.")
+    if partidas_filtro == 0:
+        st.info("Nenhuma partida com esses filtros."); return
+    exibir_cards_taxas(metricas_filtro, "partidas no recorte", partidas_filtro)
+
+    st.subheader(f"Por {ROTULOS_DIMENSOES_CUBO[coluna_grupo].lower()}")
+    tabela_grupos = pd.DataFrame([
+        {coluna_grupo: str(grupo), 'total_partidas': metricas['total_partidas_jogadas_nosso_time'], **{taxa: metricas[taxa] for taxa in ROTULOS_TAXAS}}
+        for grupo, metricas in metricas_por_grupo.items()])
+    st.dataframe(
+        tabela_grupos.sort_values('total_partidas', ascending=False), hide_index=True, width="stretch",
+        column_config={coluna_grupo: ROTULOS_DIMENSOES_CUBO[coluna_grupo], 'total_partidas': "Partidas",
+                       **{taxa: st.column_config.NumberColumn(rotulo, format="%.2f%%") for taxa, rotulo in ROTULOS_TAXAS.items()}})
+
+    melhor_comp_info = metricas_filtro['melhor_nossa_composicao_info']
+    if melhor_comp_info['composicao'] != "N/A":
+        st.markdown(f"Melhor composição nossa no recorte: **{melhor_comp_info['composicao']}** "
+                    f"({melhor_comp_info['win_rate_partidas']:.2f}% em {melhor_comp_info['partidas_jogadas']} partidas, "
+                    f"{formatar_intervalo((melhor_comp_info['ic_inferior'], melhor_comp_info['ic_superior']))})")
+    h2h_filtro = metricas_filtro['h2h_stats']
+    if not h2h_filtro.empty:
+        st.subheader("⚔️ Confrontos no recorte")
+        exibir_tabela_h2h(f"filtros_{chave_dataset}", ConfrontosH2H(h2h_filtro))
+
+# --- Ranking de composições ---
+LEGENDA_SCORE = ("Score: limite inferior do intervalo de confiança de 95% (Wilson). Uma taxa alta com poucas partidas "
+                 "tem intervalo largo e score baixo; os rankings usam o score, não a taxa.")
+COLUNAS_CONFIG_RANKING_COMPOSICOES = {
+    'composicao': st.column_config.TextColumn("Composição", width="large"),
+    'total_partidas_jogadas': st.column_config.NumberColumn("Partidas", format="%d"),
+    'total_partidas_ganhas': st.column_config.NumberColumn("Vitórias", format="%d"),
+    'win_rate_partidas': st.column_config.ProgressColumn("Win Rate", min_value=0, max_value=100, format="%.2f%%"),
+    'ic_inferior': st.column_config.NumberColumn("IC 95% Wilson (mín.)", format="%.2f%%"),
+    'ic_superior': st.column_config.NumberColumn("IC 95% Wilson (máx.)", format="%.2f%%"),
+    'ic_bootstrap_inferior': st.column_config.NumberColumn("IC 95% bootstrap (mín.)", format="%.2f%%"),
+    'ic_bootstrap_superior': st.column_config.NumberColumn("IC 95% bootstrap (máx.)", format="%.2f%%"),
+    'score_ranking': st.column_config.NumberColumn("Score", format="%.2f"),
+}
+
+def exibir_ranking_composicoes(composicao_stats_df):
+    """Nossas composições ordenadas pelo score de ranking, com os intervalos de Wilson e bootstrap."""
+    if composicao_stats_df is None or composicao_stats_df.empty:
+        st.write("Não há dados suficientes de nossas composições."); return
+    nossas = composicao_stats_df[composicao_stats_df['tipo'] == 'Nossa']
+    st.dataframe(
+        nossas.sort_values(['score_ranking', 'win_rate_partidas'], ascending=False, kind='stable')[list(COLUNAS_CONFIG_RANKING_COMPOSICOES)],
+        hide_index=True, width="stretch", column_config=COLUNAS_CONFIG_RANKING_COMPOSICOES)
+    st.caption(LEGENDA_SCORE + " O bootstrap reamostra as partidas de cada composição; com poucas partidas ele repete o que foi visto (um 1-0 fica em 100%).")
+
+# --- Sinergia de agentes ---
+LADOS_SINERGIA = {'Nossa': "Nosso time", 'Adversária': "Adversário"}
+COLUNAS_CONFIG_SINERGIA = {
+    'agente': "Agente", 'agente_1': "Agente", 'agente_2': "Agente",
+    'partidas': st.column_config.NumberColumn("Partidas", format="%d"),
+    'vitorias': st.column_config.NumberColumn("Vitórias", format="%d"),
+    'win_rate': st.column_config.ProgressColumn("Win Rate", min_value=0, max_value=100, format="%.2f%%"),
+}
+
+@st.fragment
+def exibir_sinergia(chave, composicao_stats_df):
+    """Win rate por agente e por dupla, somando todas as composições que os contêm."""
+    col_lado, col_min = st.columns([0.6, 0.4])
+    lado = col_lado.radio("Lado", list(LADOS_SINERGIA), format_func=LADOS_SINERGIA.get, horizontal=True, key=f"sinergia_lado_{chave}")
+    min_partidas = int(col_min.number_input("Mínimo de partidas", min_value=1, value=1, key=f"sinergia_min_{chave}"))
+    with etapa("sinergia_agentes"):
+        sinergia = sinergia_agentes(composicao_stats_df, lado)
+    agentes, duplas = sinergia['agentes'], sinergia['duplas']
+    if agentes.empty:
+        st.write("Não há composições registradas para este lado."); return
+    col_agentes, col_duplas = st.columns([0.4, 0.6])
+    with col_agentes:
+        st.dataframe(agentes[agentes['partidas'] >= min_partidas], hide_index=True, width="stretch", column_config=COLUNAS_CONFIG_SINERGIA)
+    with col_duplas:
+        st.dataframe(duplas[duplas['partidas'] >= min_partidas], hide_index=True, width="stretch", column_config=COLUNAS_CONFIG_SINERGIA)
+    st.caption("Vitórias do lado que usou o agente (ou a dupla), em todas as composições que o contêm.")
+
+def confrontos_h2h_dataset(chave_dataset, metricas_detalhadas_por_mapa):
+    """ConfrontosH2H de cada mapa, montados uma vez por dataset."""
+    def indexar():
+        with etapa("indexar_h2h"):
+            return {mapa: ConfrontosH2H(metricas.get('h2h_stats')) for mapa, metricas in metricas_detalhadas_por_mapa.items()}
+    return armazenado(('confrontos_h2h', chave_dataset), indexar)
+
+class TarefaRelatorioPDF:
+    """Geração do PDF de um dataset em uma thread de trabalho, com andamento consultável."""
+
+    def __init__(self, executor, metricas_globais, df_map_ranking, metricas_detalhadas_por_mapa, mapas_unicos):
+        self.fracao = 0.0
+        self.etapa = "Na fila..."
+        self.tempo_ms = None
+        self.futuro = executor.submit(self._gerar, metricas_globais, df_map_ranking, metricas_detalhadas_por_mapa, mapas_unicos)
+
+    def _gerar(self, *dados_relatorio):
+        from valdash.relatorio_pdf import gerar_relatorio_pdf
+        inicio = time.perf_counter()
+        pdf = gerar_relatorio_pdf(*dados_relatorio, callback_progresso=self._atualizar)
+        self.tempo_ms = (time.perf_counter() - inicio) * 1000
+        return pdf
+
+    def _atualizar(self, fracao, etapa):
+        self.fracao, self.etapa = fracao, etapa
+
+@st.cache_resource
+def executor_relatorios_pdf():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="valdash-pdf")
+
+# Uma tarefa por dataset no armazém: pedidos simultâneos (de qualquer sessão) acompanham a mesma
+# geração. Ao terminar, os bytes do PDF vão para o armazém e novos downloads são instantâneos.
+def tarefa_relatorio_pdf_dataset(chave_dataset, metricas_globais, df_map_ranking, metricas_detalhadas_por_mapa, mapas_unicos):
+    return armazenado(('tarefa_pdf', chave_dataset), lambda: TarefaRelatorioPDF(
+        executor_relatorios_pdf(), metricas_globais, df_map_ranking, metricas_detalhadas_por_mapa, mapas_unicos))
+
+@st.fragment(run_every=0.5)
+def acompanhar_relatorio_pdf(tarefa):
+    """Atualiza a barra de andamento sem reexecutar a página; ao terminar, faz um único rerun."""
+    if tarefa.futuro.done():
+        st.rerun()
+    st.progress(tarefa.fracao, text=tarefa.etapa)
+
+@st.fragment
+def exibir_exportacao_pdf(chave_dataset, metricas_globais, df_map_ranking, metricas_detalhadas_por_mapa, mapas_unicos):
+    """Botão de exportação do PDF. O relatório só é gerado quando solicitado, fora da thread da página."""
+    chave_solicitado = f"pdf_solicitado_{chave_dataset}"
+    if not st.session_state.get(chave_solicitado):
+        if not st.button("📄 Gerar Relatório PDF", width="stretch"):
+            return
+        st.session_state[chave_solicitado] = True
+
+    armazem = armazem_datasets()
+    pdf = armazem.consultar(('pdf', chave_dataset))
+    if pdf is None:
+        tarefa = tarefa_relatorio_pdf_dataset(chave_dataset, metricas_globais, df_map_ranking, metricas_detalhadas_por_mapa, mapas_unicos)
+        if not tarefa.futuro.done():
+            acompanhar_relatorio_pdf(tarefa)
+            return
+        # A tarefa terminada sai do armazém: fica o PDF (ou, com erro, um novo clique tenta gerar de novo).
+        # O PDF entra antes de a tarefa sair, para outra sessão não começar uma nova geração nesse meio-tempo.
+        erro = tarefa.futuro.exception()
+        if erro is not None:
+            armazem.descartar(('tarefa_pdf', chave_dataset))
+            st.session_state[chave_solicitado] = False
+            st.error(f"Erro ao gerar o relatório PDF: {erro}")
+            return
+        pdf = tarefa.futuro.result()
+        armazem.guardar(('pdf', chave_dataset), pdf)
+        armazem.descartar(('tarefa_pdf', chave_dataset))
+        instrumentacao = st.session_state.get('instrumentacao')
+        if instrumentacao is not None and tarefa.tempo_ms is not None:
+            # Gerado em uma thread de trabalho: entra no diagnóstico com o tempo medido lá
+            instrumentacao.registrar("gerar_relatorio_pdf", tarefa.tempo_ms)
+    st.download_button(label="📄 Exportar Relatório para PDF", data=pdf, file_name="relatorio_analitico_partidas.pdf", mime="application/pdf", width="stretch")
+
+# --- Diagnóstico de desempenho ---
+# Com o painel ligado, cada rerun ganha uma Instrumentacao que registra as etapas executadas
+# (as que vieram do cache não aparecem). Os registros também podem ser acrescentados a um
+# arquivo JSON lines indicado pela variável de ambiente VALDASH_DIAGNOSTICO_JSONL.
+CAMINHO_DIAGNOSTICO_JSONL = os.environ.get("VALDASH_DIAGNOSTICO_JSONL")
+
+def iniciar_instrumentacao(ativa):
+    """Instrumentação deste rerun (ou None). Encerra a do rerun anterior, que pode ter sido interrompido."""
+    anterior = st.session_state.pop('instrumentacao', None)
+    if anterior is not None:
+        anterior.encerrar()
+    instrumentacao = Instrumentacao() if ativa else None
+    if instrumentacao is not None:
+        st.session_state['instrumentacao'] = instrumentacao
+    usar_instrumentacao(instrumentacao)
+    return instrumentacao
+
+def exibir_diagnostico(instrumentacao):
+    """Painel lateral com tempo, linhas e pico de memória das etapas deste rerun."""
+    if instrumentacao is None:
+        return
+    instrumentacao.encerrar()
+    registros = instrumentacao.registros
+    with st.sidebar.expander("⏱️ Diagnóstico de desempenho", expanded=True):
+        if registros:
+            tabela = pd.DataFrame(registros)
+            tabela['etapa'] = ["\u2003" * nivel + nome for nivel, nome in zip(tabela['nivel'], tabela['etapa'])]
+            tabela['linhas'] = tabela['linhas'].astype('Int64')
+            st.dataframe(tabela[['etapa', 'linhas', 'tempo_ms', 'pico_mb']], hide_index=True, width="stretch")
+        st.caption("Etapas que vieram do cache não aparecem. Pico de memória: alocações acima do início da etapa; "
+                   "fica vazio quando outra sessão mediu ao mesmo tempo (o tracemalloc é um só para o processo).")
+        armazem = armazem_datasets().estatisticas()
+        st.caption(f"Armazém compartilhado (todas as sessões): {armazem['entradas']} resultado(s), {armazem['memoria_mb']:.1f} de {armazem['limite_mb']:.0f} MB; "
+                   f"{armazem['acertos']} acerto(s), {armazem['faltas']} falta(s), {armazem['esperas']} espera(s) pelo cálculo de outra sessão, "
+                   f"{armazem['remocoes']} remoção(ões) por limite de memória.")
+        st.download_button("Exportar diagnóstico (JSON lines)", data=instrumentacao.jsonl(), file_name=f"diagnostico_{instrumentacao.execucao}.jsonl",
+                           mime="application/x-ndjson", width="stretch")
+    if CAMINHO_DIAGNOSTICO_JSONL and registros:
+        anexar_jsonl(CAMINHO_DIAGNOSTICO_JSONL, registros)
 
 # --- Interface Streamlit ---
 st.set_page_config(layout="wide")
 st.title("Dashboard Analítico de partidas📊")
-uploaded_file = st.file_uploader("Carregue seu arquivo CSV", type=["csv"])
+instrumentacao = iniciar_instrumentacao(st.sidebar.toggle(
+    "Diagnóstico de desempenho", value=False,
+    help="Mede tempo, linhas e pico de memória de cada etapa. Enquanto ligado, o rastreamento de memória deixa o processamento mais lento."))
+uploaded_file = st.file_uploader("Carregue seu arquivo de partidas (CSV, planilha .xlsx ou Parquet)", type=EXTENSOES_SUPORTADAS)
 
 if uploaded_file is not None:
+    import pandas as pd
+    from valdash.leitura import (MAX_AMOSTRA_INVALIDAS, TAMANHO_BLOCO_PADRAO, contar_csv_em_blocos, exportar_parquet,
+                                 ler_csv_em_blocos, ler_partidas, resumir_validacao)
+    from valdash.metricas import metricas_de_contagens, montar_dashboard, montar_dashboard_de_contagens
+    from valdash.historico import (COLUNAS_PARTIDAS_HISTORICO, abrir_historico, contagens_do_historico, ingerir_no_historico,
+                                   partidas_do_historico, versao_historico)
+    from valdash.periodos import COLUNAS_INDICE_TEMPORAL, NOME_GLOBAL, IndiceTemporal
+    from valdash.cubo import DIMENSOES_AGRUPAMENTO, DIMENSOES_CUBO, CuboPartidas
+    from valdash.h2h import ConfrontosH2H
+    from valdash.sinergia import sinergia_agentes
+
     try:
-        df_original = pd.read_csv(uploaded_file)
-        if df_original.empty:
-            st.error("O arquivo CSV está vazio."); st.stop()
-        st.success("Arquivo CSV carregado com sucesso!")
-        df_processado = processar_dados(df_original.copy())
-        mapas_unicos = sorted(df_processado['mapa'].dropna().astype(str).unique())
+        conteudo = uploaded_file.getvalue()
+        with etapa("hash_arquivo"):
+            hash_arquivo = hash_conteudo(conteudo)
+        leitura_em_blocos = uploaded_file.name.lower().endswith(".csv") and len(conteudo) > LIMITE_BYTES_LEITURA_EM_BLOCOS
+        if leitura_em_blocos:
+            df_processado = None
+            contagens_upload, resumo_validacao = contar_dataset_em_blocos(hash_arquivo, conteudo)
+        else:
+            df_processado, resumo_validacao = carregar_dataset(hash_arquivo, conteudo, uploaded_file.name)
+        if resumo_validacao is None or resumo_validacao['linhas'] == 0:
+            st.error("O arquivo está vazio."); st.stop()
+        st.success("Arquivo carregado com sucesso!")
+        if leitura_em_blocos:
+            st.caption(f"Arquivo grande: lido em blocos de {TAMANHO_BLOCO_PADRAO} linhas, mantendo em memória apenas as contagens.")
+        if resumo_validacao['linhas_invalidas']:
+            st.warning(f"{resumo_validacao['linhas_invalidas']} linha(s) com placar em formato inválido (esperado 'X-Y', ex: '13-7'). Essas linhas contam como derrota nos lados/partidas com placar inválido.")
+            with st.expander(f"Ver linhas com placar inválido (até {MAX_AMOSTRA_INVALIDAS})"):
+                st.dataframe(resumo_validacao['amostra_invalidas'], width="stretch")
+        if df_processado is not None:
+            st.sidebar.download_button(
+                "Baixar dados processados (Parquet)", data=lambda: exportar_parquet(df_processado),
+                file_name="partidas_processadas.parquet", mime="application/octet-stream",
+                help="Já tipado e validado: recarregar este arquivo pula o processamento.")
+
+        usar_historico = st.sidebar.toggle(
+            "Acumular no histórico local", value=False,
+            help=f"Salva as partidas em '{CAMINHO_HISTORICO}' e mostra as métricas de todo o histórico. Partidas já salvas (mesma data, hora, adversário e mapa; sem data ou hora, também o mesmo placar, pistols e composições) são ignoradas.")
+        if usar_historico:
+            partidas_novas, versao = ingerir_upload_no_historico(hash_arquivo, conteudo, df_processado)
+            st.info(f"{partidas_novas} partida(s) nova(s) adicionada(s) ao histórico. Exibindo {versao} partidas do histórico.")
+            chave_dataset = f"historico:{CAMINHO_HISTORICO}:{versao}"
+            mapas_unicos, metricas_globais, metricas_detalhadas_por_mapa, df_map_ranking = calcular_metricas_historico(CAMINHO_HISTORICO, versao)
+            aviso_periodo = aviso_filtros = None
+        elif leitura_em_blocos:
+            chave_dataset = hash_arquivo
+            mapas_unicos, metricas_globais, metricas_detalhadas_por_mapa, df_map_ranking = calcular_metricas_contagens_dataset(hash_arquivo, contagens_upload)
+            aviso_periodo = "A análise por período não está disponível para arquivos lidos em blocos (só as contagens ficam em memória)."
+            aviso_filtros = "Os filtros não estão disponíveis para arquivos lidos em blocos (só as contagens ficam em memória)."
+        else:
+            chave_dataset = hash_arquivo
+            mapas_unicos, metricas_globais, metricas_detalhadas_por_mapa, df_map_ranking = calcular_metricas_dataset(hash_arquivo, df_processado)
+            # Sem a coluna de data (ou de adversário) só a aba correspondente fica indisponível
+            aviso_periodo = (None if set(COLUNAS_INDICE_TEMPORAL) <= set(df_processado.columns)
+                             else "A análise por período não está disponível: o arquivo não tem a coluna 'Data do jogo'.")
+            aviso_filtros = (None if set(DIMENSOES_CUBO) <= set(df_processado.columns)
+                             else "Os filtros não estão disponíveis: o arquivo não tem a coluna 'Time adversario'.")
         if not mapas_unicos:
             st.warning("Nenhum mapa encontrado nos dados processados. Verifique a coluna 'Mapa jogado'."); st.stop()
 
-        metricas_globais = calcular_metricas(df_processado, "Global")
-        metricas_detalhadas_por_mapa = {}
-        map_performance_data = []
-        for mapa_nome in mapas_unicos:
-            df_mapa_loop = df_processado[df_processado['mapa'] == mapa_nome]
-            metricas_mapa_loop = calcular_metricas(df_mapa_loop, mapa_nome)
-            metricas_detalhadas_por_mapa[mapa_nome] = metricas_mapa_loop
-            map_performance_data.append({
-                'mapa': mapa_nome,
-                'win_rate_geral_partidas_nosso_time': metricas_mapa_loop['win_rate_geral_partidas_nosso_time'],
-                'total_partidas': metricas_mapa_loop['total_partidas_jogadas_nosso_time'],
-            })
-        df_map_ranking = pd.DataFrame(map_performance_data)
-        if not df_map_ranking.empty:
-            df_map_ranking = df_map_ranking.sort_values(by='win_rate_geral_partidas_nosso_time', ascending=False)
-
-        if not df_processado.empty:
+        if resumo_validacao['linhas'] > 0:
             col_pdf_placeholder, col_pdf_btn = st.columns([0.75, 0.25])
             with col_pdf_btn:
-                pdf_bytes = gerar_relatorio_pdf(metricas_globais, df_map_ranking, metricas_detalhadas_por_mapa, mapas_unicos)
-                st.download_button(label="📄 Exportar Relatório para PDF", data=pdf_bytes, file_name="relatorio_analitico_partidas.pdf", mime="application/pdf", use_container_width=True)
+                exibir_exportacao_pdf(chave_dataset, metricas_globais, df_map_ranking, metricas_detalhadas_por_mapa, mapas_unicos)
         st.markdown("---")
 
-        tab_geral_nome = "🌎 Geral"
-        tabs_nomes = [tab_geral_nome] + [f"🗺️ {mapa}" for mapa in mapas_unicos]
-        tabs = st.tabs(tabs_nomes)
-
-        with tabs[0]: # Aba Geral
-            st.header("Visão Geral Global")
-            total_partidas_globais_display = metricas_globais.get('total_partidas_jogadas_nosso_time', 'N/A')
-            col1, col2 = st.columns(2)
-            with col1:
-                exibir_metricas_card("Win Rate CT (Rounds)", metricas_globais['win_rate_ct_rounds'], "partidas analisadas", total_partidas_globais_display)
-                exibir_metricas_card("Win Rate Pistol CT", metricas_globais['win_rate_pistol_ct'], "partidas analisadas", total_partidas_globais_display)
-            with col2:
-                exibir_metricas_card("Win Rate TR (Rounds)", metricas_globais['win_rate_tr_rounds'], "partidas analisadas", total_partidas_globais_display)
-                exibir_metricas_card("Win Rate Pistol TR", metricas_globais['win_rate_pistol_tr'], "partidas analisadas", total_partidas_globais_display)
-            st.markdown("---")
-            st.header("🏆 Ranking de Mapas")
-            if not df_map_ranking.empty:
-                df_map_ranking_display = df_map_ranking.reset_index(drop=True)
-                for i, row in df_map_ranking_display.iterrows():
-                    rank_color_html = get_color_for_percentage_text(row['win_rate_geral_partidas_nosso_time'])
-                    melhor_comp_mapa_info = metricas_detalhadas_por_mapa.get(row['mapa'], {}).get('melhor_nossa_composicao_info', {})
-
-                    # Usar as novas chaves para win_rate_partidas e partidas_jogadas
-                    melhor_comp_str = melhor_comp_mapa_info.get('composicao', 'N/A') # Lado não é mais principal aqui
-                    wr_melhor_comp = melhor_comp_mapa_info.get('win_rate_partidas', 0)
-                    partidas_jog_melhor_comp = melhor_comp_mapa_info.get('partidas_jogadas',0)
-
-                    st.markdown(f"""
-                    <div style="border-left: 5px solid {rank_color_html}; padding: 10px; margin-bottom: 10px; background-color: #f9f9f9; border-radius:5px; color: black;">
-                        <h4 style="color:black; margin-top:0px; margin-bottom:5px;">{i+1}º - {row['mapa']}</h4>
-                        <span style="color:black;">Win Rate Geral (Partidas): </span><strong style="color:{rank_color_html};">{row['win_rate_geral_partidas_nosso_time']:.2f}%</strong> <span style="color:black;">({row['total_partidas']} partidas)</span><br>
-                        <span style="color:black;">Melhor Composição Nossa: </span><strong style="color:black;">{melhor_comp_str}</strong>
-                        (WR Partidas: <span style="color:{get_color_for_percentage_text(wr_melhor_comp)};">{wr_melhor_comp:.2f}%</span>, {partidas_jog_melhor_comp} partidas)
-                    </div>
-                    """, unsafe_allow_html=True)
-            else:
-                st.write("Não há dados suficientes para gerar o ranking de mapas.")
-
-        for i, mapa_nome_tab in enumerate(mapas_unicos): # Abas por Mapa
-            with tabs[i+1]:
-                metricas_mapa_tab = metricas_detalhadas_por_mapa.get(mapa_nome_tab)
-                if not metricas_mapa_tab:
-                    st.warning(f"Métricas não encontradas para o mapa {mapa_nome_tab}"); continue
-                st.header(f"Análise do Mapa: {mapa_nome_tab}")
-                total_partidas_mapa_display = metricas_mapa_tab.get('total_partidas_jogadas_nosso_time', 'N/A')
-                exibir_metricas_card(f"Win Rate Geral no {mapa_nome_tab}", metricas_mapa_tab['win_rate_geral_partidas_nosso_time'], "partidas jogadas", total_partidas_mapa_display)
-                st.markdown("---")
-                col_map1, col_map2 = st.columns(2)
-                with col_map1:
-                    exibir_metricas_card("Win Rate CT (Rounds)", metricas_mapa_tab['win_rate_ct_rounds'], "partidas analisadas", total_partidas_mapa_display)
-                    exibir_metricas_card("Win Rate Pistol CT", metricas_mapa_tab['win_rate_pistol_ct'], "partidas analisadas", total_partidas_mapa_display)
-                with col_map2:
-                    exibir_metricas_card("Win Rate TR (Rounds)", metricas_mapa_tab['win_rate_tr_rounds'], "partidas analisadas", total_partidas_mapa_display)
-                    exibir_metricas_card("Win Rate Pistol TR", metricas_mapa_tab['win_rate_pistol_tr'], "partidas analisadas", total_partidas_mapa_display)
-                st.markdown("---")
-                # Atualizar label para refletir que a melhor comp é por partida
-                st.subheader(f"✨ Melhor Composição no mapa {mapa_nome_tab} (baseado em Win Rate de Partidas)")
-                melhor_comp_info = metricas_mapa_tab['melhor_nossa_composicao_info']
-                if melhor_comp_info['composicao'] != "N/A":
-                    cor_melhor_comp_html = get_color_for_percentage_text(melhor_comp_info.get('win_rate_partidas',0))
-                    # Lado não é mais incluído no display da composição principal aqui, pois a métrica é geral da partida
-                    st.markdown(f"""
-                    Composição: **{melhor_comp_info['composicao']}**<br>
-                    Win Rate (Partidas): <strong style="color:{cor_melhor_comp_html};">{melhor_comp_info.get('win_rate_partidas', 0):.2f}%</strong> ({melhor_comp_info.get('partidas_jogadas', 0)} partidas jogadas)
-                    """, unsafe_allow_html=True)
-                else:
-                    st.write("Não há dados suficientes de nossas composições neste mapa.")
-                st.markdown("---")
-                st.subheader("⚔️ Confrontos: Nossa Composição vs. Composição Adversária (Resultado da Partida)")
-                h2h_stats_df_mapa = metricas_mapa_tab.get('h2h_stats')
-                if h2h_stats_df_mapa is not None and not h2h_stats_df_mapa.empty:
-                    styled_h2h_df_mapa = h2h_stats_df_mapa.style.apply(lambda row: [''] * (len(row) -1) + [style_win_rate_h2h(row['win_rate_vs_adv_comp'])], axis=1, subset=['win_rate_vs_adv_comp']).format({'win_rate_vs_adv_comp': "{:.2f}%", 'total_vitorias_nossa_comp': "{:}", 'total_partidas_disputadas': "{:}"}).set_table_styles([{'selector': 'th', 'props': [('text-align', 'left')]}]) .set_properties(**{'width': '150px', 'text-align': 'left'})
-                    st.write(f"Win Rate da Nossa Composição contra Composições Adversárias Específicas em {mapa_nome_tab}:")
-                    st.dataframe(styled_h2h_df_mapa, use_container_width=True)
-                else:
-                    st.write(f"Não há dados de confrontos diretos (H2H) para exibir em {mapa_nome_tab}.")
+        confrontos_por_mapa = confrontos_h2h_dataset(chave_dataset, metricas_detalhadas_por_mapa)
+        with etapa("renderizacao"):
+            tab_geral_nome = "🌎 Geral"
+            tabs_nomes = [tab_geral_nome, "📅 Período", "🔎 Filtros"] + [f"🗺️ {mapa}" for mapa in mapas_unicos]
+            # Com on_change="rerun" o Streamlit informa a aba selecionada (.open): só ela é montada
+            # e enviada ao navegador; trocar de aba reexecuta o script, com os dados já em cache.
+            tabs = st.tabs(tabs_nomes, key=f"abas_{chave_dataset}", on_change="rerun")
+
+            if tabs[0].open:
+                with tabs[0]: # Aba Geral
+                    st.header("Visão Geral Global")
+                    total_partidas_globais_display = metricas_globais.get('total_partidas_jogadas_nosso_time', 'N/A')
+                    st.markdown(html_grade_taxas(metricas_globais, "partidas analisadas", total_partidas_globais_display), unsafe_allow_html=True)
+                    st.markdown("---")
+                    st.header("🏆 Ranking de Mapas")
+                    if not df_map_ranking.empty:
+                        cards_ranking = []
+                        df_map_ranking_display = df_map_ranking.reset_index(drop=True)
+                        for i, row in enumerate(df_map_ranking_display.itertuples(index=False)):
+                            rank_color_html = get_color_for_percentage_text(row.win_rate_geral_partidas_nosso_time)
+                            melhor_comp_mapa_info = metricas_detalhadas_por_mapa.get(row.mapa, {}).get('melhor_nossa_composicao_info', {})
+
+                            # Usar as novas chaves para win_rate_partidas e partidas_jogadas
+                            melhor_comp_str = melhor_comp_mapa_info.get('composicao', 'N/A') # Lado não é mais principal aqui
+                            wr_melhor_comp = melhor_comp_mapa_info.get('win_rate_partidas', 0)
+                            partidas_jog_melhor_comp = melhor_comp_mapa_info.get('partidas_jogadas',0)
+                            intervalo_mapa = formatar_intervalo((row.ic_inferior, row.ic_superior))
+
+                            cards_ranking.append(
+                                f'<div style="border-left: 5px solid {rank_color_html}; padding: 10px; margin-bottom: 10px; background-color: #f9f9f9; border-radius:5px; color: black;">'
+                                f'<h4 style="color:black; margin-top:0px; margin-bottom:5px;">{i+1}º - {row.mapa}</h4>'
+                                f'<span style="color:black;">Win Rate Geral (Partidas): </span><strong style="color:{rank_color_html};">{row.win_rate_geral_partidas_nosso_time:.2f}%</strong> <span style="color:black;">({row.total_partidas} partidas; {intervalo_mapa}; score {row.score_ranking:.2f})</span><br>'
+                                f'<span style="color:black;">Melhor Composição Nossa: </span><strong style="color:black;">{melhor_comp_str}</strong> '
+                                f'(WR Partidas: <span style="color:{get_color_for_percentage_text(wr_melhor_comp)};">{wr_melhor_comp:.2f}%</span>, {partidas_jog_melhor_comp} partidas)'
+                                f'</div>')
+                        # Um único bloco para o ranking inteiro, em vez de um st.markdown por mapa
+                        st.markdown("".join(cards_ranking), unsafe_allow_html=True)
+                        st.caption(LEGENDA_SCORE)
+                    else:
+                        st.write("Não há dados suficientes para gerar o ranking de mapas.")
+                    st.markdown("---")
+                    st.header("📊 Ranking de Composições")
+                    exibir_ranking_composicoes(metricas_globais.get('composicao_stats'))
+                    st.markdown("---")
+                    st.header("🧩 Sinergia de Agentes")
+                    exibir_sinergia(f"{chave_dataset}_geral", metricas_globais.get('composicao_stats'))
+
+            if tabs[1].open:
+                with tabs[1]: # Aba Período
+                    st.header("Análise por Período")
+                    # Índice e cubo só são montados (uma vez por dataset) quando a aba é aberta
+                    if aviso_periodo:
+                        st.info(aviso_periodo)
+                    elif usar_historico:
+                        exibir_aba_periodo(chave_dataset, indice_temporal_historico(CAMINHO_HISTORICO, versao))
+                    else:
+                        exibir_aba_periodo(chave_dataset, indice_temporal_dataset(chave_dataset, df_processado))
+
+            if tabs[2].open:
+                with tabs[2]: # Aba Filtros
+                    st.header("Recortes por Mapa, Adversário e Composição")
+                    if aviso_filtros:
+                        st.info(aviso_filtros)
+                    elif usar_historico:
+                        exibir_aba_filtros(chave_dataset, cubo_historico(CAMINHO_HISTORICO, versao))
+                    else:
+                        exibir_aba_filtros(chave_dataset, cubo_dataset(chave_dataset, df_processado))
+
+            for i, mapa_nome_tab in enumerate(mapas_unicos): # Abas por Mapa
+                if not tabs[i+3].open:
+                    continue
+                with tabs[i+3]:
+                    metricas_mapa_tab = metricas_detalhadas_por_mapa.get(mapa_nome_tab)
+                    if not metricas_mapa_tab:
+                        st.warning(f"Métricas não encontradas para o mapa {mapa_nome_tab}"); continue
+                    st.header(f"Análise do Mapa: {mapa_nome_tab}")
+                    total_partidas_mapa_display = metricas_mapa_tab.get('total_partidas_jogadas_nosso_time', 'N/A')
+                    # Cards do mapa em um único bloco HTML
+                    st.markdown(
+                        html_metricas_card(f"Win Rate Geral no {mapa_nome_tab}", metricas_mapa_tab['win_rate_geral_partidas_nosso_time'], "partidas jogadas", total_partidas_mapa_display,
+                                           intervalo=metricas_mapa_tab['intervalos_taxas'].get('win_rate_geral_partidas_nosso_time'))
+                        + "<hr>" + html_grade_taxas(metricas_mapa_tab, "partidas analisadas", total_partidas_mapa_display), unsafe_allow_html=True)
+                    st.markdown("---")
+                    # Atualizar label para refletir que a melhor comp é por partida
+                    st.subheader(f"✨ Melhor Composição no mapa {mapa_nome_tab} (pelo score de ranking)")
+                    melhor_comp_info = metricas_mapa_tab['melhor_nossa_composicao_info']
+                    if melhor_comp_info['composicao'] != "N/A":
+                        cor_melhor_comp_html = get_color_for_percentage_text(melhor_comp_info.get('win_rate_partidas',0))
+                        # Lado não é mais incluído no display da composição principal aqui, pois a métrica é geral da partida
+                        st.markdown(f"""
+                        Composição: **{melhor_comp_info['composicao']}**<br>
+                        Win Rate (Partidas): <strong style="color:{cor_melhor_comp_html};">{melhor_comp_info.get('win_rate_partidas', 0):.2f}%</strong> ({melhor_comp_info.get('partidas_jogadas', 0)} partidas jogadas)<br>
+                        {formatar_intervalo((melhor_comp_info['ic_inferior'], melhor_comp_info['ic_superior']))} · Score: {melhor_comp_info['score_ranking']:.2f}
+                        """, unsafe_allow_html=True)
+                    else:
+                        st.write("Não há dados suficientes de nossas composições neste mapa.")
+                    st.markdown("---")
+                    st.subheader(f"📊 Ranking de Composições no mapa {mapa_nome_tab}")
+                    exibir_ranking_composicoes(metricas_mapa_tab.get('composicao_stats'))
+                    st.markdown("---")
+                    st.subheader(f"🧩 Sinergia de Agentes no mapa {mapa_nome_tab}")
+                    exibir_sinergia(f"{chave_dataset}_{mapa_nome_tab}", metricas_mapa_tab.get('composicao_stats'))
+                    st.markdown("---")
+                    st.subheader("⚔️ Confrontos: Nossa Composição vs. Composição Adversária (Resultado da Partida)")
+                    confrontos_mapa = confrontos_por_mapa.get(mapa_nome_tab)
+                    if confrontos_mapa is not None and len(confrontos_mapa) > 0:
+                        st.write(f"Win Rate da Nossa Composição contra Composições Adversárias Específicas em {mapa_nome_tab}:")
+                        exibir_h2h_mapa(f"{chave_dataset}_{mapa_nome_tab}", confrontos_mapa)
+                    else:
+                        st.write(f"Não há dados de confrontos diretos (H2H) para exibir em {mapa_nome_tab}.")
+
+        exibir_diagnostico(instrumentacao)
     except UnicodeDecodeError:
         st.error("Erro de codificação ao ler o arquivo. Tente salvar seu CSV com codificação UTF-8.")
     except pd.errors.EmptyDataError:
-        st.error("Erro: O arquivo CSV carregado está vazio ou não contém dados.")
+        st.error("Erro: O arquivo carregado está vazio ou não contém dados.")
     except Exception as e:
         st.error(f"Ocorreu um erro ao processar o arquivo: {e}")
         st.exception(e)
         st.error("Verifique se o arquivo CSV está no formato esperado, se os nomes das colunas correspondem aos definidos no dicionário 'rename' da função 'processar_dados', e se os dados de placar estão corretos (ex: '13-7'). Certifique-se também que as colunas de placar e pistol existem e estão corretamente preenchidas.")
 else:
-    st.info("Por favor, carregue um arquivo CSV para começar a análise.")
+    st.info("Por favor, carregue um arquivo CSV, XLSX ou Parquet para começar a análise.")
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# O gerador de partidas sintéticas fica junto dos benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from gerador_partidas import gerar_partidas  # noqa: E402
+
+from valdash.processamento import processar_dados  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def partidas():
+    """Partidas processadas (poucos mapas, composições e adversários, para haver repetições), com placares inválidos."""
+    return processar_dados(gerar_partidas(3000, mapas=4, composicoes=8, adversarios=5, taxa_invalidos=0.05, semente=3))
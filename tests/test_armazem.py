@@ -0,0 +1,99 @@
+"""ArmazemCompartilhado: um só cálculo por chave entre threads, LRU e limite de memória."""
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from valdash.armazem import ArmazemCompartilhado, estimar_bytes
+
+KB = 1024
+
+
+def _armazem_bytes(limite_bytes):
+    return ArmazemCompartilhado(limite_mb=limite_bytes / 1024 / 1024)
+
+def _valor(kb):
+    """bytes que ocupam ~kb KB para estimar_bytes."""
+    return b"x" * (kb * KB - sys.getsizeof(b""))
+
+
+def test_pedidos_simultaneos_calculam_uma_vez():
+    armazem = ArmazemCompartilhado()
+    liberar = threading.Event()
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        liberar.wait(5)
+        return {"resultado": 42}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futuros = [executor.submit(armazem.obter, "chave", calcular) for _ in range(4)]
+        # Espera todos chegarem (um calculando, três esperando o Future dele) antes de liberar
+        prazo = time.monotonic() + 5
+        while armazem.estatisticas()['esperas'] < 3 and time.monotonic() < prazo:
+            time.sleep(0.01)
+        liberar.set()
+        resultados = [futuro.result(timeout=5) for futuro in futuros]
+
+    assert len(chamadas) == 1
+    assert all(resultado is resultados[0] for resultado in resultados)
+    estatisticas = armazem.estatisticas()
+    assert (estatisticas['faltas'], estatisticas['esperas'], estatisticas['entradas']) == (1, 3, 1)
+    assert armazem.obter("chave", calcular) is resultados[0]
+    assert len(chamadas) == 1 and armazem.estatisticas()['acertos'] == 1
+
+def test_erro_chega_a_quem_espera_e_nada_e_guardado():
+    armazem = ArmazemCompartilhado()
+    liberar = threading.Event()
+
+    def falhar():
+        liberar.wait(5)
+        raise ValueError("arquivo inválido")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futuros = [executor.submit(armazem.obter, "chave", falhar) for _ in range(2)]
+        prazo = time.monotonic() + 5
+        while armazem.estatisticas()['esperas'] < 1 and time.monotonic() < prazo:
+            time.sleep(0.01)
+        liberar.set()
+        for futuro in futuros:
+            with pytest.raises(ValueError, match="arquivo inválido"):
+                futuro.result(timeout=5)
+
+    assert "chave" not in armazem
+    # Sem cálculo pendente: o próximo pedido calcula de novo
+    assert armazem.obter("chave", lambda: "ok") == "ok"
+
+def test_remove_o_menos_usado_recentemente():
+    armazem = _armazem_bytes(3 * KB)
+    for chave in "abc":
+        armazem.guardar(chave, _valor(1))
+    armazem.obter("a", lambda: pytest.fail("'a' deveria estar guardado"))
+    armazem.guardar("d", _valor(1))
+
+    assert "b" not in armazem
+    assert all(chave in armazem for chave in "acd")
+    assert armazem.estatisticas()['remocoes'] == 1
+
+def test_memoria_fica_no_limite():
+    armazem = _armazem_bytes(10 * KB)
+    for i in range(20):
+        armazem.guardar(i, _valor(3))
+        assert armazem.estatisticas()['memoria_mb'] * 1024 * 1024 <= 10 * KB
+    assert len(armazem) == 3
+    assert all(i in armazem for i in (17, 18, 19))
+
+    # Maior que o limite inteiro: não é guardado nem remove o que já estava
+    armazem.guardar("grande", _valor(11))
+    assert "grande" not in armazem and len(armazem) == 3
+
+def test_substituir_e_descartar_atualizam_a_memoria():
+    armazem = _armazem_bytes(100 * KB)
+    armazem.guardar("a", _valor(4))
+    armazem.guardar("a", _valor(2))
+    assert armazem.estatisticas()['memoria_mb'] * 1024 * 1024 == estimar_bytes(_valor(2))
+    armazem.descartar("a")
+    assert armazem.estatisticas()['memoria_mb'] == 0 and len(armazem) == 0
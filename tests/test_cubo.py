@@ -0,0 +1,55 @@
+"""Cubo de contagens: somar as células filtradas dá o mesmo que contar_partidas nas partidas filtradas."""
+import pandas as pd
+import pytest
+
+from valdash.cubo import CuboPartidas
+from valdash.metricas import contar_partidas
+
+CHAVES = {
+    'totais': [],
+    'composicoes': ['composicao', 'tipo'],
+    'h2h': ['nossa_composicao', 'composicao_adversaria'],
+}
+
+
+@pytest.fixture(scope="module")
+def cubo(partidas):
+    return CuboPartidas(partidas)
+
+def _ordenada(tabela, chaves):
+    tabela = tabela.assign(**{c: tabela[c].astype(str) for c in chaves})
+    return tabela[sorted(tabela.columns)].sort_values(chaves).reset_index(drop=True)
+
+def _filtros(partidas):
+    mapas = sorted(partidas['mapa'].dropna().unique())
+    adversarios = sorted(partidas['time_adversario'].dropna().unique())
+    return [
+        {},
+        {'mapa': [mapas[0]]},
+        {'mapa': mapas[1:3], 'time_adversario': [adversarios[0]]},
+        {'time_adversario': adversarios[:2]},
+        {'mapa': [mapas[-1]], 'pistol_ct_resultado': ['win'], 'nosso_time_venceu_lado_tr': [True]},
+        {'mapa': ['Mapa que não existe']},
+    ]
+
+
+@pytest.mark.parametrize("coluna_grupo", ['mapa', 'time_adversario'])
+def test_contagens_do_cubo_iguais_a_contar_partidas_no_recorte(partidas, cubo, coluna_grupo):
+    for filtros in _filtros(partidas):
+        selecao = pd.Series(True, index=partidas.index)
+        for dimensao, aceitos in filtros.items():
+            selecao &= partidas[dimensao].isin(aceitos)
+        esperadas = contar_partidas(partidas[selecao], coluna_grupo=coluna_grupo)
+        obtidas = cubo.contagens(filtros, coluna_grupo=coluna_grupo)
+
+        for tabela, chaves in CHAVES.items():
+            chaves = [coluna_grupo] + chaves
+            if esperadas[tabela].empty:
+                assert obtidas[tabela].empty, (filtros, tabela)
+                continue
+            pd.testing.assert_frame_equal(_ordenada(obtidas[tabela], chaves), _ordenada(esperadas[tabela], chaves),
+                                          check_dtype=False, check_categorical=False, obj=f"{tabela} {filtros}")
+
+def test_celulas_somam_todas_as_partidas(partidas, cubo):
+    assert len(cubo) < len(partidas)
+    assert cubo.celulas['total_partidas'].sum() == len(partidas)
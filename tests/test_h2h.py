@@ -0,0 +1,75 @@
+"""ConfrontosH2H (ordens pré-calculadas) contra ordenar e filtrar o h2h_stats com o pandas."""
+import pandas as pd
+import pytest
+
+from valdash.h2h import ORDENACOES_H2H, ConfrontosH2H
+from valdash.metricas import calcular_metricas
+
+# Critério de ConfrontosH2H -> coluna do h2h_stats
+COLUNAS_CRITERIOS = {
+    'score': 'score_ranking',
+    'win_rate': 'win_rate_vs_adv_comp',
+    'partidas': 'total_partidas_disputadas',
+    'vitorias': 'total_vitorias_nossa_comp',
+}
+COLUNAS_COMPARADAS = ['nossa_composicao', 'composicao_adversaria', 'total_vitorias_nossa_comp', 'total_partidas_disputadas',
+                      'win_rate_vs_adv_comp', 'ic_inferior', 'ic_superior', 'score_ranking']
+
+
+@pytest.fixture(scope="module", params=[None, 300], ids=["todas", "poucas"])
+def h2h_stats(request, partidas):
+    # Com poucas partidas há muitos pares com as mesmas contagens: os desempates são exercitados
+    recorte = partidas if request.param is None else partidas.head(request.param)
+    return calcular_metricas(recorte, "geral")['h2h_stats'].reset_index(drop=True)
+
+def _ordenado(h2h_stats, ordenar_por, min_partidas=1):
+    """A ordem esperada: sort_values estável pelo critério e seus desempates, do maior para o menor."""
+    colunas = [COLUNAS_CRITERIOS[chave] for chave in ORDENACOES_H2H[ordenar_por]]
+    filtrado = h2h_stats[h2h_stats['total_partidas_disputadas'] >= min_partidas]
+    return filtrado.sort_values(colunas, ascending=False, kind='stable')
+
+def _normalizado(tabela):
+    tabela = tabela[COLUNAS_COMPARADAS].reset_index(drop=True)
+    return tabela.assign(nossa_composicao=tabela['nossa_composicao'].astype(str),
+                         composicao_adversaria=tabela['composicao_adversaria'].astype(str))
+
+def assert_quadros_iguais(obtido, esperado):
+    pd.testing.assert_frame_equal(_normalizado(obtido), _normalizado(esperado), check_dtype=False)
+
+
+@pytest.mark.parametrize("ordenar_por", list(ORDENACOES_H2H))
+@pytest.mark.parametrize("min_partidas", [1, 3, 45])
+def test_top_igual_a_ordenar_o_dataframe(h2h_stats, ordenar_por, min_partidas):
+    confrontos = ConfrontosH2H(h2h_stats)
+    esperado = _ordenado(h2h_stats, ordenar_por, min_partidas)
+
+    assert confrontos.contar(min_partidas) == len(esperado)
+    assert_quadros_iguais(confrontos.top(None, ordenar_por, min_partidas), esperado)
+    assert_quadros_iguais(confrontos.top(10, ordenar_por, min_partidas), esperado.head(10))
+
+@pytest.mark.parametrize("tamanho", [1, 7, 25])
+def test_paginas_sao_fatias_da_ordem(h2h_stats, tamanho):
+    confrontos = ConfrontosH2H(h2h_stats)
+    for ordenar_por in ORDENACOES_H2H:
+        esperado = _ordenado(h2h_stats, ordenar_por, min_partidas=2)
+        paginas = -(-len(esperado) // tamanho)
+        for numero in range(1, paginas + 2):
+            inicio = (numero - 1) * tamanho
+            assert_quadros_iguais(confrontos.pagina(numero, tamanho, ordenar_por, min_partidas=2),
+                                  esperado.iloc[inicio:inicio + tamanho])
+
+def test_confrontos_de_uma_composicao(h2h_stats):
+    confrontos = ConfrontosH2H(h2h_stats)
+    nossas = sorted(h2h_stats['nossa_composicao'].astype(str).unique())
+    assert confrontos.nossas_composicoes() == nossas
+    for nossa in nossas:
+        for min_partidas in (1, 3):
+            esperado = _ordenado(h2h_stats[h2h_stats['nossa_composicao'].astype(str) == nossa], 'score', min_partidas)
+            assert_quadros_iguais(confrontos.da_composicao(nossa, min_partidas), esperado)
+    assert confrontos.da_composicao("Composição que não existe").empty
+
+def test_sem_confrontos():
+    confrontos = ConfrontosH2H(None)
+    assert len(confrontos) == 0 and confrontos.contar() == 0
+    assert confrontos.top(5).empty and confrontos.pagina(1, 10).empty
+    assert confrontos.nossas_composicoes() == []
@@ -0,0 +1,59 @@
+"""Ingestão incremental no histórico SQLite: partidas repetidas e planilhas sem colunas opcionais."""
+import io
+from contextlib import closing
+
+import pandas as pd
+import pytest
+
+from valdash.historico import abrir_historico, contagens_do_historico, ingerir_no_historico, partidas_do_historico, versao_historico
+from valdash.leitura import ler_partidas
+
+CABECALHO = ["Data do jogo", "Hora do jogo", "Time adversario", "Mapa jogado", "Placar final do jogo", "Placar lado CT",
+             "Placar lado TR", "Pistol CT", "Pistol TR", "Composicao", "Composicao adversaria"]
+NOSSA = "Jett, Sova, Omen, Killjoy, Skye"
+ADVERSARIA = "Raze, Fade, Viper, Cypher, Sage"
+
+
+def _linha(dia, hora, adversario="Time A", mapa="Ascent", placar="13-7"):
+    return [f"2024-03-{dia:02d}", hora, adversario, mapa, placar, "7-5", "6-2", "win", "lose", NOSSA, ADVERSARIA]
+
+def _ler(linhas, sem_colunas=()):
+    csv = pd.DataFrame(linhas, columns=CABECALHO).drop(columns=list(sem_colunas)).to_csv(index=False)
+    return ler_partidas(io.BytesIO(csv.encode("utf-8")), "partidas.csv")
+
+@pytest.fixture
+def conexao(tmp_path):
+    with closing(abrir_historico(str(tmp_path / "historico.sqlite"))) as conexao:
+        yield conexao
+
+
+def test_reingerir_o_mesmo_arquivo_nao_acrescenta_nada(conexao):
+    df = _ler([_linha(1, "18:00"), _linha(1, "20:00"), _linha(2, "18:00", mapa="Bind")])
+
+    assert ingerir_no_historico(conexao, df) == 3
+    assert ingerir_no_historico(conexao, df) == 0
+    assert versao_historico(conexao) == 3
+
+def test_arquivos_sobrepostos_acrescentam_so_as_partidas_novas(conexao):
+    primeiro = _ler([_linha(1, "18:00"), _linha(2, "18:00"), _linha(3, "18:00", placar="5-13")])
+    segundo = _ler([_linha(2, "18:00"), _linha(3, "18:00", placar="5-13"), _linha(4, "18:00"), _linha(5, "18:00", mapa="Bind")])
+
+    assert ingerir_no_historico(conexao, primeiro) == 3
+    assert ingerir_no_historico(conexao, segundo) == 2
+    totais = contagens_do_historico(conexao)['totais'].set_index('mapa')
+    assert totais.loc['Ascent', 'total_partidas'] == 4
+    assert totais.loc['Ascent', 'vitorias_partida'] == 3
+    assert totais.loc['Bind', 'total_partidas'] == 1
+
+@pytest.mark.parametrize("sem_colunas", [("Hora do jogo",), ("Data do jogo", "Hora do jogo", "Time adversario")])
+def test_ingere_planilha_sem_colunas_opcionais(conexao, sem_colunas):
+    # Sem data ou hora, partidas diferentes contra o mesmo adversário no mesmo mapa não se fundem
+    linhas = [_linha(1, "18:00"), _linha(1, "20:00", placar="10-13"), _linha(2, "18:00"), _linha(3, "18:00", mapa="Bind")]
+    df = _ler(linhas, sem_colunas)
+
+    assert ingerir_no_historico(conexao, df) == 4
+    assert ingerir_no_historico(conexao, df) == 0
+    partidas = partidas_do_historico(conexao)
+    assert len(partidas) == 4
+    assert partidas['hora_jogo'].isna().all()
+    assert partidas['data_jogo'].notna().all() == ("Data do jogo" not in sem_colunas)
@@ -0,0 +1,48 @@
+"""Instrumentação: registro descartável sem execução ativa e pico de memória com execuções simultâneas."""
+import tracemalloc
+
+from valdash.instrumentacao import Instrumentacao, etapa, usar_instrumentacao
+
+
+def _medir(instrumentacao, nome):
+    with instrumentacao.etapa(nome) as registro:
+        bytearray(4 * 1024 * 1024)
+    return registro
+
+
+def test_sem_instrumentacao_cada_etapa_recebe_um_registro_novo():
+    usar_instrumentacao(None)
+    with etapa("a") as registro:
+        registro['linhas'] = 10
+    with etapa("b") as outro:
+        assert outro == {}
+    assert outro is not registro
+
+def test_pico_so_com_uma_execucao_medindo_memoria():
+    assert not tracemalloc.is_tracing()
+    primeira, segunda = Instrumentacao(), Instrumentacao()
+    primeira.iniciar()
+    try:
+        assert _medir(primeira, "sozinha")['pico_mb'] >= 4
+
+        # Outra execução começa no meio da etapa: o pico incluiria as alocações dela
+        with primeira.etapa("interrompida") as registro:
+            segunda.iniciar()
+        assert registro['pico_mb'] is None and registro['tempo_ms'] is not None
+        assert _medir(primeira, "simultanea")['pico_mb'] is None
+        assert _medir(segunda, "simultanea")['pico_mb'] is None
+
+        segunda.encerrar()
+        assert tracemalloc.is_tracing()
+        assert _medir(primeira, "de_novo_sozinha")['pico_mb'] >= 4
+    finally:
+        primeira.encerrar()
+        segunda.encerrar()
+    assert not tracemalloc.is_tracing()
+
+def test_sem_medir_memoria_nao_liga_o_tracemalloc():
+    instrumentacao = Instrumentacao(medir_memoria=False)
+    instrumentacao.iniciar()
+    assert not tracemalloc.is_tracing()
+    assert _medir(instrumentacao, "etapa")['pico_mb'] is None
+    instrumentacao.encerrar()
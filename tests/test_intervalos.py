@@ -0,0 +1,43 @@
+"""Intervalos de Wilson em valores conhecidos e o bootstrap com semente fixa."""
+import numpy as np
+import pytest
+
+from valdash.intervalos import intervalo_bootstrap, intervalo_wilson, score_ranking
+
+
+@pytest.mark.parametrize("vitorias, partidas, inferior, superior", [
+    (5, 10, 23.6593, 76.3407),
+    (10, 10, 72.2467, 100.0),
+    (0, 10, 0.0, 27.7533),
+    (1, 1, 20.6549, 100.0),
+    (30, 40, 59.8060, 85.8129),
+])
+def test_wilson_em_valores_conhecidos(vitorias, partidas, inferior, superior):
+    obtido_inferior, obtido_superior = intervalo_wilson([vitorias], [partidas])
+    assert obtido_inferior[0] == pytest.approx(inferior, abs=1e-4)
+    assert obtido_superior[0] == pytest.approx(superior, abs=1e-4)
+    assert score_ranking([vitorias], [partidas])[0] == pytest.approx(inferior, abs=1e-4)
+
+def test_grupo_sem_partidas():
+    inferior, superior = intervalo_wilson([0, 5], [0, 10])
+    assert np.isnan(inferior[0]) and np.isnan(superior[0])
+    assert score_ranking([0, 5], [0, 10])[0] == 0.0
+
+    inferior, superior = intervalo_bootstrap([0, 5], [0, 10])
+    assert np.isnan(inferior[0]) and np.isnan(superior[0])
+    assert not np.isnan(inferior[1])
+
+def test_amostra_maior_ganha_no_score():
+    # 1-0 (100%) fica atrás de 30 em 40 (75%): o limite inferior pesa a incerteza
+    assert score_ranking([1], [1])[0] < score_ranking([30], [40])[0]
+
+def test_bootstrap_com_semente_e_deterministico():
+    vitorias, partidas = np.array([5, 0, 10, 7, 30, 5]), np.array([10, 0, 10, 20, 40, 10])
+    primeiro = intervalo_bootstrap(vitorias, partidas, semente=7)
+    segundo = intervalo_bootstrap(vitorias, partidas, semente=7)
+    np.testing.assert_array_equal(primeiro[0], segundo[0])
+    np.testing.assert_array_equal(primeiro[1], segundo[1])
+    # Mesmo placar, mesmo intervalo; 10-10 só pode reamostrar vitórias
+    assert (primeiro[0][0], primeiro[1][0]) == (primeiro[0][5], primeiro[1][5])
+    assert (primeiro[0][2], primeiro[1][2]) == (100.0, 100.0)
+    assert np.all(primeiro[0][[0, 3, 4]] <= primeiro[1][[0, 3, 4]])
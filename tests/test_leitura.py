@@ -0,0 +1,35 @@
+"""Leitura de planilhas sem as colunas opcionais (data, hora e adversário)."""
+import io
+
+import pytest
+
+from valdash.leitura import contar_csv_em_blocos, ler_partidas, resumir_validacao
+
+# Só as colunas obrigatórias: mapa, placares, pistols e composições
+CSV_SEM_OPCIONAIS = """Mapa jogado,Placar final do jogo,Placar lado CT,Placar lado TR,Pistol CT,Pistol TR,Composicao,Composicao adversaria
+Ascent,13-7,7-5,6-2,Ganhou,Perdeu,"Jett, Sova, Omen, Killjoy, Skye","Raze, Fade, Viper, Cypher, Sage"
+Bind,10-13,5-7,5-6,Perdeu,Ganhou,"Raze, Brimstone, Viper, Skye, Cypher","Jett, Sova, Omen, Killjoy, Skye"
+Ascent,{placar_3},6-6,7-3,Ganhou,Ganhou,"Jett, Sova, Omen, Killjoy, Skye","Raze, Fade, Viper, Cypher, Sage"
+"""
+
+
+@pytest.mark.parametrize("placar_3, invalidas", [("13-9", 0), ("abc", 1)])
+def test_resumo_sem_colunas_opcionais(placar_3, invalidas):
+    conteudo = CSV_SEM_OPCIONAIS.format(placar_3=placar_3).encode("utf-8")
+    df = ler_partidas(io.BytesIO(conteudo), "partidas.csv")
+    resumo = resumir_validacao(df)
+
+    assert resumo['linhas'] == 3
+    assert resumo['linhas_invalidas'] == invalidas
+    assert len(resumo['amostra_invalidas']) == invalidas
+    assert not {'data_jogo', 'hora_jogo', 'time_adversario'} & set(resumo['amostra_invalidas'].columns)
+
+
+def test_leitura_em_blocos_sem_colunas_opcionais():
+    conteudo = CSV_SEM_OPCIONAIS.format(placar_3="abc").encode("utf-8")
+    contagens, resumo = contar_csv_em_blocos(io.BytesIO(conteudo), tamanho_bloco=1)
+
+    assert contagens is not None
+    assert resumo['linhas'] == 3
+    assert resumo['linhas_invalidas'] == 1
+    assert list(resumo['amostra_invalidas']['mapa']) == ['Ascent']
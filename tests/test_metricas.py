@@ -0,0 +1,55 @@
+"""Métricas agrupadas (uma passada para todos os mapas) contra calcular_metricas em cada fatia."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from valdash.metricas import calcular_metricas, calcular_metricas_por_mapa, contar_partidas, metricas_de_contagens, somar_contagens
+
+TAXAS = ['win_rate_geral_partidas_nosso_time', 'win_rate_ct_rounds', 'win_rate_tr_rounds', 'win_rate_pistol_ct', 'win_rate_pistol_tr']
+TOTAIS = ['total_partidas_jogadas_nosso_time', 'vitorias_partidas_nosso_time']
+# O bootstrap sorteia os placares distintos de cada chamada juntos: os valores dependem do conjunto
+# de grupos e não se comparam entre a passada agrupada e a fatia
+COLUNAS_BOOTSTRAP = ['ic_bootstrap_inferior', 'ic_bootstrap_superior']
+
+
+def _ordenada(tabela, chaves):
+    tabela = tabela.drop(columns=[c for c in COLUNAS_BOOTSTRAP if c in tabela.columns])
+    return tabela.assign(**{c: tabela[c].astype(str) for c in chaves}).sort_values(chaves).reset_index(drop=True)
+
+def assert_metricas_iguais(obtidas, esperadas):
+    for chave in TAXAS + TOTAIS:
+        assert obtidas[chave] == pytest.approx(esperadas[chave]), chave
+    for taxa in TAXAS:
+        assert obtidas['intervalos_taxas'][taxa] == pytest.approx(esperadas['intervalos_taxas'][taxa]), taxa
+
+    chaves_comp = ['composicao', 'tipo']
+    pd.testing.assert_frame_equal(_ordenada(obtidas['composicao_stats'], chaves_comp),
+                                  _ordenada(esperadas['composicao_stats'], chaves_comp), check_dtype=False, check_categorical=False)
+    chaves_h2h = ['nossa_composicao', 'composicao_adversaria']
+    pd.testing.assert_frame_equal(_ordenada(obtidas['h2h_stats'], chaves_h2h),
+                                  _ordenada(esperadas['h2h_stats'], chaves_h2h), check_dtype=False, check_categorical=False)
+
+    melhor, melhor_esperada = obtidas['melhor_nossa_composicao_info'], esperadas['melhor_nossa_composicao_info']
+    assert melhor['composicao'] == melhor_esperada['composicao']
+    assert melhor['partidas_jogadas'] == melhor_esperada['partidas_jogadas']
+    assert melhor['score_ranking'] == pytest.approx(melhor_esperada['score_ranking'])
+
+
+def test_passada_agrupada_igual_a_cada_fatia(partidas):
+    metricas_globais, por_mapa = calcular_metricas_por_mapa(partidas, "geral")
+
+    assert_metricas_iguais(metricas_globais, calcular_metricas(partidas, "geral"))
+    assert set(por_mapa) == set(partidas['mapa'].dropna().unique())
+    for mapa, metricas in por_mapa.items():
+        assert_metricas_iguais(metricas, calcular_metricas(partidas[partidas['mapa'] == mapa], mapa))
+
+def test_somar_contagens_de_blocos_igual_ao_arquivo_inteiro(partidas):
+    blocos = np.array_split(np.arange(len(partidas)), 4)
+    somadas = somar_contagens([contar_partidas(partidas.iloc[linhas]) for linhas in blocos])
+    metricas_globais, por_mapa = metricas_de_contagens(somadas, "geral")
+
+    esperadas_globais, esperadas_por_mapa = calcular_metricas_por_mapa(partidas, "geral")
+    assert_metricas_iguais(metricas_globais, esperadas_globais)
+    assert set(por_mapa) == set(esperadas_por_mapa)
+    for mapa, metricas in por_mapa.items():
+        assert_metricas_iguais(metricas, calcular_metricas(partidas[partidas['mapa'] == mapa], mapa))
@@ -0,0 +1,51 @@
+"""Métricas por período (somas acumuladas) contra contar_partidas no DataFrame filtrado pelas datas."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from valdash.metricas import COLUNAS_CONTAGEM_TOTAIS, contar_partidas
+from valdash.periodos import NOME_GLOBAL, TAXAS_PERIODO, IndiceTemporal, instante_das_partidas
+
+
+@pytest.fixture(scope="module")
+def indice(partidas):
+    return IndiceTemporal(partidas)
+
+def _periodos(partidas):
+    instantes = instante_das_partidas(partidas).sort_values()
+    # Extremos exatamente no instante de uma partida, para conferir que o intervalo é fechado
+    return [
+        (instantes.iloc[0], instantes.iloc[-1]),
+        (pd.Timestamp("2024-06-01"), pd.Timestamp("2024-06-30 23:59:59")),
+        (pd.Timestamp("2025-01-15 12:00"), pd.Timestamp("2025-09-01")),
+        (instantes.iloc[100], instantes.iloc[250]),
+        (instantes.iloc[500], instantes.iloc[500]),
+        (pd.Timestamp("2030-01-01"), pd.Timestamp("2030-12-31")),
+    ]
+
+
+def test_periodo_igual_a_contar_partidas_no_recorte(partidas, indice):
+    instantes = instante_das_partidas(partidas)
+    for inicio, fim in _periodos(partidas):
+        obtidas = indice.metricas_periodo(inicio, fim)
+        totais = contar_partidas(partidas[instantes.between(inicio, fim)])['totais']
+        esperadas = totais.assign(mapa=totais['mapa'].astype(str)).set_index('mapa')[COLUNAS_CONTAGEM_TOTAIS]
+
+        por_mapa = obtidas.drop(index=NOME_GLOBAL)[COLUNAS_CONTAGEM_TOTAIS]
+        por_mapa = por_mapa[por_mapa['total_partidas'] > 0]
+        pd.testing.assert_frame_equal(por_mapa.sort_index(), esperadas.sort_index(), check_dtype=False)
+        assert obtidas.loc[NOME_GLOBAL, COLUNAS_CONTAGEM_TOTAIS].tolist() == esperadas.sum().tolist(), (inicio, fim)
+
+        for taxa, coluna in TAXAS_PERIODO.items():
+            partidas_periodo = obtidas['total_partidas'].replace(0, np.nan)
+            pd.testing.assert_series_equal(obtidas[taxa], obtidas[coluna] / partidas_periodo * 100, check_names=False)
+
+def test_periodo_de_um_instante_e_periodo_sem_partidas(partidas, indice):
+    instantes = instante_das_partidas(partidas)
+    instante = instantes.sort_values().iloc[500]
+    obtidas = indice.metricas_periodo(instante, instante)
+    assert obtidas.loc[NOME_GLOBAL, 'total_partidas'] == (instantes == instante).sum()
+
+    vazio = indice.metricas_periodo(pd.Timestamp("2030-01-01"), pd.Timestamp("2030-12-31"))
+    assert (vazio['total_partidas'] == 0).all()
+    assert vazio[list(TAXAS_PERIODO)].isna().all().all()
@@ -0,0 +1,78 @@
+"""Leitura vetorizada dos placares e tipagem do DataFrame de partidas."""
+import pandas as pd
+
+from valdash.processamento import PLACAR_MAXIMO, extrair_scores, extrair_scores_colunas, processar_dados
+
+
+def _partidas(placares_finais):
+    n = len(placares_finais)
+    return pd.DataFrame({
+        'Mapa jogado': ['Ascent'] * n,
+        'Placar final do jogo': placares_finais,
+        'Placar lado CT': ['7-5'] * n,
+        'Placar lado TR': ['6-2'] * n,
+        'Pistol CT': ['win'] * n,
+        'Pistol TR': ['lose'] * n,
+        'Composicao': ['Jett, Sova, Omen, Killjoy, Skye'] * n,
+        'Composicao adversaria': ['Raze, Fade, Viper, Cypher, Sage'] * n,
+    })
+
+
+def test_placar_acima_do_int16_fica_invalido():
+    maximo = f"{PLACAR_MAXIMO}-0"
+    df = processar_dados(_partidas(['99999-1', '40000-2', '99999999999999999999-1', '1-70000', maximo, '13-7']))
+
+    assert df['placar_final_valido'].tolist() == [False, False, False, False, True, True]
+    assert df['placares_validos'].tolist() == [False, False, False, False, True, True]
+    assert df['nosso_time_venceu_partida'].tolist() == [False, False, False, False, True, True]
+    assert df['placar_final_nosso'].isna().tolist() == [True, True, True, True, False, False]
+    assert df['placar_final_nosso'].iloc[4] == PLACAR_MAXIMO
+    assert str(df['placar_final_nosso'].dtype) == 'Int16'
+
+
+# --- Equivalência com a leitura linha a linha (extrair_scores) ---
+PLACARES_VARIADOS = [
+    '13-7', '7-13', '13-13', ' 13 - 11 ', '+13-+5', '13 -+2', '0-0', '\t9-13\n',
+    '13', '13-', '-13', '13--7', '-1-13', 'a-b', '13-7-1', '', ' ', None, float('nan'), '13:7', '1 3-7',
+]
+
+def _partidas_por_linha(df):
+    """Placares e resultados como o processamento antigo calculava, uma linha por vez."""
+    esperado = pd.DataFrame(index=df.index)
+    for coluna, (nosso, adv) in {'Placar final do jogo': ('placar_final_nosso', 'placar_final_adv'),
+                                 'Placar lado CT': ('placar_ct_nosso_como_ct', 'placar_ct_adv_como_tr'),
+                                 'Placar lado TR': ('placar_tr_nosso_como_tr', 'placar_tr_adv_como_ct')}.items():
+        scores = df[coluna].apply(extrair_scores)
+        esperado[nosso] = pd.array([s[0] for s in scores], dtype='Int64')
+        esperado[adv] = pd.array([s[1] for s in scores], dtype='Int64')
+    for resultado, (nosso, adv) in {'nosso_time_venceu_partida': ('placar_final_nosso', 'placar_final_adv'),
+                                    'nosso_time_venceu_lado_ct': ('placar_ct_nosso_como_ct', 'placar_ct_adv_como_tr'),
+                                    'nosso_time_venceu_lado_tr': ('placar_tr_nosso_como_tr', 'placar_tr_adv_como_ct')}.items():
+        esperado[resultado] = (esperado[nosso].notna() & esperado[adv].notna() & (esperado[nosso] > esperado[adv])).fillna(False).astype(bool)
+    return esperado
+
+def test_placares_vetorizados_iguais_aos_da_leitura_por_linha():
+    n = len(PLACARES_VARIADOS)
+    df = _partidas([PLACARES_VARIADOS[i] for i in range(n)])
+    # Cada coluna de placar recebe os casos em outra ordem, para misturar válidos e inválidos por linha
+    df['Placar lado CT'] = [PLACARES_VARIADOS[(i + 3) % n] for i in range(n)]
+    df['Placar lado TR'] = [PLACARES_VARIADOS[(i + 7) % n] for i in range(n)]
+    esperado = _partidas_por_linha(df)
+
+    processado = processar_dados(df.copy())
+    for coluna in esperado.columns:
+        pd.testing.assert_series_equal(processado[coluna].astype(esperado[coluna].dtype), esperado[coluna], check_names=False)
+
+    scores, validos = extrair_scores_colunas(df, ['Placar final do jogo', 'Placar lado CT', 'Placar lado TR'])
+    for coluna in validos.columns:
+        nosso, adv = scores[coluna]
+        assert validos[coluna].tolist() == (nosso.notna() & adv.notna()).tolist()
+        assert validos[coluna].tolist() == [extrair_scores(valor)[0] is not None for valor in df[coluna]]
+    assert processado['placares_validos'].tolist() == validos.all(axis=1).tolist()
+
+def test_ordem_adversario_primeiro():
+    df = pd.DataFrame({'placar': ['13-7', ' 2 - 13', 'x']})
+    scores, _ = extrair_scores_colunas(df, ['placar'], nosso_time_primeiro=False)
+    nosso, adv = scores['placar']
+    assert nosso.tolist() == [7, 13, pd.NA]
+    assert adv.tolist() == [13, 2, pd.NA]
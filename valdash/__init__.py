@@ -0,0 +1,52 @@
+"""Núcleo do dashboard de partidas (processamento, métricas, intervalos de confiança, períodos, cubo de filtros, histórico e relatório PDF), sem Streamlit.
+
+A interface fica em generate_valdash_app.py; a geração em lote de relatórios em valdash.cli e a API
+HTTP local em valdash.servidor.
+
+`import valdash` não carrega nada pesado: cada nome abaixo importa seu submódulo (e com
+ele pandas, ou o ReportLab no caso do PDF) só no primeiro acesso.
+"""
+import importlib
+
+# Extensões aceitas pela leitura de arquivos (fica aqui para a tela de upload não precisar do pandas)
+EXTENSOES_SUPORTADAS = ["csv", "xlsx", "parquet"]
+
+_SUBMODULO_POR_NOME = {
+    'aplicar_esquema': 'processamento',
+    'extrair_scores': 'processamento',
+    'processar_dados': 'processamento',
+    'calcular_metricas': 'metricas',
+    'calcular_metricas_por_mapa': 'metricas',
+    'contar_partidas': 'metricas',
+    'metricas_de_contagens': 'metricas',
+    'montar_dashboard': 'metricas',
+    'montar_dashboard_de_contagens': 'metricas',
+    'somar_contagens': 'metricas',
+    'contar_csv_em_blocos': 'leitura',
+    'exportar_parquet': 'leitura',
+    'ler_partidas': 'leitura',
+    'abrir_historico': 'historico',
+    'contagens_do_historico': 'historico',
+    'ingerir_no_historico': 'historico',
+    'partidas_do_historico': 'historico',
+    'IndiceTemporal': 'periodos',
+    'CuboPartidas': 'cubo',
+    'ConfrontosH2H': 'h2h',
+    'sinergia_agentes': 'sinergia',
+    'intervalo_bootstrap': 'intervalos',
+    'intervalo_wilson': 'intervalos',
+    'score_ranking': 'intervalos',
+    'gerar_relatorio_pdf': 'relatorio_pdf',
+}
+
+__all__ = ['EXTENSOES_SUPORTADAS', *_SUBMODULO_POR_NOME]
+
+def __getattr__(nome):
+    if nome not in _SUBMODULO_POR_NOME:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    valor = getattr(importlib.import_module(f".{_SUBMODULO_POR_NOME[nome]}", __name__), nome)
+    globals()[nome] = valor
+    return valor
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,139 @@
+"""Armazém de resultados compartilhado entre sessões e threads de um mesmo processo.
+
+Guarda o que é caro de refazer (partidas processadas, métricas, índices, bytes do PDF) por
+chave (o hash do conteúdo do arquivo e o tipo do resultado), com limite de memória e
+remoção do menos usado recentemente (LRU). Quando várias threads pedem a mesma chave ao
+mesmo tempo (ex.: dois técnicos subindo o mesmo arquivo), só a primeira calcula; as outras
+esperam o resultado dela. Um erro no cálculo chega a todas e nada é guardado.
+"""
+import collections
+import sys
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+LIMITE_MB_PADRAO = 1024
+
+
+def estimar_bytes(valor, _vistos=None):
+    """Tamanho aproximado em memória de um resultado (DataFrames, arrays, bytes, dicts, listas e objetos simples)."""
+    vistos = set() if _vistos is None else _vistos
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    if isinstance(valor, (pd.DataFrame, pd.Series, pd.Index)):
+        return int(valor.memory_usage(deep=True).sum()) if isinstance(valor, pd.DataFrame) else int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, (bytes, bytearray, str)):
+        return sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(estimar_bytes(k, vistos) + estimar_bytes(v, vistos) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return sys.getsizeof(valor) + sum(estimar_bytes(item, vistos) for item in valor)
+    if hasattr(valor, '__dict__'):
+        return sys.getsizeof(valor) + estimar_bytes(vars(valor), vistos)
+    return sys.getsizeof(valor)
+
+
+class ArmazemCompartilhado:
+    """Cache LRU seguro entre threads, limitado a `limite_mb`, com um único cálculo por chave."""
+
+    def __init__(self, limite_mb=LIMITE_MB_PADRAO):
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self._entradas = collections.OrderedDict()  # chave -> (valor, bytes), do menos para o mais usado
+        self._em_calculo = {}  # chave -> Future de quem está calculando
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self.acertos = self.faltas = self.esperas = self.remocoes = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def __contains__(self, chave):
+        with self._trava:
+            return chave in self._entradas
+
+    def obter(self, chave, calcular):
+        """Valor da chave; na falta, `calcular()` é chamado (uma vez, mesmo com pedidos simultâneos) e o resultado guardado."""
+        with self._trava:
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return self._entradas[chave][0]
+            futuro = self._em_calculo.get(chave)
+            calcula_aqui = futuro is None
+            if calcula_aqui:
+                futuro = self._em_calculo[chave] = Future()
+                self.faltas += 1
+            else:
+                self.esperas += 1
+        if not calcula_aqui:
+            return futuro.result()
+
+        try:
+            valor = calcular()
+        except BaseException as erro:
+            with self._trava:
+                del self._em_calculo[chave]
+            futuro.set_exception(erro)
+            raise
+        self._guardar(chave, valor)
+        with self._trava:
+            del self._em_calculo[chave]
+        futuro.set_result(valor)
+        return valor
+
+    def consultar(self, chave, padrao=None):
+        """Valor já guardado (sem calcular), ou `padrao`. Conta como acerto ou falta."""
+        with self._trava:
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return self._entradas[chave][0]
+            self.faltas += 1
+            return padrao
+
+    def guardar(self, chave, valor):
+        """Guarda (ou substitui) um valor calculado fora do armazém, ex.: os bytes de um PDF gerado em segundo plano."""
+        self._guardar(chave, valor)
+
+    def _guardar(self, chave, valor):
+        # O tamanho é estimado fora da trava; um valor maior que o limite inteiro não é guardado
+        tamanho = estimar_bytes(valor)
+        if tamanho > self.limite_bytes:
+            return
+        with self._trava:
+            if chave in self._entradas:
+                self._bytes -= self._entradas.pop(chave)[1]
+            self._entradas[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.limite_bytes:
+                _, (_, tamanho_removido) = self._entradas.popitem(last=False)
+                self._bytes -= tamanho_removido
+                self.remocoes += 1
+
+    def descartar(self, chave):
+        with self._trava:
+            if chave in self._entradas:
+                self._bytes -= self._entradas.pop(chave)[1]
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        """Acertos, faltas, esperas (pedidos que aguardaram o cálculo de outra thread), remoções, entradas e memória."""
+        with self._trava:
+            return {
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'esperas': self.esperas,
+                'remocoes': self.remocoes,
+                'entradas': len(self._entradas),
+                'memoria_mb': self._bytes / 1024 / 1024,
+                'limite_mb': self.limite_bytes / 1024 / 1024,
+            }
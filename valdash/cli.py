@@ -0,0 +1,136 @@
+"""Geração em lote de relatórios PDF, sem navegador nem Streamlit.
+
+Processa todos os arquivos de partidas de uma pasta em paralelo (um processo por arquivo)
+e grava um PDF por arquivo, com o nome do arquivo de origem mais ".pdf" (partidas.csv.pdf):
+
+    python -m valdash.cli pasta_dos_rosters --saida relatorios --processos 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import EXTENSOES_SUPORTADAS
+from .instrumentacao import Instrumentacao, anexar_jsonl, etapa, usar_instrumentacao
+
+
+def listar_arquivos_partidas(pasta):
+    """Arquivos da pasta com extensão suportada, em ordem alfabética."""
+    return sorted(
+        os.path.join(pasta, nome) for nome in os.listdir(pasta)
+        if os.path.splitext(nome)[1].lower().lstrip('.') in EXTENSOES_SUPORTADAS and os.path.isfile(os.path.join(pasta, nome))
+    )
+
+def caminho_relatorio(caminho, pasta_saida):
+    """PDF de um arquivo de partidas. A extensão de origem fica no nome: a.csv e a.xlsx não gravam no mesmo a.pdf."""
+    return os.path.join(pasta_saida, os.path.basename(caminho) + ".pdf")
+
+def gerar_relatorio_arquivo(caminho, pasta_saida, medir_memoria=False, opcoes_pdf=None):
+    """Lê, calcula e gera o PDF de um arquivo. Roda em um processo de trabalho.
+
+    `opcoes_pdf` vai como argumentos nomeados para gerar_relatorio_pdf (ex.: limite_h2h).
+
+    Retorna um dict com o arquivo, o PDF gerado (ou None), o número de linhas, os tempos de cada
+    etapa, os registros da instrumentação e o erro, se houver.
+    """
+    # Importados no processo de trabalho: o processo principal só distribui os arquivos
+    from .leitura import ler_partidas
+    from .metricas import montar_dashboard
+    from .relatorio_pdf import gerar_relatorio_pdf
+
+    resultado = {'arquivo': caminho, 'pdf': None, 'linhas': 0, 'tempos': {}, 'registros': [], 'erro': None}
+    instrumentacao = Instrumentacao(medir_memoria=medir_memoria, execucao=os.path.basename(caminho))
+    usar_instrumentacao(instrumentacao)
+    inicio = time.perf_counter()
+    try:
+        df_processado = ler_partidas(caminho, caminho)
+        if df_processado is None:
+            resultado['erro'] = "arquivo sem linhas"
+        else:
+            resultado['linhas'] = len(df_processado)
+            mapas_unicos, metricas_globais, metricas_detalhadas_por_mapa, df_map_ranking = montar_dashboard(df_processado)
+            with etapa("gerar_relatorio_pdf"):
+                pdf = gerar_relatorio_pdf(metricas_globais, df_map_ranking, metricas_detalhadas_por_mapa, mapas_unicos, **(opcoes_pdf or {}))
+            caminho_pdf = caminho_relatorio(caminho, pasta_saida)
+            with etapa("gravar_pdf"), open(caminho_pdf, "wb") as arquivo_pdf:
+                arquivo_pdf.write(pdf)
+            resultado['pdf'] = caminho_pdf
+    except Exception as e:
+        resultado['erro'] = f"{type(e).__name__}: {e}"
+    finally:
+        usar_instrumentacao(None)
+    resultado['tempos'] = {r['etapa']: r['tempo_ms'] / 1000 for r in instrumentacao.registros if r['nivel'] == 0 and r['tempo_ms'] is not None}
+    resultado['tempos']['total'] = time.perf_counter() - inicio
+    resultado['registros'] = instrumentacao.registros
+    return resultado
+
+def formatar_resultado(resultado):
+    nome = os.path.basename(resultado['arquivo'])
+    tempos = " | ".join(f"{etapa} {segundos:.2f}s" for etapa, segundos in resultado['tempos'].items())
+    if resultado['erro']:
+        return f"ERRO {nome}: {resultado['erro']} ({tempos})"
+    return f"ok   {nome}: {resultado['linhas']} linhas | {tempos} -> {resultado['pdf']}"
+
+def gerar_relatorios(arquivos, pasta_saida, processos=None, ao_concluir=None, medir_memoria=False, opcoes_pdf=None):
+    """Gera os relatórios dos arquivos em um pool de processos. Retorna os resultados na ordem de `arquivos`.
+
+    `ao_concluir(resultado)` é chamado à medida que cada arquivo termina.
+    """
+    os.makedirs(pasta_saida, exist_ok=True)
+    processos = min(processos or os.cpu_count() or 1, len(arquivos)) or 1
+    resultados = {}
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        # Maiores primeiro: um arquivo grande no fim da fila deixaria os outros processos ociosos
+        por_tamanho = sorted(arquivos, key=os.path.getsize, reverse=True)
+        futuros = {executor.submit(gerar_relatorio_arquivo, caminho, pasta_saida, medir_memoria, opcoes_pdf): caminho for caminho in por_tamanho}
+        for futuro in as_completed(futuros):
+            resultado = futuro.result()
+            resultados[futuros[futuro]] = resultado
+            if ao_concluir:
+                ao_concluir(resultado)
+    return [resultados[caminho] for caminho in arquivos]
+
+def main(argv=None):
+    from .h2h import ORDENACOES_H2H
+    parser = argparse.ArgumentParser(prog="python -m valdash.cli", description="Gera um relatório PDF para cada arquivo de partidas de uma pasta.")
+    parser.add_argument("pasta", help=f"pasta com os arquivos de partidas ({', '.join(EXTENSOES_SUPORTADAS)})")
+    parser.add_argument("--saida", "-o", default=None, help="pasta dos PDFs (padrão: <pasta>/relatorios)")
+    parser.add_argument("--processos", "-j", type=int, default=None, help="processos em paralelo (padrão: número de núcleos)")
+    parser.add_argument("--diagnostico", metavar="ARQUIVO.jsonl", default=None, help="acrescenta os registros de cada etapa (JSON lines)")
+    parser.add_argument("--memoria", action="store_true", help="mede também o pico de memória de cada etapa (mais lento)")
+    parser.add_argument("--h2h-limite", type=int, default=None, metavar="N", help="no máximo N confrontos H2H por mapa no PDF (padrão: todos)")
+    parser.add_argument("--h2h-min-partidas", type=int, default=None, metavar="N", help="só confrontos H2H com pelo menos N partidas")
+    parser.add_argument("--h2h-ordem", choices=list(ORDENACOES_H2H), default=None,
+                        help="ordenação dos confrontos H2H no PDF (padrão: score, o limite inferior do IC 95%% de Wilson)")
+    args = parser.parse_args(argv)
+
+    arquivos = listar_arquivos_partidas(args.pasta)
+    if not arquivos:
+        print(f"Nenhum arquivo de partidas em {args.pasta}", file=sys.stderr)
+        return 1
+    pasta_saida = args.saida or os.path.join(args.pasta, "relatorios")
+
+    opcoes_pdf = {}
+    if args.h2h_limite is not None:
+        opcoes_pdf['limite_h2h'] = args.h2h_limite
+    if args.h2h_min_partidas is not None:
+        opcoes_pdf['min_partidas_h2h'] = args.h2h_min_partidas
+    if args.h2h_ordem is not None:
+        opcoes_pdf['ordenar_h2h'] = args.h2h_ordem
+
+    inicio = time.perf_counter()
+    resultados = gerar_relatorios(arquivos, pasta_saida, args.processos, ao_concluir=lambda r: print(formatar_resultado(r), flush=True),
+                                  medir_memoria=args.memoria, opcoes_pdf=opcoes_pdf)
+    total = time.perf_counter() - inicio
+    erros = sum(1 for r in resultados if r['erro'])
+    soma_tempos = sum(r['tempos'].get('total', 0) for r in resultados)
+    print(f"{len(resultados) - erros}/{len(resultados)} relatórios em {total:.2f}s "
+          f"(soma dos tempos por arquivo: {soma_tempos:.2f}s)")
+    if args.diagnostico:
+        anexar_jsonl(args.diagnostico, [registro for resultado in resultados for registro in resultado['registros']])
+    return 1 if erros else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
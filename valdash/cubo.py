@@ -0,0 +1,87 @@
+"""Cubo de contagens pré-agregadas para filtrar por mapa, adversário, composições, lados e pistols.
+
+O cubo guarda uma linha por combinação observada das dimensões, com as mesmas contagens de
+_agregar_totais. Como todas as contagens são somas, qualquer filtro sobre as dimensões é
+respondido somando as células que passam nele, no formato de contar_partidas; daí em diante
+as métricas saem de metricas_de_contagens, sem voltar às partidas. O número de células é
+limitado pelas combinações distintas, não pelo número de partidas.
+"""
+import pandas as pd
+
+from .metricas import COLUNAS_CONTAGEM_COMPOSICOES, COLUNAS_CONTAGEM_H2H, COLUNAS_CONTAGEM_TOTAIS, _agregar_totais, _somar_por_chave
+
+DIMENSOES_CUBO = [
+    'mapa', 'time_adversario', 'composicao_nossa_clean', 'composicao_adversaria_clean',
+    'nosso_time_venceu_lado_ct', 'nosso_time_venceu_lado_tr', 'pistol_ct_resultado', 'pistol_tr_resultado',
+]
+# Dimensões que podem agrupar as métricas (o 'coluna_grupo' de metricas_de_contagens)
+DIMENSOES_AGRUPAMENTO = ['mapa', 'time_adversario']
+
+
+class CuboPartidas:
+    """Contagens das partidas de um dataset por combinação de DIMENSOES_CUBO."""
+
+    def __init__(self, df_processado):
+        self.partidas = len(df_processado)
+        if df_processado.empty:
+            self.celulas = pd.DataFrame(columns=DIMENSOES_CUBO + COLUNAS_CONTAGEM_TOTAIS)
+            return
+        celulas = _agregar_totais(df_processado, DIMENSOES_CUBO).reset_index()
+        # As dimensões viram categorias: filtrar compara códigos, não textos
+        self.celulas = celulas.astype({dimensao: 'category' for dimensao in DIMENSOES_CUBO})
+
+    def __len__(self):
+        return len(self.celulas)
+
+    def valores(self, dimensao):
+        """Valores presentes em uma dimensão (sem ausentes), em ordem."""
+        if self.celulas.empty:
+            return []
+        return sorted(self.celulas[dimensao].dropna().unique().tolist())
+
+    def filtrar(self, filtros=None):
+        """Células que passam em todos os filtros ({dimensão: valores aceitos}; vazio = sem filtro)."""
+        selecao = pd.Series(True, index=self.celulas.index)
+        for dimensao, aceitos in (filtros or {}).items():
+            if aceitos:
+                selecao &= self.celulas[dimensao].isin(list(aceitos))
+        return self.celulas[selecao]
+
+    def contagens(self, filtros=None, coluna_grupo='mapa'):
+        """Contagens das partidas filtradas, agrupadas por `coluna_grupo`, no formato de contar_partidas."""
+        celulas = self.filtrar(filtros)
+        totais = celulas.groupby(coluna_grupo, observed=True, dropna=False)[COLUNAS_CONTAGEM_TOTAIS].sum().reset_index()
+        return {
+            'totais': totais,
+            'composicoes': _somar_composicoes(celulas, coluna_grupo),
+            'h2h': _somar_h2h(celulas, coluna_grupo),
+        }
+
+    def memoria_mb(self):
+        return self.celulas.memory_usage(deep=True).sum() / 1024 / 1024
+
+
+def _somar_composicoes(celulas, coluna_grupo):
+    # Soma cada lado sobre as categorias e só junta os resultados (poucas linhas) no final.
+    # Vitória da composição adversária = partida que perdemos.
+    partes = []
+    for coluna, tipo in [('composicao_nossa_clean', 'Nossa'), ('composicao_adversaria_clean', 'Adversária')]:
+        somas = celulas[celulas[coluna].notna()].groupby([coluna_grupo, coluna], observed=True, dropna=False)[['vitorias_partida', 'total_partidas']].sum()
+        ganhas = somas['vitorias_partida'] if tipo == 'Nossa' else somas['total_partidas'] - somas['vitorias_partida']
+        partes.append(pd.DataFrame({'tipo': tipo, 'total_partidas_ganhas': ganhas, 'total_partidas_jogadas': somas['total_partidas']})
+                      .rename_axis([coluna_grupo, 'composicao']).reset_index())
+    comp_contagens = pd.concat(partes, ignore_index=True)
+    if comp_contagens.empty:
+        return pd.DataFrame(columns=[coluna_grupo, 'composicao', 'tipo'] + COLUNAS_CONTAGEM_COMPOSICOES)
+    # Mesma ordem de _contar_composicoes (grupo, composição, tipo), da qual depende o desempate da melhor composição
+    comp_contagens['composicao'] = comp_contagens['composicao'].astype(str)
+    return _somar_por_chave(comp_contagens, COLUNAS_CONTAGEM_COMPOSICOES)
+
+def _somar_h2h(celulas, coluna_grupo):
+    celulas = celulas[celulas['composicao_nossa_clean'].notna() & celulas['composicao_adversaria_clean'].notna()]
+    if celulas.empty:
+        return pd.DataFrame(columns=[coluna_grupo, 'nossa_composicao', 'composicao_adversaria'] + COLUNAS_CONTAGEM_H2H)
+    return celulas.groupby([coluna_grupo, 'composicao_nossa_clean', 'composicao_adversaria_clean'], observed=True, dropna=False).agg(
+        total_vitorias_nossa_comp=('vitorias_partida', 'sum'),
+        total_partidas_disputadas=('total_partidas', 'sum'),
+    ).reset_index().rename(columns={'composicao_nossa_clean': 'nossa_composicao', 'composicao_adversaria_clean': 'composicao_adversaria'})
@@ -0,0 +1,97 @@
+"""Confrontos H2H (nossa composição x composição adversária) para consultas de top-k e paginação.
+
+Os pares ficam como uma matriz esparsa: códigos das duas composições (em um vocabulário
+comum) e as contagens de cada par. As ordenações são calculadas uma vez; uma consulta com
+mínimo de partidas só filtra a ordem já pronta (e guarda o resultado), sem reordenar.
+"""
+import numpy as np
+import pandas as pd
+
+from .intervalos import intervalo_wilson
+
+COLUNAS_H2H = ['nossa_composicao', 'composicao_adversaria', 'total_vitorias_nossa_comp', 'total_partidas_disputadas', 'win_rate_vs_adv_comp']
+# Critério -> desempates: score (limite inferior de Wilson), win rate, partidas e vitórias, sempre do maior para o menor
+ORDENACOES_H2H = {
+    'score': ('score', 'win_rate', 'partidas'),
+    'win_rate': ('win_rate', 'partidas'),
+    'partidas': ('partidas', 'win_rate'),
+    'vitorias': ('vitorias', 'win_rate'),
+}
+
+
+class ConfrontosH2H:
+    """Pares de composições com vitórias e partidas, a partir de um h2h_stats (ou None/vazio)."""
+
+    def __init__(self, h2h_stats_df):
+        if h2h_stats_df is None or h2h_stats_df.empty:
+            h2h_stats_df = pd.DataFrame(columns=COLUNAS_H2H[:4])
+        codigos, composicoes = pd.factorize(np.concatenate([
+            h2h_stats_df['nossa_composicao'].astype(str).to_numpy(dtype=object),
+            h2h_stats_df['composicao_adversaria'].astype(str).to_numpy(dtype=object)]))
+        self.composicoes = pd.Index(composicoes, dtype=object)
+        self.nossa = codigos[:len(h2h_stats_df)].astype(np.int32)
+        self.adversaria = codigos[len(h2h_stats_df):].astype(np.int32)
+        self.vitorias = h2h_stats_df['total_vitorias_nossa_comp'].to_numpy(dtype=np.int64)
+        self.partidas = h2h_stats_df['total_partidas_disputadas'].to_numpy(dtype=np.int64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.win_rate = np.where(self.partidas > 0, self.vitorias / self.partidas * 100, 0.0)
+        self.ic_inferior, self.ic_superior = intervalo_wilson(self.vitorias, self.partidas)
+        self.score = np.nan_to_num(self.ic_inferior, nan=0.0)
+
+        colunas = {'score': self.score, 'win_rate': self.win_rate, 'partidas': self.partidas, 'vitorias': self.vitorias}
+        # lexsort usa a última chave como principal
+        self._ordens = {criterio: np.lexsort([-colunas[chave] for chave in reversed(chaves)])
+                        for criterio, chaves in ORDENACOES_H2H.items()}
+        self._ordens_filtradas = {}
+        # Confrontos agrupados por nossa composição (como um CSR): posições de _por_nossa[inicio[c]:inicio[c+1]]
+        self._por_nossa = np.argsort(self.nossa, kind='stable')
+        self._inicio_nossa = np.searchsorted(self.nossa[self._por_nossa], np.arange(len(self.composicoes) + 1))
+
+    def __len__(self):
+        return len(self.partidas)
+
+    def _ordem(self, ordenar_por='win_rate', min_partidas=1):
+        chave = (ordenar_por, min_partidas)
+        if chave not in self._ordens_filtradas:
+            ordem = self._ordens[ordenar_por]
+            self._ordens_filtradas[chave] = ordem if min_partidas <= 1 else ordem[self.partidas[ordem] >= min_partidas]
+        return self._ordens_filtradas[chave]
+
+    def contar(self, min_partidas=1):
+        """Quantos confrontos têm pelo menos `min_partidas`."""
+        return len(self._ordem('win_rate', min_partidas))
+
+    def nossas_composicoes(self):
+        """Nossas composições que aparecem em algum confronto, em ordem alfabética."""
+        return sorted(self.composicoes[np.unique(self.nossa)])
+
+    def _quadro(self, posicoes):
+        return pd.DataFrame({
+            'nossa_composicao': self.composicoes.to_numpy()[self.nossa[posicoes]],
+            'composicao_adversaria': self.composicoes.to_numpy()[self.adversaria[posicoes]],
+            'total_vitorias_nossa_comp': self.vitorias[posicoes],
+            'total_partidas_disputadas': self.partidas[posicoes],
+            'win_rate_vs_adv_comp': self.win_rate[posicoes],
+            'ic_inferior': self.ic_inferior[posicoes],
+            'ic_superior': self.ic_superior[posicoes],
+            'score_ranking': self.score[posicoes],
+        })
+
+    def top(self, k=None, ordenar_por='win_rate', min_partidas=1):
+        """Os `k` primeiros confrontos (todos, se k for None) no formato de h2h_stats."""
+        ordem = self._ordem(ordenar_por, min_partidas)
+        return self._quadro(ordem if k is None else ordem[:k])
+
+    def pagina(self, numero, tamanho, ordenar_por='win_rate', min_partidas=1):
+        """Página `numero` (a partir de 1) com até `tamanho` confrontos."""
+        inicio = (numero - 1) * tamanho
+        return self._quadro(self._ordem(ordenar_por, min_partidas)[inicio:inicio + tamanho])
+
+    def da_composicao(self, nossa_composicao, min_partidas=1):
+        """Confrontos de uma das nossas composições, por score de ranking."""
+        codigo = self.composicoes.get_indexer([nossa_composicao])[0]
+        if codigo < 0:
+            return self._quadro(np.array([], dtype=np.int64))
+        posicoes = self._por_nossa[self._inicio_nossa[codigo]:self._inicio_nossa[codigo + 1]]
+        posicoes = posicoes[self.partidas[posicoes] >= min_partidas]
+        return self._quadro(posicoes[np.lexsort((-self.partidas[posicoes], -self.win_rate[posicoes], -self.score[posicoes]))])
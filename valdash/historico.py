@@ -0,0 +1,182 @@
+"""Histórico local de partidas em SQLite."""
+import sqlite3
+
+import pandas as pd
+
+from .metricas import COLUNAS_CONTAGEM_COMPOSICOES, COLUNAS_CONTAGEM_H2H, COLUNAS_CONTAGEM_TOTAIS, contar_partidas
+from .processamento import aplicar_esquema
+
+# --- Histórico local (SQLite) ---
+# As partidas processadas e as contagens acumuladas ficam em um arquivo SQLite. Um novo upload
+# só soma às contagens as partidas ainda não vistas, então o custo é proporcional às linhas novas.
+# Partidas repetidas são reconhecidas pela chave data + hora + adversário + mapa (sem data ou
+# hora, também pelo conteúdo da partida: ver chaves_historico).
+COLUNAS_CHAVE_HISTORICO = ['data_jogo', 'hora_jogo', 'time_adversario', 'mapa']
+COLUNAS_PARTIDAS_HISTORICO = COLUNAS_CHAVE_HISTORICO + [
+    'placar_final_str', 'placar_ct_str', 'placar_tr_str', 'pistol_ct_resultado', 'pistol_tr_resultado',
+    'composicao_nossa_clean', 'composicao_adversaria_clean',
+    'nosso_time_venceu_partida', 'nosso_time_venceu_lado_ct', 'nosso_time_venceu_lado_tr',
+]
+
+ESQUEMA_HISTORICO = """
+CREATE TABLE IF NOT EXISTS partidas (
+    data_jogo TEXT NOT NULL, hora_jogo TEXT NOT NULL, time_adversario TEXT NOT NULL, mapa TEXT NOT NULL,
+    placar_final_str TEXT, placar_ct_str TEXT, placar_tr_str TEXT,
+    pistol_ct_resultado TEXT, pistol_tr_resultado TEXT,
+    composicao_nossa_clean TEXT, composicao_adversaria_clean TEXT,
+    nosso_time_venceu_partida INTEGER, nosso_time_venceu_lado_ct INTEGER, nosso_time_venceu_lado_tr INTEGER,
+    PRIMARY KEY (data_jogo, hora_jogo, time_adversario, mapa)
+);
+CREATE TABLE IF NOT EXISTS agregados_totais (
+    mapa TEXT PRIMARY KEY,
+    total_partidas INTEGER NOT NULL, vitorias_partida INTEGER NOT NULL,
+    vitorias_lado_ct INTEGER NOT NULL, vitorias_lado_tr INTEGER NOT NULL,
+    vitorias_pistol_ct INTEGER NOT NULL, vitorias_pistol_tr INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS agregados_composicoes (
+    mapa TEXT NOT NULL, composicao TEXT NOT NULL, tipo TEXT NOT NULL,
+    total_partidas_ganhas INTEGER NOT NULL, total_partidas_jogadas INTEGER NOT NULL,
+    PRIMARY KEY (mapa, composicao, tipo)
+);
+CREATE TABLE IF NOT EXISTS agregados_h2h (
+    mapa TEXT NOT NULL, nossa_composicao TEXT NOT NULL, composicao_adversaria TEXT NOT NULL,
+    total_vitorias_nossa_comp INTEGER NOT NULL, total_partidas_disputadas INTEGER NOT NULL,
+    PRIMARY KEY (mapa, nossa_composicao, composicao_adversaria)
+);
+"""
+
+# tabela do SQLite -> (tabela em contar_partidas, colunas de contagem)
+TABELAS_AGREGADOS_HISTORICO = {
+    'agregados_totais': ('totais', COLUNAS_CONTAGEM_TOTAIS),
+    'agregados_composicoes': ('composicoes', COLUNAS_CONTAGEM_COMPOSICOES),
+    'agregados_h2h': ('h2h', COLUNAS_CONTAGEM_H2H),
+}
+
+# Várias sessões do aplicativo podem gravar no mesmo arquivo: quem encontra o histórico
+# travado espera a gravação da outra terminar (até este limite) em vez de falhar
+ESPERA_TRAVA_HISTORICO_S = 30.0
+
+def abrir_historico(caminho):
+    conexao = sqlite3.connect(caminho, timeout=ESPERA_TRAVA_HISTORICO_S)
+    conexao.executescript(ESQUEMA_HISTORICO)
+    return conexao
+
+def _linhas_sqlite(df):
+    """Linhas como tuplas de tipos nativos do Python (o sqlite3 não aceita escalares do NumPy)."""
+    colunas = [df[c].astype(object).where(df[c].notna(), None) for c in df.columns]
+    return list(zip(*colunas))
+
+def _chave_texto(serie):
+    # Chaves ausentes viram '' porque NULL nunca é igual a NULL em uma PRIMARY KEY do SQLite
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        texto = serie.dt.strftime('%Y-%m-%d').astype('string')
+    elif pd.api.types.is_timedelta64_dtype(serie):
+        minutos = (serie.dt.total_seconds() // 60).astype('Int64')
+        texto = (minutos // 60).astype('string').str.zfill(2) + ':' + (minutos % 60).astype('string').str.zfill(2)
+    else:
+        texto = serie.astype('string').str.strip()
+    return texto.fillna('')
+
+# Conteúdo que identifica uma partida quando a chave não tem data ou hora
+COLUNAS_CONTEUDO_HISTORICO = [
+    'placar_final_str', 'placar_ct_str', 'placar_tr_str', 'pistol_ct_resultado', 'pistol_tr_resultado',
+    'composicao_nossa_clean', 'composicao_adversaria_clean',
+]
+
+def chaves_historico(df_processado):
+    """Chave (data, hora, adversário, mapa) de cada partida, como texto; colunas ausentes na planilha valem ''.
+
+    Sem data ou sem hora, a chave não separa dois jogos contra o mesmo adversário no mesmo mapa.
+    Nessas linhas a hora da chave ganha uma impressão do conteúdo da partida (placares, pistols e
+    composições) e o número da ocorrência dela no arquivo: reenviar o arquivo não duplica nada, e
+    partidas diferentes não são descartadas como repetidas. Só partidas idênticas em tudo se fundem.
+    """
+    vazia = pd.Series('', index=df_processado.index, dtype='string')
+    chaves = pd.DataFrame({c: _chave_texto(df_processado[c]) if c in df_processado.columns else vazia
+                           for c in COLUNAS_CHAVE_HISTORICO}, index=df_processado.index)
+    incompletas = ((chaves['data_jogo'] == '') | (chaves['hora_jogo'] == '')).to_numpy()
+    if incompletas.any():
+        partes = [chaves.loc[incompletas, c] for c in COLUNAS_CHAVE_HISTORICO]
+        partes += [_chave_texto(df_processado.loc[incompletas, c]) for c in COLUNAS_CONTEUDO_HISTORICO]
+        conteudo = partes[0].str.cat(partes[1:], sep='\x1f')
+        impressao = pd.util.hash_pandas_object(conteudo, index=False).map('{:016x}'.format)
+        ocorrencia = conteudo.groupby(conteudo).cumcount().astype('string')
+        chaves.loc[incompletas, 'hora_jogo'] = chaves.loc[incompletas, 'hora_jogo'] + '#' + impressao + '-' + ocorrencia
+    return chaves
+
+def ingerir_no_historico(conexao, df_processado):
+    """Grava as partidas ainda não vistas e soma suas contagens aos agregados. Retorna quantas eram novas."""
+    chaves = chaves_historico(df_processado)
+    chaves = chaves[~chaves.duplicated()]
+
+    with conexao:
+        # Trava de escrita desde o início: a busca das partidas novas e a gravação formam uma
+        # transação só, então duas ingestões simultâneas não gravam a mesma partida nem
+        # tentam subir de leitura para escrita ao mesmo tempo (o "database is locked" sem espera)
+        conexao.execute("BEGIN IMMEDIATE")
+        conexao.execute("CREATE TEMP TABLE IF NOT EXISTS chaves_upload (posicao INTEGER, data_jogo TEXT, hora_jogo TEXT, time_adversario TEXT, mapa TEXT)")
+        conexao.execute("DELETE FROM chaves_upload")
+        conexao.executemany("INSERT INTO chaves_upload VALUES (?, ?, ?, ?, ?)",
+                            zip(range(len(chaves)), *(chaves[c].tolist() for c in COLUNAS_CHAVE_HISTORICO)))
+        # Busca pela PRIMARY KEY: custo proporcional ao upload, não ao histórico
+        posicoes_novas = [linha[0] for linha in conexao.execute("""
+            SELECT u.posicao FROM chaves_upload u
+            WHERE NOT EXISTS (SELECT 1 FROM partidas p WHERE p.data_jogo = u.data_jogo AND p.hora_jogo = u.hora_jogo
+                              AND p.time_adversario = u.time_adversario AND p.mapa = u.mapa)
+            ORDER BY u.posicao""")]
+        if not posicoes_novas:
+            return 0
+
+        indice_novas = chaves.index[posicoes_novas]
+        novas = df_processado.loc[indice_novas]
+        # As colunas da chave podem faltar na planilha: vêm de `chaves` logo abaixo
+        linhas_partidas = novas.reindex(columns=COLUNAS_PARTIDAS_HISTORICO)
+        for c in COLUNAS_CHAVE_HISTORICO:
+            linhas_partidas[c] = chaves.loc[indice_novas, c]
+        for c in ['nosso_time_venceu_partida', 'nosso_time_venceu_lado_ct', 'nosso_time_venceu_lado_tr']:
+            linhas_partidas[c] = linhas_partidas[c].astype(int)
+        conexao.executemany(
+            f"INSERT INTO partidas ({', '.join(COLUNAS_PARTIDAS_HISTORICO)}) VALUES ({', '.join('?' * len(COLUNAS_PARTIDAS_HISTORICO))})",
+            _linhas_sqlite(linhas_partidas))
+
+        novas = novas.assign(mapa=chaves.loc[indice_novas, 'mapa'])
+        contagens_novas = contar_partidas(novas)
+        for tabela_sql, (tabela, colunas_contagem) in TABELAS_AGREGADOS_HISTORICO.items():
+            contagem = contagens_novas[tabela]
+            if contagem.empty:
+                continue
+            colunas_chave = [c for c in contagem.columns if c not in colunas_contagem]
+            colunas = colunas_chave + colunas_contagem
+            conexao.executemany(
+                f"INSERT INTO {tabela_sql} ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))}) "
+                f"ON CONFLICT ({', '.join(colunas_chave)}) DO UPDATE SET "
+                + ", ".join(f"{c} = {c} + excluded.{c}" for c in colunas_contagem),
+                _linhas_sqlite(contagem[colunas].astype({c: str for c in colunas_chave})))
+    return len(posicoes_novas)
+
+def versao_historico(conexao):
+    """Total de partidas no histórico. Só cresce, então identifica o estado atual dos agregados."""
+    return conexao.execute("SELECT COALESCE(SUM(total_partidas), 0) FROM agregados_totais").fetchone()[0]
+
+def contagens_do_historico(conexao):
+    """Lê os agregados acumulados no mesmo formato de contar_partidas."""
+    contagens = {}
+    for tabela_sql, (tabela, _) in TABELAS_AGREGADOS_HISTORICO.items():
+        agregado = pd.read_sql_query(f"SELECT * FROM {tabela_sql}", conexao)
+        agregado['mapa'] = agregado['mapa'].replace('', pd.NA)
+        contagens[tabela] = agregado
+    return contagens
+
+# Colunas lidas de volta para as consultas por período (valdash.periodos)
+COLUNAS_PERIODO_HISTORICO = [
+    'data_jogo', 'hora_jogo', 'mapa', 'pistol_ct_resultado', 'pistol_tr_resultado',
+    'nosso_time_venceu_partida', 'nosso_time_venceu_lado_ct', 'nosso_time_venceu_lado_tr',
+]
+
+def partidas_do_historico(conexao, colunas=COLUNAS_PERIODO_HISTORICO):
+    """Partidas gravadas no histórico (só as colunas pedidas), com os tipos de processar_dados."""
+    partidas = pd.read_sql_query(f"SELECT {', '.join(colunas)} FROM partidas", conexao)
+    for c in COLUNAS_CHAVE_HISTORICO:
+        if c in partidas.columns:
+            partidas[c] = partidas[c].replace('', pd.NA)
+    return aplicar_esquema(partidas)
@@ -0,0 +1,141 @@
+"""Instrumentação por etapa do pipeline: tempo, linhas e pico de memória.
+
+As funções do núcleo marcam suas etapas com `with etapa("processar_dados", linhas=n):`.
+Sem uma Instrumentacao ativa no contexto (o padrão), `etapa()` devolve um contexto vazio
+e o custo é uma leitura de ContextVar. Com uma ativa, cada etapa vira um registro; o pico
+de memória vem do tracemalloc, que só fica ligado enquanto houver instrumentação ativa
+(e deixa as alocações mais lentas nesse período).
+
+O tracemalloc é um só para o processo: o pico e o reset_peak valem para todas as threads. Com
+execuções simultâneas (sessões do dashboard em threads diferentes), o pico de uma etapa
+incluiria as alocações das outras, então ele só é informado quando uma única execução mede
+memória do começo ao fim da etapa; nas demais, 'pico_mb' fica None e o tempo continua medido.
+"""
+import contextlib
+import contextvars
+import datetime
+import json
+import threading
+import time
+import tracemalloc
+import uuid
+
+_INSTRUMENTACAO_ATUAL = contextvars.ContextVar("valdash_instrumentacao", default=None)
+# Execuções medindo memória no processo. 'geracao' muda a cada início: uma etapa só informa o
+# pico se nenhuma outra execução começou enquanto ela rodava.
+_trava_memoria = threading.Lock()
+_medicao_memoria = {'ativas': 0, 'geracao': 0, 'ligou_tracemalloc': False}
+
+def _geracao_se_sozinha():
+    """A geração atual se só uma execução mede memória (e o tracemalloc está ligado); senão None."""
+    with _trava_memoria:
+        if _medicao_memoria['ativas'] == 1 and tracemalloc.is_tracing():
+            return _medicao_memoria['geracao']
+        return None
+
+
+class Instrumentacao:
+    """Registros das etapas de uma execução (um rerun do dashboard, um arquivo da CLI...)."""
+
+    def __init__(self, medir_memoria=True, execucao=None):
+        self.medir_memoria = medir_memoria
+        self.execucao = execucao or uuid.uuid4().hex[:12]
+        self.registros = []
+        self._pilha = []
+        self._medindo_memoria = False
+
+    def iniciar(self):
+        if not self.medir_memoria or self._medindo_memoria:
+            return
+        with _trava_memoria:
+            _medicao_memoria['ativas'] += 1
+            _medicao_memoria['geracao'] += 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _medicao_memoria['ligou_tracemalloc'] = True
+        self._medindo_memoria = True
+
+    def encerrar(self):
+        """Deixa de medir memória; a última execução a encerrar desliga o tracemalloc (se foi ligado aqui)."""
+        if not self._medindo_memoria:
+            return
+        with _trava_memoria:
+            _medicao_memoria['ativas'] -= 1
+            if _medicao_memoria['ativas'] == 0 and _medicao_memoria['ligou_tracemalloc']:
+                tracemalloc.stop()
+                _medicao_memoria['ligou_tracemalloc'] = False
+        self._medindo_memoria = False
+
+    @contextlib.contextmanager
+    def etapa(self, nome, linhas=None):
+        """Mede o bloco. O registro é entregue ao bloco, que pode preencher 'linhas' depois."""
+        registro = {
+            'execucao': self.execucao,
+            'etapa': nome,
+            'nivel': len(self._pilha),
+            'inicio': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'linhas': linhas,
+            'tempo_ms': None,
+            'pico_mb': None,
+        }
+        self.registros.append(registro)
+        geracao = _geracao_se_sozinha() if self._medindo_memoria else None
+        medir_memoria = geracao is not None
+        controle = {'memoria_inicial': 0, 'pico': 0}
+        if medir_memoria:
+            # O pico do tracemalloc é global: antes de zerá-lo para esta etapa, guarda o da etapa externa
+            memoria_atual, pico = tracemalloc.get_traced_memory()
+            if self._pilha:
+                self._pilha[-1]['pico'] = max(self._pilha[-1]['pico'], pico)
+            tracemalloc.reset_peak()
+            controle = {'memoria_inicial': memoria_atual, 'pico': memoria_atual}
+        self._pilha.append(controle)
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro['tempo_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+            self._pilha.pop()
+            if medir_memoria and _geracao_se_sozinha() == geracao:
+                pico = max(tracemalloc.get_traced_memory()[1], controle['pico'])
+                registro['pico_mb'] = round((pico - controle['memoria_inicial']) / 1024 / 1024, 2)
+                if self._pilha:
+                    self._pilha[-1]['pico'] = max(self._pilha[-1]['pico'], pico)
+
+    def registrar(self, nome, tempo_ms, linhas=None, pico_mb=None):
+        """Adiciona uma etapa medida por fora (ex.: em outra thread)."""
+        self.registros.append({
+            'execucao': self.execucao, 'etapa': nome, 'nivel': 0,
+            'inicio': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'linhas': linhas, 'tempo_ms': round(tempo_ms, 2), 'pico_mb': pico_mb,
+        })
+
+    def jsonl(self):
+        return registros_jsonl(self.registros)
+
+
+def etapa(nome, linhas=None):
+    """Marca uma etapa na instrumentação ativa; sem instrumentação, não faz nada."""
+    instrumentacao = _INSTRUMENTACAO_ATUAL.get()
+    if instrumentacao is None:
+        # Um registro novo a cada chamada: o bloco pode escrever nele sem afetar as outras etapas
+        return contextlib.nullcontext({})
+    return instrumentacao.etapa(nome, linhas)
+
+def usar_instrumentacao(instrumentacao):
+    """Ativa `instrumentacao` no contexto atual (None desativa)."""
+    anterior = _INSTRUMENTACAO_ATUAL.get()
+    if anterior is not None and anterior is not instrumentacao:
+        anterior.encerrar()
+    _INSTRUMENTACAO_ATUAL.set(instrumentacao)
+    if instrumentacao is not None:
+        instrumentacao.iniciar()
+
+def registros_jsonl(registros):
+    """Registros em JSON lines, um por etapa."""
+    return "".join(json.dumps(registro, ensure_ascii=False) + "\n" for registro in registros)
+
+def anexar_jsonl(caminho, registros):
+    """Acrescenta os registros ao arquivo JSON lines (para um coletor de logs)."""
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        arquivo.write(registros_jsonl(registros))
@@ -0,0 +1,76 @@
+"""Intervalos de confiança para win rates e o score usado nos rankings.
+
+Uma taxa de 1 vitória em 1 partida (100%) não é melhor que 30 em 40 (75%): o que muda é
+a incerteza. Cada taxa ganha um intervalo de Wilson (fórmula fechada, vetorizada sobre
+todos os grupos) e os rankings ordenam pelo limite inferior dele (score), que só fica alto
+com taxa alta E amostra grande. O bootstrap reamostra as partidas de todos os grupos de uma
+vez (uma matriz grupos x reamostras de binomiais) com um número fixo de reamostras; como
+reamostrar partidas de 0/1 só pode repetir o que foi visto, um 1-0 dá [100%, 100%], por
+isso ele complementa o intervalo de Wilson, mas não entra no score.
+"""
+import numpy as np
+
+NIVEL_CONFIANCA = 0.95
+Z_95 = 1.959963984540054
+REAMOSTRAS_BOOTSTRAP = 1000
+# Grupos x reamostras sorteados por vez (limita a memória com milhares de grupos)
+SORTEIOS_POR_BLOCO = 2_000_000
+
+
+def intervalo_wilson(vitorias, partidas, z=Z_95):
+    """Limites (inferior, superior) do intervalo de Wilson, em %, para vetores de vitórias e partidas.
+
+    Grupos sem partidas ficam NaN.
+    """
+    vitorias = np.asarray(vitorias, dtype=np.float64)
+    partidas = np.asarray(partidas, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = vitorias / partidas
+        z2_n = z * z / partidas
+        centro = (p + z2_n / 2) / (1 + z2_n)
+        margem = z * np.sqrt(p * (1 - p) / partidas + z2_n / partidas / 4) / (1 + z2_n)
+    inferior = np.where(partidas > 0, np.clip(centro - margem, 0, 1) * 100, np.nan)
+    superior = np.where(partidas > 0, np.clip(centro + margem, 0, 1) * 100, np.nan)
+    return inferior, superior
+
+def score_ranking(vitorias, partidas):
+    """Score de ranking: limite inferior do intervalo de Wilson (0 para grupos sem partidas)."""
+    return np.nan_to_num(intervalo_wilson(vitorias, partidas)[0], nan=0.0)
+
+def intervalo_bootstrap(vitorias, partidas, reamostras=REAMOSTRAS_BOOTSTRAP, nivel=NIVEL_CONFIANCA, semente=0):
+    """Intervalo bootstrap percentil, em %, para vetores de vitórias e partidas.
+
+    Reamostrar as n partidas de um grupo e contar as vitórias é sortear uma Binomial(n, vitórias/n);
+    todos os placares distintos são sorteados juntos, em blocos de linhas. Semente fixa: mesmo resultado a cada chamada.
+    """
+    vitorias = np.asarray(vitorias, dtype=np.int64)
+    partidas = np.asarray(partidas, dtype=np.int64)
+    inferior = np.full(len(partidas), np.nan)
+    superior = np.full(len(partidas), np.nan)
+    com_partidas = np.flatnonzero(partidas > 0)
+    if len(com_partidas) == 0:
+        return inferior, superior
+
+    # Grupos com o mesmo placar têm a mesma distribuição: sorteia cada placar distinto uma vez
+    placares, posicoes = np.unique(np.column_stack([vitorias[com_partidas], partidas[com_partidas]]), axis=0, return_inverse=True)
+    limites = np.empty((len(placares), 2))
+    gerador = np.random.default_rng(semente)
+    quantis = [(1 - nivel) / 2, (1 + nivel) / 2]
+    linhas_por_bloco = max(1, SORTEIOS_POR_BLOCO // reamostras)
+    for inicio in range(0, len(placares), linhas_por_bloco):
+        ganhas, n = placares[inicio:inicio + linhas_por_bloco].T
+        sorteios = gerador.binomial(n[:, None], (ganhas / n)[:, None], size=(len(n), reamostras))
+        limites[inicio:inicio + len(n)] = np.quantile(sorteios, quantis, axis=1).T / n[:, None] * 100
+    inferior[com_partidas] = limites[posicoes.ravel(), 0]
+    superior[com_partidas] = limites[posicoes.ravel(), 1]
+    return inferior, superior
+
+def acrescentar_intervalos(tabela, coluna_vitorias, coluna_partidas, bootstrap=True):
+    """Acrescenta ic_inferior/ic_superior (Wilson), score_ranking e, com `bootstrap`, ic_bootstrap_inferior/superior."""
+    vitorias = tabela[coluna_vitorias].to_numpy(dtype=np.int64)
+    partidas = tabela[coluna_partidas].to_numpy(dtype=np.int64)
+    tabela['ic_inferior'], tabela['ic_superior'] = intervalo_wilson(vitorias, partidas)
+    tabela['score_ranking'] = np.nan_to_num(tabela['ic_inferior'].to_numpy(), nan=0.0)
+    if bootstrap:
+        tabela['ic_bootstrap_inferior'], tabela['ic_bootstrap_superior'] = intervalo_bootstrap(vitorias, partidas)
+    return tabela
@@ -0,0 +1,112 @@
+"""Leitura de arquivos de partidas (CSV, planilha modelo e Parquet), inclusive CSV grande em blocos."""
+import datetime
+import io
+import os
+
+import pandas as pd
+
+from .instrumentacao import etapa
+from .processamento import aplicar_esquema, processar_dados
+from .metricas import contar_partidas, somar_contagens
+
+# --- Leitura em blocos (arquivos grandes) ---
+# Para logs com milhões de linhas, o CSV é lido em blocos e de cada bloco só se guardam as
+# contagens (que podem ser somadas). O pico de memória depende do tamanho do bloco, não do arquivo.
+TAMANHO_BLOCO_PADRAO = 100_000
+MAX_AMOSTRA_INVALIDAS = 200
+COLUNAS_EXIBICAO_INVALIDAS = ['data_jogo', 'hora_jogo', 'time_adversario', 'mapa', 'placar_final_str', 'placar_ct_str', 'placar_tr_str']
+
+def resumir_validacao(df_processado):
+    """Total de linhas, linhas com placar inválido e uma amostra delas para exibição.
+
+    Data, hora e adversário são opcionais na planilha: a amostra usa só as colunas presentes.
+    """
+    invalidas = df_processado[~df_processado['placares_validos']]
+    colunas = [coluna for coluna in COLUNAS_EXIBICAO_INVALIDAS if coluna in invalidas.columns]
+    amostra = invalidas[colunas].head(MAX_AMOSTRA_INVALIDAS) if len(invalidas) else pd.DataFrame(columns=colunas)
+    return {
+        'linhas': len(df_processado),
+        'linhas_invalidas': len(invalidas),
+        'amostra_invalidas': amostra,
+    }
+
+def _somar_resumos(resumo, resumo_bloco):
+    amostra = resumo['amostra_invalidas']
+    if not resumo['linhas_invalidas']:
+        amostra = resumo_bloco['amostra_invalidas']
+    elif len(amostra) < MAX_AMOSTRA_INVALIDAS and resumo_bloco['linhas_invalidas']:
+        amostra = pd.concat([amostra, resumo_bloco['amostra_invalidas']]).head(MAX_AMOSTRA_INVALIDAS)
+    return {
+        'linhas': resumo['linhas'] + resumo_bloco['linhas'],
+        'linhas_invalidas': resumo['linhas_invalidas'] + resumo_bloco['linhas_invalidas'],
+        'amostra_invalidas': amostra,
+    }
+
+def ler_csv_em_blocos(fonte, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+    """Gera os blocos do CSV já processados por processar_dados."""
+    for bloco in pd.read_csv(fonte, chunksize=tamanho_bloco):
+        yield processar_dados(bloco)
+
+def contar_csv_em_blocos(fonte, tamanho_bloco=TAMANHO_BLOCO_PADRAO, coluna_grupo='mapa'):
+    """Contagens de um CSV lido em blocos. Retorna (contagens, resumo da validação); contagens é None se não houver linhas.
+
+    Nenhum bloco é mantido depois de contado: só as contagens acumuladas (por mapa,
+    composição e par H2H) e uma amostra limitada das linhas com placar inválido.
+    """
+    contagens = None
+    resumo = {'linhas': 0, 'linhas_invalidas': 0, 'amostra_invalidas': pd.DataFrame()}
+    with etapa("leitura_em_blocos") as registro:
+        for bloco in ler_csv_em_blocos(fonte, tamanho_bloco):
+            contagens_bloco = contar_partidas(bloco, coluna_grupo)
+            contagens = contagens_bloco if contagens is None else somar_contagens([contagens, contagens_bloco])
+            resumo = _somar_resumos(resumo, resumir_validacao(bloco))
+        registro['linhas'] = resumo['linhas']
+    return contagens, resumo
+
+
+# --- Leitura de arquivos (CSV, planilha modelo e Parquet) ---
+COLUNAS_PLACAR_ENTRADA = ['Placar final do jogo', 'Placar lado CT', 'Placar lado TR']
+
+def _placar_de_data(valor):
+    # O Excel converte '13-8' na data 13/08; o placar volta como 'dia-mês'
+    if isinstance(valor, datetime.date):
+        return f"{valor.day}-{valor.month}"
+    return valor
+
+def ler_planilha_modelo(fonte):
+    """Lê a planilha modelo (.xlsx) com as mesmas colunas do CSV, corrigindo placares que o Excel transformou em datas."""
+    df = pd.read_excel(fonte)
+    for coluna in COLUNAS_PLACAR_ENTRADA:
+        if coluna in df.columns and df[coluna].dtype == object:
+            df[coluna] = df[coluna].map(_placar_de_data)
+        elif coluna in df.columns and pd.api.types.is_datetime64_any_dtype(df[coluna]):
+            df[coluna] = df[coluna].dt.day.astype('string') + "-" + df[coluna].dt.month.astype('string')
+    return df
+
+def ler_partidas(fonte, nome_arquivo):
+    """Lê e processa um arquivo de partidas pela extensão. Retorna o DataFrame processado, ou None se não houver linhas.
+
+    Um Parquet gerado por exportar_parquet já está processado: só o esquema é conferido, sem refazer o parsing.
+    """
+    extensao = os.path.splitext(nome_arquivo)[1].lower()
+    with etapa("ler_arquivo") as registro:
+        if extensao == ".parquet":
+            df = pd.read_parquet(fonte)
+        elif extensao == ".xlsx":
+            df = ler_planilha_modelo(fonte)
+        else:
+            df = pd.read_csv(fonte)
+        registro['linhas'] = len(df)
+    if df.empty:
+        return None
+    if extensao == ".parquet" and 'placares_validos' in df.columns:
+        with etapa("aplicar_esquema", linhas=len(df)):
+            return aplicar_esquema(df)
+    with etapa("processar_dados", linhas=len(df)):
+        return processar_dados(df)
+
+def exportar_parquet(df_processado):
+    """DataFrame processado em Parquet (bytes), com os tipos do esquema preservados."""
+    buffer = io.BytesIO()
+    df_processado.to_parquet(buffer, index=False)
+    return buffer.getvalue()
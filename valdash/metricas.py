@@ -0,0 +1,285 @@
+"""Métricas de partidas: contagens somáveis por mapa, composição e confronto (H2H) e as taxas derivadas."""
+import numpy as np
+import pandas as pd
+
+from .instrumentacao import etapa
+from .intervalos import acrescentar_intervalos, intervalo_wilson
+
+def get_color_category(rate):
+    if pd.isna(rate): return 'Neutra (50%)'
+    if rate > 50: return 'Positiva (>50%)'
+    elif rate < 50: return 'Negativa (<50%)'
+    else: return 'Neutra (50%)'
+
+def metricas_vazias(nome_do_mapa_ou_geral):
+    return {
+        "nome_mapa_ou_contexto": nome_do_mapa_ou_geral,
+        "win_rate_geral_partidas_nosso_time": 0, "total_partidas_jogadas_nosso_time": 0,
+        "win_rate_ct_rounds": 0, "total_ct_rounds_jogados": 0,
+        "win_rate_tr_rounds": 0, "total_tr_rounds_jogados": 0,
+        "win_rate_pistol_ct": 0, "total_pistols_ct_disputados": 0,
+        "win_rate_pistol_tr": 0, "total_pistols_tr_disputados": 0,
+        "vitorias_partidas_nosso_time": 0, "intervalos_taxas": {},
+        "composicao_stats": pd.DataFrame(), "h2h_stats": pd.DataFrame(),
+        "melhor_nossa_composicao_info": _info_melhor_composicao(None)
+    }
+
+COLUNAS_CONTAGEM_TOTAIS = ['total_partidas', 'vitorias_partida', 'vitorias_lado_ct', 'vitorias_lado_tr', 'vitorias_pistol_ct', 'vitorias_pistol_tr']
+COLUNAS_CONTAGEM_COMPOSICOES = ['total_partidas_ganhas', 'total_partidas_jogadas']
+COLUNAS_CONTAGEM_H2H = ['total_vitorias_nossa_comp', 'total_partidas_disputadas']
+
+def _agregar_totais(df, chaves):
+    """Soma partidas, lados e pistols vencidos, agrupando por `chaves` (ou no total se vazio)."""
+    flags = pd.DataFrame({
+        'total_partidas': 1,
+        'vitorias_partida': df['nosso_time_venceu_partida'].astype(int),
+        'vitorias_lado_ct': df['nosso_time_venceu_lado_ct'].astype(int),
+        'vitorias_lado_tr': df['nosso_time_venceu_lado_tr'].astype(int),
+        'vitorias_pistol_ct': (df['pistol_ct_resultado'] == 'win').astype(int),
+        'vitorias_pistol_tr': (df['pistol_tr_resultado'] == 'win').astype(int),
+    }, index=df.index)
+    if not chaves:
+        return flags.sum().to_frame().T
+    return flags.groupby([df[c] for c in chaves], observed=True, dropna=False).sum()
+
+def _contar_composicoes(df, chaves):
+    """Partidas jogadas/ganhas por composição (nossas e adversárias), agrupadas por `chaves`."""
+    venceu = df['nosso_time_venceu_partida'].astype(int)
+    nossa = pd.DataFrame({**{c: df[c] for c in chaves}, 'composicao': df['composicao_nossa_clean'], 'tipo': 'Nossa', 'partida_ganha': venceu})
+    adv = pd.DataFrame({**{c: df[c] for c in chaves}, 'composicao': df['composicao_adversaria_clean'], 'tipo': 'Adversária', 'partida_ganha': 1 - venceu})
+    comp_df_partida = pd.concat([nossa[nossa['composicao'].notna()], adv[adv['composicao'].notna()]], ignore_index=True)
+    if comp_df_partida.empty:
+        return pd.DataFrame(columns=chaves + ['composicao', 'tipo'] + COLUNAS_CONTAGEM_COMPOSICOES)
+
+    return comp_df_partida.groupby(chaves + ['composicao', 'tipo'], observed=True, dropna=False).agg(
+        total_partidas_ganhas=('partida_ganha', 'sum'),
+        total_partidas_jogadas=('partida_ganha', 'size')
+    ).reset_index()
+
+def _completar_composicao_stats(composicao_stats_df):
+    """Acrescenta win rate, intervalos de confiança, score de ranking e categoria de cor às contagens de composição."""
+    if composicao_stats_df.empty:
+        return pd.DataFrame()
+    composicao_stats_df['win_rate_partidas'] = (composicao_stats_df['total_partidas_ganhas'] / composicao_stats_df['total_partidas_jogadas'] * 100).fillna(0)
+    composicao_stats_df['cor_win_rate'] = np.select(
+        [composicao_stats_df['win_rate_partidas'] > 50, composicao_stats_df['win_rate_partidas'] < 50],
+        ['Positiva (>50%)', 'Negativa (<50%)'], default='Neutra (50%)')
+    # Uma chamada para todas as composições (de todos os mapas, em metricas_de_contagens)
+    return acrescentar_intervalos(composicao_stats_df, 'total_partidas_ganhas', 'total_partidas_jogadas')
+
+def _agregar_composicoes(df, chaves):
+    """Estatísticas de composição por partida (nossas e adversárias), agrupadas por `chaves`."""
+    return _completar_composicao_stats(_contar_composicoes(df, chaves))
+
+def _melhores_composicoes(composicao_stats_df, chaves):
+    """Melhor composição nossa (maior score de ranking, desempate por win rate e partidas) para cada grupo."""
+    if composicao_stats_df.empty:
+        return composicao_stats_df
+    nossas = composicao_stats_df[composicao_stats_df['tipo'] == 'Nossa']
+    # Ordenação estável: empates mantêm a ordem alfabética da composição, como no sort original
+    nossas = nossas.sort_values(by=chaves + ['score_ranking', 'win_rate_partidas', 'total_partidas_jogadas'], ascending=[True] * len(chaves) + [False, False, False], kind='stable')
+    return nossas.drop_duplicates(subset=chaves) if chaves else nossas.head(1)
+
+def _info_melhor_composicao(top_comp_row):
+    if top_comp_row is None:
+        return {"composicao": "N/A", "win_rate_partidas": 0, "partidas_jogadas": 0, "raw_composicao": tuple(),
+                "ic_inferior": np.nan, "ic_superior": np.nan, "score_ranking": 0}
+    return {
+        "composicao": top_comp_row['composicao'],
+        "win_rate_partidas": top_comp_row['win_rate_partidas'],
+        "partidas_jogadas": top_comp_row['total_partidas_jogadas'],
+        "raw_composicao": tuple(top_comp_row['composicao'].split(", ")),
+        "ic_inferior": top_comp_row['ic_inferior'],
+        "ic_superior": top_comp_row['ic_superior'],
+        "score_ranking": top_comp_row['score_ranking'],
+    }
+
+def _contar_h2h(df, chaves):
+    """Partidas e vitórias de cada confronto nossa composição vs. composição adversária."""
+    h2h_df = pd.DataFrame({
+        **{c: df[c] for c in chaves},
+        'nossa_composicao': df['composicao_nossa_clean'],
+        'composicao_adversaria': df['composicao_adversaria_clean'],
+        'vitoria_nossa_comp': df['nosso_time_venceu_partida'].astype(int),
+    })
+    h2h_df = h2h_df[h2h_df['nossa_composicao'].notna() & h2h_df['composicao_adversaria'].notna()]
+    if h2h_df.empty:
+        return pd.DataFrame(columns=chaves + ['nossa_composicao', 'composicao_adversaria'] + COLUNAS_CONTAGEM_H2H)
+
+    return h2h_df.groupby(chaves + ['nossa_composicao', 'composicao_adversaria'], observed=True, dropna=False).agg(
+        total_vitorias_nossa_comp=('vitoria_nossa_comp', 'sum'),
+        total_partidas_disputadas=('vitoria_nossa_comp', 'size')
+    ).reset_index()
+
+def _completar_h2h_stats(h2h_stats_df):
+    if h2h_stats_df.empty:
+        return pd.DataFrame()
+    h2h_stats_df['win_rate_vs_adv_comp'] = (h2h_stats_df['total_vitorias_nossa_comp'] / h2h_stats_df['total_partidas_disputadas'] * 100).fillna(0)
+    # Só Wilson: os confrontos são muitos e o bootstrap fica para composições e mapas
+    return acrescentar_intervalos(h2h_stats_df, 'total_vitorias_nossa_comp', 'total_partidas_disputadas', bootstrap=False)
+
+def _agregar_h2h(df, chaves):
+    """Confrontos diretos nossa composição vs. composição adversária, agrupados por `chaves`."""
+    return _completar_h2h_stats(_contar_h2h(df, chaves))
+
+def _ordenar_h2h(h2h_stats_df):
+    if h2h_stats_df.empty:
+        return h2h_stats_df
+    return h2h_stats_df.sort_values(by=['win_rate_vs_adv_comp'], ascending=False)
+
+def _montar_metricas(nome_do_mapa_ou_geral, totais, composicao_stats_df, h2h_stats_df, top_comp_row):
+    total_partidas_jogadas = int(totais['total_partidas'])
+    def taxa(coluna):
+        return (totais[coluna] / total_partidas_jogadas) * 100 if total_partidas_jogadas > 0 else 0
+    colunas_taxas = {'win_rate_geral_partidas_nosso_time': 'vitorias_partida', 'win_rate_ct_rounds': 'vitorias_lado_ct',
+                     'win_rate_tr_rounds': 'vitorias_lado_tr', 'win_rate_pistol_ct': 'vitorias_pistol_ct', 'win_rate_pistol_tr': 'vitorias_pistol_tr'}
+    inferiores, superiores = intervalo_wilson([totais[coluna] for coluna in colunas_taxas.values()], [total_partidas_jogadas] * len(colunas_taxas))
+    return {
+        "nome_mapa_ou_contexto": nome_do_mapa_ou_geral,
+        "win_rate_geral_partidas_nosso_time": taxa('vitorias_partida'),
+        "total_partidas_jogadas_nosso_time": total_partidas_jogadas,
+        "win_rate_ct_rounds": taxa('vitorias_lado_ct'),
+        "total_ct_rounds_jogados": total_partidas_jogadas,
+        "win_rate_tr_rounds": taxa('vitorias_lado_tr'),
+        "total_tr_rounds_jogados": total_partidas_jogadas,
+        "win_rate_pistol_ct": taxa('vitorias_pistol_ct'),
+        "total_pistols_ct_disputados": total_partidas_jogadas,
+        "win_rate_pistol_tr": taxa('vitorias_pistol_tr'),
+        "total_pistols_tr_disputados": total_partidas_jogadas,
+        "vitorias_partidas_nosso_time": int(totais['vitorias_partida']),
+        # Intervalo de Wilson (inferior, superior), em %, de cada taxa acima
+        "intervalos_taxas": dict(zip(colunas_taxas, zip(inferiores, superiores))),
+        "composicao_stats": composicao_stats_df, # Agora baseado em partidas
+        "h2h_stats": h2h_stats_df,
+        "melhor_nossa_composicao_info": _info_melhor_composicao(top_comp_row) # Agora baseado em partidas
+    }
+
+def calcular_metricas(df_filtrado, nome_do_mapa_ou_geral="geral"):
+    if df_filtrado.empty:
+        return metricas_vazias(nome_do_mapa_ou_geral)
+
+    totais = _agregar_totais(df_filtrado, []).iloc[0]
+    composicao_stats_df = _agregar_composicoes(df_filtrado, [])
+    melhores = _melhores_composicoes(composicao_stats_df, [])
+    top_comp_row = melhores.iloc[0] if not melhores.empty else None
+    h2h_stats_df = _ordenar_h2h(_agregar_h2h(df_filtrado, []))
+    return _montar_metricas(nome_do_mapa_ou_geral, totais, composicao_stats_df, h2h_stats_df, top_comp_row)
+
+def _separar_por_grupo(stats_df, coluna_grupo):
+    """Divide um DataFrame agregado em {grupo: fatia}, sem a coluna do grupo e com índice novo."""
+    if stats_df.empty:
+        return {}
+    return {grupo: fatia.drop(columns=coluna_grupo).reset_index(drop=True)
+            for grupo, fatia in stats_df.groupby(coluna_grupo, sort=False, observed=True)}
+
+def contar_partidas(df_processado, coluna_grupo='mapa'):
+    """Contagens aditivas por mapa: totais, composições e confrontos H2H.
+
+    Ao contrário das métricas (taxas), as contagens de lotes diferentes podem ser somadas
+    com somar_contagens. Linhas sem mapa ficam no grupo <NA> e só entram no total global.
+    """
+    chaves = [coluna_grupo]
+    totais = _agregar_totais(df_processado, chaves) if not df_processado.empty else pd.DataFrame(columns=COLUNAS_CONTAGEM_TOTAIS)
+    totais = totais.rename_axis(coluna_grupo).reset_index()
+    return {
+        'totais': totais,
+        'composicoes': _contar_composicoes(df_processado, chaves),
+        'h2h': _contar_h2h(df_processado, chaves),
+    }
+
+def _somar_por_chave(tabela, colunas_contagem):
+    chaves = [c for c in tabela.columns if c not in colunas_contagem]
+    if tabela.empty:
+        return tabela
+    return tabela.groupby(chaves, observed=True, dropna=False)[colunas_contagem].sum().reset_index()
+
+def somar_contagens(lista_contagens):
+    """Soma contagens de vários lotes (ex.: blocos de um CSV ou uploads sucessivos)."""
+    colunas_por_tabela = {'totais': COLUNAS_CONTAGEM_TOTAIS, 'composicoes': COLUNAS_CONTAGEM_COMPOSICOES, 'h2h': COLUNAS_CONTAGEM_H2H}
+    somadas = {}
+    for tabela, colunas_contagem in colunas_por_tabela.items():
+        partes = [contagens[tabela] for contagens in lista_contagens if not contagens[tabela].empty]
+        if not partes:
+            somadas[tabela] = lista_contagens[0][tabela] if lista_contagens else pd.DataFrame()
+            continue
+        # Categorias diferentes entre lotes viram texto no concat; o groupby as reúne de novo
+        somadas[tabela] = _somar_por_chave(pd.concat(partes, ignore_index=True), colunas_contagem)
+    return somadas
+
+def metricas_de_contagens(contagens, nome_global="Global", coluna_grupo='mapa'):
+    """Monta as métricas globais e por mapa a partir das contagens. Retorna (metricas_globais, {mapa: metricas})."""
+    totais = contagens['totais']
+    if totais.empty or totais['total_partidas'].sum() == 0:
+        return metricas_vazias(nome_global), {}
+
+    # Global: soma de todos os grupos, inclusive linhas sem mapa
+    composicao_global = _completar_composicao_stats(_somar_por_chave(contagens['composicoes'].drop(columns=coluna_grupo), COLUNAS_CONTAGEM_COMPOSICOES))
+    melhores_global = _melhores_composicoes(composicao_global, [])
+    metricas_globais = _montar_metricas(
+        nome_global, totais[COLUNAS_CONTAGEM_TOTAIS].sum(), composicao_global,
+        _ordenar_h2h(_completar_h2h_stats(_somar_por_chave(contagens['h2h'].drop(columns=coluna_grupo), COLUNAS_CONTAGEM_H2H))),
+        melhores_global.iloc[0] if not melhores_global.empty else None)
+
+    chaves = [coluna_grupo]
+    totais_por_grupo = totais[totais[coluna_grupo].notna()].set_index(coluna_grupo)
+    composicao_stats_df = _completar_composicao_stats(contagens['composicoes'][contagens['composicoes'][coluna_grupo].notna()].copy())
+    h2h_stats_df = _completar_h2h_stats(contagens['h2h'][contagens['h2h'][coluna_grupo].notna()].copy())
+    melhores = _melhores_composicoes(composicao_stats_df, chaves)
+    melhores_por_grupo = {} if melhores.empty else dict(zip(melhores[coluna_grupo], (linha for _, linha in melhores.iterrows())))
+    comps_por_grupo = _separar_por_grupo(composicao_stats_df, coluna_grupo)
+    h2h_por_grupo = _separar_por_grupo(h2h_stats_df, coluna_grupo)
+
+    metricas_por_grupo = {}
+    for grupo, totais_grupo in totais_por_grupo.iterrows():
+        metricas_por_grupo[grupo] = _montar_metricas(
+            grupo, totais_grupo,
+            comps_por_grupo.get(grupo, pd.DataFrame()),
+            _ordenar_h2h(h2h_por_grupo.get(grupo, pd.DataFrame())),
+            melhores_por_grupo.get(grupo))
+    return metricas_globais, metricas_por_grupo
+
+def calcular_metricas_por_mapa(df_processado, nome_global="Global", coluna_grupo='mapa'):
+    """Calcula as métricas globais e de cada mapa em uma única passada agrupada.
+
+    Equivale a chamar calcular_metricas no DataFrame inteiro e em cada fatia por mapa,
+    mas cada etapa percorre as linhas uma só vez. Retorna (metricas_globais, {mapa: metricas}).
+    """
+    return metricas_de_contagens(contar_partidas(df_processado, coluna_grupo), nome_global, coluna_grupo)
+
+def montar_ranking_mapas(mapas_unicos, metricas_calculadas_por_mapa):
+    """Completa as métricas de cada mapa e monta o DataFrame do ranking de mapas, ordenado pelo score de ranking."""
+    metricas_detalhadas_por_mapa = {}
+    map_performance_data = []
+    for mapa_nome in mapas_unicos:
+        metricas_mapa_loop = metricas_calculadas_por_mapa.get(mapa_nome) or metricas_vazias(mapa_nome)
+        metricas_detalhadas_por_mapa[mapa_nome] = metricas_mapa_loop
+        map_performance_data.append({
+            'mapa': mapa_nome,
+            'win_rate_geral_partidas_nosso_time': metricas_mapa_loop['win_rate_geral_partidas_nosso_time'],
+            'total_partidas': metricas_mapa_loop['total_partidas_jogadas_nosso_time'],
+            'vitorias': metricas_mapa_loop['vitorias_partidas_nosso_time'],
+        })
+    df_map_ranking = pd.DataFrame(map_performance_data)
+    if not df_map_ranking.empty:
+        df_map_ranking = acrescentar_intervalos(df_map_ranking, 'vitorias', 'total_partidas')
+        df_map_ranking = df_map_ranking.sort_values(by=['score_ranking', 'win_rate_geral_partidas_nosso_time'], ascending=False, kind='stable')
+    return metricas_detalhadas_por_mapa, df_map_ranking
+
+def montar_dashboard_de_contagens(contagens):
+    """Tudo o que o dashboard e o relatório exibem, a partir de contagens.
+
+    Retorna (mapas_unicos, metricas_globais, metricas_detalhadas_por_mapa, df_map_ranking).
+    """
+    with etapa("calcular_metricas"):
+        metricas_globais, metricas_calculadas_por_mapa = metricas_de_contagens(contagens, "Global")
+        mapas_unicos = sorted(str(mapa) for mapa in metricas_calculadas_por_mapa)
+        metricas_detalhadas_por_mapa, df_map_ranking = montar_ranking_mapas(mapas_unicos, metricas_calculadas_por_mapa)
+    return mapas_unicos, metricas_globais, metricas_detalhadas_por_mapa, df_map_ranking
+
+def montar_dashboard(df_processado):
+    """Como montar_dashboard_de_contagens, a partir do DataFrame processado."""
+    with etapa("calcular_metricas", linhas=len(df_processado)):
+        mapas_unicos = sorted(df_processado['mapa'].dropna().astype(str).unique())
+        metricas_globais, metricas_calculadas_por_mapa = calcular_metricas_por_mapa(df_processado, "Global")
+        metricas_detalhadas_por_mapa, df_map_ranking = montar_ranking_mapas(mapas_unicos, metricas_calculadas_por_mapa)
+    return mapas_unicos, metricas_globais, metricas_detalhadas_por_mapa, df_map_ranking
@@ -0,0 +1,130 @@
+"""Métricas por período e taxas móveis a partir de contagens acumuladas.
+
+As partidas são ordenadas pelo instante do jogo (data + hora) e, para o total e para cada
+mapa, guardam-se as somas acumuladas das contagens. As contagens de qualquer intervalo saem
+de duas buscas binárias e uma subtração, sem refiltrar o DataFrame nem recalcular métricas;
+as taxas móveis fazem a mesma conta para todos os dias de uma vez.
+"""
+import numpy as np
+import pandas as pd
+
+from .metricas import COLUNAS_CONTAGEM_TOTAIS
+
+# Taxa exibida -> contagem de vitórias correspondente
+TAXAS_PERIODO = {
+    'win_rate_geral_partidas_nosso_time': 'vitorias_partida',
+    'win_rate_ct_rounds': 'vitorias_lado_ct',
+    'win_rate_tr_rounds': 'vitorias_lado_tr',
+    'win_rate_pistol_ct': 'vitorias_pistol_ct',
+    'win_rate_pistol_tr': 'vitorias_pistol_tr',
+}
+NOME_GLOBAL = "Global"
+# Colunas sem as quais não há índice (a hora é opcional)
+COLUNAS_INDICE_TEMPORAL = ['data_jogo']
+
+def instante_das_partidas(df_processado):
+    """data_jogo + hora_jogo (sem hora, ou sem a coluna de hora, conta como meia-noite). NaT quando não há data."""
+    if 'hora_jogo' not in df_processado.columns:
+        return df_processado['data_jogo']
+    return df_processado['data_jogo'] + df_processado['hora_jogo'].fillna(pd.Timedelta(0))
+
+def _contagens_por_partida(df_processado):
+    """Matriz (partidas x COLUNAS_CONTAGEM_TOTAIS) com 0/1, nas mesmas regras de _agregar_totais."""
+    return np.column_stack([
+        np.ones(len(df_processado), dtype=np.int64),
+        df_processado['nosso_time_venceu_partida'].to_numpy(dtype=np.int64),
+        df_processado['nosso_time_venceu_lado_ct'].to_numpy(dtype=np.int64),
+        df_processado['nosso_time_venceu_lado_tr'].to_numpy(dtype=np.int64),
+        (df_processado['pistol_ct_resultado'] == 'win').to_numpy(dtype=np.int64, na_value=0),
+        (df_processado['pistol_tr_resultado'] == 'win').to_numpy(dtype=np.int64, na_value=0),
+    ])
+
+def _em_ns(instante):
+    return pd.Timestamp(instante).as_unit('ns').value
+
+
+class SerieAcumulada:
+    """Partidas de um grupo em ordem de instante, com as contagens acumuladas (linha 0 = zeros)."""
+
+    def __init__(self, instantes_ns, contagens):
+        self.instantes_ns = instantes_ns
+        self.acumulados = np.vstack([np.zeros((1, contagens.shape[1]), dtype=np.int64), np.cumsum(contagens, axis=0)])
+
+    def contar(self, inicio_ns, fim_ns):
+        """Contagens das partidas com inicio <= instante <= fim."""
+        i = np.searchsorted(self.instantes_ns, inicio_ns, side='left')
+        j = np.searchsorted(self.instantes_ns, fim_ns, side='right')
+        return self.acumulados[j] - self.acumulados[min(i, j)]
+
+    def contar_janelas(self, fins_ns, duracao_ns):
+        """Contagens de cada janela (fim - duração, fim], para um vetor de fins."""
+        i = np.searchsorted(self.instantes_ns, fins_ns - duracao_ns, side='right')
+        j = np.searchsorted(self.instantes_ns, fins_ns, side='right')
+        return self.acumulados[j] - self.acumulados[i]
+
+
+class IndiceTemporal:
+    """Índice por instante das partidas de um dataset, para consultas por período."""
+
+    def __init__(self, df_processado):
+        instantes = instante_das_partidas(df_processado)
+        com_data = instantes.notna().to_numpy()
+        self.partidas_sem_data = int((~com_data).sum())
+
+        instantes_ns = instantes[com_data].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        ordem = np.argsort(instantes_ns, kind='stable')
+        instantes_ns = instantes_ns[ordem]
+        contagens = _contagens_por_partida(df_processado[com_data])[ordem]
+        self.geral = SerieAcumulada(instantes_ns, contagens)
+
+        codigos_mapa, mapas = pd.factorize(df_processado.loc[com_data, 'mapa'].astype(object).to_numpy()[ordem])
+        self.por_mapa = {}
+        for codigo, mapa in sorted(enumerate(mapas), key=lambda item: str(item[1])):
+            do_mapa = codigos_mapa == codigo
+            self.por_mapa[str(mapa)] = SerieAcumulada(instantes_ns[do_mapa], contagens[do_mapa])
+
+    @property
+    def vazio(self):
+        return len(self.geral.instantes_ns) == 0
+
+    @property
+    def primeiro(self):
+        return pd.Timestamp(self.geral.instantes_ns[0])
+
+    @property
+    def ultimo(self):
+        return pd.Timestamp(self.geral.instantes_ns[-1])
+
+    def _series(self, mapas=None):
+        series = {NOME_GLOBAL: self.geral, **self.por_mapa}
+        return series if mapas is None else {nome: series[nome] for nome in mapas if nome in series}
+
+    def metricas_periodo(self, inicio, fim):
+        """Partidas e taxas (em %) do período [inicio, fim], no total e por mapa. Um DataFrame indexado pelo mapa."""
+        inicio_ns, fim_ns = _em_ns(inicio), _em_ns(fim)
+        series = self._series()
+        contagens = np.vstack([serie.contar(inicio_ns, fim_ns) for serie in series.values()])
+        tabela = pd.DataFrame(contagens, index=pd.Index(list(series), name='mapa'), columns=COLUNAS_CONTAGEM_TOTAIS)
+        partidas = tabela['total_partidas'].where(tabela['total_partidas'] > 0)
+        for taxa, coluna in TAXAS_PERIODO.items():
+            tabela[taxa] = tabela[coluna] / partidas * 100
+        return tabela
+
+    def taxas_moveis(self, taxa, janela_dias, mapas=None, inicio=None, fim=None):
+        """Taxa (em %) nos `janela_dias` dias até o fim de cada dia de [inicio, fim], uma coluna por mapa.
+
+        Dias cuja janela não tem partidas ficam NaN.
+        """
+        inicio = (pd.Timestamp(inicio) if inicio is not None else self.primeiro).normalize()
+        fim = (pd.Timestamp(fim) if fim is not None else self.ultimo).normalize()
+        dias = pd.date_range(inicio, fim, freq='D')
+        fins_ns = (dias + pd.Timedelta(days=1)).as_unit('ns').asi8 - 1
+        duracao_ns = pd.Timedelta(days=janela_dias).value
+        coluna = COLUNAS_CONTAGEM_TOTAIS.index(TAXAS_PERIODO[taxa])
+        resultado = {}
+        for nome, serie in self._series(mapas).items():
+            contagens = serie.contar_janelas(fins_ns, duracao_ns)
+            partidas = contagens[:, 0].astype(float)
+            partidas[partidas == 0] = np.nan
+            resultado[nome] = contagens[:, coluna] / partidas * 100
+        return pd.DataFrame(resultado, index=pd.Index(dias, name='data'))
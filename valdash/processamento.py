@@ -0,0 +1,188 @@
+"""Leitura dos placares e composições e tipagem do DataFrame de partidas."""
+import numpy as np
+import pandas as pd
+
+# Funções auxiliares para processar os placares
+def extrair_scores(placar_str, nosso_time_primeiro=True):
+    """Extrai os scores de uma string 'X-Y'."""
+    try:
+        parts = str(placar_str).split('-')
+        if len(parts) == 2:
+            score1 = int(parts[0].strip())
+            score2 = int(parts[1].strip())
+            return (score1, score2) if nosso_time_primeiro else (score2, score1)
+        return None, None # Retornar None para indicar falha na extração
+    except:
+        return None, None
+
+# Mesmo formato aceito por extrair_scores: dois inteiros não negativos separados por '-'
+PADRAO_PLACAR = r'^\s*\+?(\d+)\s*-\s*\+?(\d+)\s*$'
+# Os placares são gravados como Int16 (ESQUEMA_PROCESSADO): acima disso o placar é inválido,
+# em vez de virar outro número no cast
+PLACAR_MAXIMO = np.iinfo(np.int16).max
+
+def _placar_numerico(texto):
+    numero = pd.to_numeric(texto, errors='coerce').astype('Float64')
+    return numero.where(numero <= PLACAR_MAXIMO).astype('Int64')
+
+def extrair_scores_colunas(df, colunas, nosso_time_primeiro=True):
+    """Extrai os scores 'X-Y' de várias colunas de uma vez.
+
+    Retorna um dict {coluna: (score_nosso, score_adv)} com Series Int64 (<NA> quando o
+    placar é inválido) e um DataFrame booleano com a máscara de validade por linha/coluna.
+    """
+    n = len(df)
+    # Empilhar as colunas permite um único str.extract; e como os placares se repetem muito,
+    # a regex só roda nos textos distintos
+    empilhado = pd.concat([df[c].astype(object) for c in colunas], ignore_index=True)
+    codigos, textos_unicos = pd.factorize(empilhado)
+    extraido = pd.Series(textos_unicos, dtype=object).astype('string').str.extract(PADRAO_PLACAR)
+    # reindex com o código -1 (valor ausente) devolve <NA>
+    score1 = _placar_numerico(extraido[0]).reindex(codigos).reset_index(drop=True)
+    score2 = _placar_numerico(extraido[1]).reindex(codigos).reset_index(drop=True)
+    valido = score1.notna() & score2.notna()
+    # Placar inválido fica sem os dois lados (ex.: '1-70000' não guarda o 1)
+    score1, score2 = score1.where(valido), score2.where(valido)
+
+    scores = {}
+    validos = {}
+    for i, coluna in enumerate(colunas):
+        fatia = slice(i * n, (i + 1) * n)
+        s1 = score1.iloc[fatia].set_axis(df.index)
+        s2 = score2.iloc[fatia].set_axis(df.index)
+        scores[coluna] = (s1, s2) if nosso_time_primeiro else (s2, s1)
+        validos[coluna] = valido.iloc[fatia].to_numpy(dtype=bool)
+    return scores, pd.DataFrame(validos, index=df.index)
+
+def limpar_composicao(comp_str):
+    """Normaliza uma composição 'A,B,C' em uma tupla ordenada de agentes."""
+    if pd.isna(comp_str) or str(comp_str).strip() == '':
+        return tuple()
+    agentes = sorted([agente.strip() for agente in str(comp_str).split(',') if agente.strip()])
+    return tuple(agentes) if agentes else tuple()
+
+def formatar_composicao(comp_tuple):
+    return ", ".join(comp_tuple)
+
+def codificar_composicoes(*colunas):
+    """Converte colunas de composição em Categoricals com um único conjunto de categorias.
+
+    Cada texto distinto é normalizado uma só vez; as linhas guardam apenas o código da
+    categoria (já no formato de exibição 'A, B, C'). Composições vazias viram <NA>.
+    """
+    empilhado = pd.concat([pd.Series(c).reset_index(drop=True) for c in colunas], ignore_index=True)
+    codigos, textos_unicos = pd.factorize(empilhado)
+    nomes = [formatar_composicao(limpar_composicao(texto)) for texto in textos_unicos]
+    categorias = sorted({nome for nome in nomes if nome})
+    posicao = {nome: i for i, nome in enumerate(categorias)}
+    # O último elemento atende o código -1 do factorize (valores ausentes)
+    recodificar = np.array([posicao.get(nome, -1) for nome in nomes] + [-1], dtype=np.int32)
+    novos_codigos = recodificar[codigos]
+
+    resultado = []
+    inicio = 0
+    for coluna in colunas:
+        fim = inicio + len(coluna)
+        resultado.append(pd.Series(pd.Categorical.from_codes(novos_codigos[inicio:fim], categories=categorias), index=coluna.index))
+        inicio = fim
+    return tuple(resultado)
+
+def _converter_valores_distintos(serie, conversor):
+    """Aplica `conversor` só aos valores distintos da coluna (datas, horas e textos se repetem muito)."""
+    codigos, unicos = pd.factorize(serie)
+    convertidos = conversor(pd.Series(unicos, dtype=object))
+    # reindex com o código -1 (valor ausente) devolve NaT/<NA>
+    return convertidos.reindex(codigos).set_axis(serie.index)
+
+def converter_datas(serie):
+    """Datas nos formatos 'AAAA-MM-DD' ou 'DD/MM/AAAA' (ou já datas, vindas do Excel/Parquet)."""
+    def conversor(unicos):
+        iso = pd.to_datetime(unicos, format='ISO8601', errors='coerce')
+        return iso.fillna(pd.to_datetime(unicos, format='%d/%m/%Y', errors='coerce'))
+    return _converter_valores_distintos(serie, conversor)
+
+def converter_horas(serie):
+    """Horas 'HH:MM' ou 'HH:MM:SS' (ou datetime.time, vindas do Excel) como duração desde a meia-noite."""
+    def conversor(unicos):
+        texto = unicos.astype('string').str.strip()
+        texto = texto.where(~texto.str.fullmatch(r'\d{1,2}:\d{2}').fillna(False), texto + ':00')
+        return pd.to_timedelta(texto, errors='coerce')
+    return _converter_valores_distintos(serie, conversor)
+
+def normalizar_pistol(serie):
+    """'Win ', 'LOSE'... -> 'win'/'lose' como categoria."""
+    return _converter_valores_distintos(serie, lambda unicos: unicos.astype(str).str.lower().str.strip()).astype('category')
+
+COLUNAS_SCORES = ['placar_final_nosso', 'placar_final_adv', 'placar_ct_nosso_como_ct', 'placar_ct_adv_como_tr', 'placar_tr_nosso_como_tr', 'placar_tr_adv_como_ct']
+COLUNAS_RESULTADO = ['nosso_time_venceu_partida', 'nosso_time_venceu_lado_ct', 'nosso_time_venceu_lado_tr']
+
+# Esquema do DataFrame processado, o mesmo para CSV, planilha modelo e Parquet.
+# Textos repetitivos viram categorias e placares inteiros pequenos anuláveis.
+ESQUEMA_PROCESSADO = {
+    'data_jogo': 'datetime64[ns]',
+    'hora_jogo': 'timedelta64[ns]',
+    'time_adversario': 'category',
+    'mapa': 'category',
+    'placar_final_str': 'category', 'placar_ct_str': 'category', 'placar_tr_str': 'category',
+    'pistol_ct_resultado': 'category', 'pistol_tr_resultado': 'category',
+    'composicao_nossa': 'category', 'composicao_adversaria': 'category',
+    **{coluna: 'Int16' for coluna in COLUNAS_SCORES},
+    'placar_final_valido': 'bool', 'placar_ct_valido': 'bool', 'placar_tr_valido': 'bool', 'placares_validos': 'bool',
+    **{coluna: 'bool' for coluna in COLUNAS_RESULTADO},
+}
+
+# Colunas que precisam de interpretação antes do cast (o resto é só astype)
+CONVERSORES_ESQUEMA = {
+    'data_jogo': converter_datas,
+    'hora_jogo': converter_horas,
+    'pistol_ct_resultado': normalizar_pistol,
+    'pistol_tr_resultado': normalizar_pistol,
+}
+
+def aplicar_esquema(df):
+    """Converte as colunas presentes para os tipos de ESQUEMA_PROCESSADO. Colunas já no tipo certo não são tocadas."""
+    for coluna, tipo in ESQUEMA_PROCESSADO.items():
+        if coluna not in df.columns or df[coluna].dtype == tipo:
+            continue
+        if coluna in CONVERSORES_ESQUEMA:
+            df[coluna] = CONVERSORES_ESQUEMA[coluna](df[coluna])
+        if df[coluna].dtype != tipo:
+            df[coluna] = df[coluna].astype(tipo)
+    return df
+
+def processar_dados(df):
+    """Processa o DataFrame para cálculos."""
+    df = df.rename(columns={
+        'Data do jogo': 'data_jogo',
+        'Hora do jogo': 'hora_jogo',
+        'Time adversario': 'time_adversario',
+        'Mapa jogado': 'mapa',
+        'Placar final do jogo': 'placar_final_str',
+        'Placar lado CT': 'placar_ct_str',
+        'Placar lado TR': 'placar_tr_str',
+        'Pistol CT': 'pistol_ct_resultado',
+        'Pistol TR': 'pistol_tr_resultado',
+        'Composicao': 'composicao_nossa',
+        'Composicao adversaria': 'composicao_adversaria'
+    })
+
+    # Os três placares são extraídos juntos em uma única passada vetorizada
+    scores, validos = extrair_scores_colunas(df, ['placar_final_str', 'placar_ct_str', 'placar_tr_str'])
+    df['placar_final_nosso'], df['placar_final_adv'] = scores['placar_final_str']
+    df['placar_ct_nosso_como_ct'], df['placar_ct_adv_como_tr'] = scores['placar_ct_str']
+    df['placar_tr_nosso_como_tr'], df['placar_tr_adv_como_ct'] = scores['placar_tr_str']
+    df['placar_final_valido'] = validos['placar_final_str']
+    df['placar_ct_valido'] = validos['placar_ct_str']
+    df['placar_tr_valido'] = validos['placar_tr_str']
+    df['placares_validos'] = validos.all(axis=1)
+
+    # Composições internadas: cada composição distinta vira uma categoria compartilhada pelas duas colunas
+    df['composicao_nossa_clean'], df['composicao_adversaria_clean'] = codificar_composicoes(
+        df['composicao_nossa'], df['composicao_adversaria'])
+
+    # Comparações entre Int64 podem gerar <NA>; linhas com placar inválido contam como derrota
+    df['nosso_time_venceu_partida'] = (df['placar_final_nosso'] > df['placar_final_adv']).fillna(False).astype(bool)
+    df['nosso_time_venceu_lado_ct'] = (df['placar_ct_nosso_como_ct'] > df['placar_ct_adv_como_tr']).fillna(False).astype(bool)
+    df['nosso_time_venceu_lado_tr'] = (df['placar_tr_nosso_como_tr'] > df['placar_tr_adv_como_ct']).fillna(False).astype(bool)
+
+    return aplicar_esquema(df)
@@ -0,0 +1,285 @@
+"""Relatório analítico em PDF (ReportLab)."""
+import functools
+import io
+
+import pandas as pd
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.utils import simpleSplit
+
+from .h2h import ConfrontosH2H
+
+# --- Funções para Geração de PDF ---
+COR_POSITIVA_PDF = colors.Color(0, 0.6, 0)
+
+def get_reportlab_color(value):
+    if pd.isna(value): return colors.grey
+    if value > 50: return COR_POSITIVA_PDF
+    elif value < 50: return colors.red
+    else: return colors.orange
+
+@functools.lru_cache(maxsize=None)
+def estilos_relatorio():
+    """Folha de estilos do relatório, criada uma única vez e compartilhada por todos os PDFs."""
+    styles = getSampleStyleSheet()
+    return {
+        'normal': styles['Normal'],
+        'title': ParagraphStyle('Title', parent=styles['h1'], fontName='Helvetica-Bold', fontSize=18, alignment=TA_CENTER, spaceAfter=0.2*inch),
+        'h2': ParagraphStyle('Heading2', parent=styles['h2'], fontName='Helvetica-Bold', fontSize=14, spaceBefore=0.2*inch, spaceAfter=0.1*inch),
+        'h3': ParagraphStyle('Heading3', parent=styles['h3'], fontName='Helvetica-Bold', fontSize=11, spaceBefore=0.15*inch, spaceAfter=0.05*inch),
+        'body': ParagraphStyle('BodyText', parent=styles['Normal'], fontSize=9), # Renomeado para evitar modificar o default
+    }
+
+# Estilos derivados: (estilo pai, atributos). Cor e recuo variam por chamada.
+ESTILOS_DERIVADOS_PDF = {
+    'MetricLabel': ('normal', dict(fontName='Helvetica-Bold', spaceBefore=6)),
+    'MetricValue': ('normal', dict(fontName='Helvetica-Bold', fontSize=14, spaceBefore=2)),
+    'MetricDetails': ('normal', dict(fontSize=8, textColor=colors.dimgrey, spaceBefore=1)),
+    'CompWR': ('body', {}),
+}
+
+@functools.lru_cache(maxsize=None)
+def estilo_paragrafo(nome, text_color=None, left_indent=0):
+    """Variação de um estilo derivado. Só existem poucas combinações de cor/recuo, então cada uma é criada uma vez."""
+    pai, atributos = ESTILOS_DERIVADOS_PDF[nome]
+    atributos = dict(atributos)
+    if text_color is not None:
+        atributos['textColor'] = text_color
+    if left_indent:
+        atributos['leftIndent'] = left_indent
+    return ParagraphStyle(nome, parent=estilos_relatorio()[pai], **atributos)
+
+def formatar_intervalo(intervalo):
+    if intervalo is None or pd.isna(intervalo[0]):
+        return "N/A"
+    return f"{intervalo[0]:.2f}–{intervalo[1]:.2f}%"
+
+def add_metric_to_story(story, label, value, total_label="", total_value="", is_percentage=True, indent=0, intervalo=None):
+    color = get_reportlab_color(value) if is_percentage else colors.black
+    if pd.isna(value):
+        formatted_value = "N/A"
+    elif is_percentage:
+        formatted_value = f"{value:.2f}%"
+    else:
+        try:
+            formatted_value = f"{int(value)}" if pd.api.types.is_number(value) else str(value)
+        except ValueError:
+            formatted_value = str(value)
+
+    label_style = estilo_paragrafo('MetricLabel', left_indent=indent)
+    value_style = estilo_paragrafo('MetricValue', text_color=color, left_indent=indent)
+    details_style = estilo_paragrafo('MetricDetails', left_indent=indent)
+
+    details_text_pdf = f"{total_value} {total_label}" if total_label and total_value is not None else ""
+    if "rounds CT jogados" in total_label or "rounds TR jogados" in total_label:
+        details_text_pdf = details_text_pdf.replace("rounds", "partidas (lados)").replace("jogados", "jogadas")
+    if "pistols CT disputados" in total_label or "pistols TR disputados" in total_label:
+        details_text_pdf = details_text_pdf.replace("pistols", "partidas com pistol").replace("disputados", "disputadas")
+    label_pdf = label
+    if "Win Rate CT (Rounds)" in label:
+        label_pdf = label.replace("(Rounds)", "(Lados Vencidos)")
+    if "Win Rate TR (Rounds)" in label:
+        label_pdf = label.replace("(Rounds)", "(Lados Vencidos)")
+    if intervalo is not None and not pd.isna(intervalo[0]):
+        details_text_pdf = f"{details_text_pdf} · IC 95%: {formatar_intervalo(intervalo)}" if details_text_pdf else f"IC 95%: {formatar_intervalo(intervalo)}"
+
+    story.append(Paragraph(label_pdf, label_style))
+    story.append(Paragraph(formatted_value, value_style))
+    if details_text_pdf:
+        story.append(Paragraph(details_text_pdf, details_style))
+    story.append(Spacer(1, 0.1*inch))
+
+@functools.lru_cache(maxsize=4096)
+def quebrar_texto_celula(texto, largura, fonte='Helvetica', tamanho=10):
+    """Quebra o texto nas mesmas linhas que um Paragraph usaria, para a célula poder ser uma string simples.
+
+    As composições se repetem muito entre as linhas do H2H, então cada texto é medido uma vez só.
+    """
+    return "\n".join(simpleSplit(texto, fonte, tamanho, largura))
+
+def comandos_cor_por_faixa(valores, coluna, linha_inicial):
+    """Comandos TEXTCOLOR agrupando linhas consecutivas de mesma cor (o H2H vem ordenado por win rate)."""
+    comandos = []
+    inicio_faixa, cor_faixa = linha_inicial, None
+    for deslocamento, valor in enumerate(valores):
+        cor = get_reportlab_color(valor)
+        if cor is not cor_faixa:
+            if cor_faixa is not None:
+                comandos.append(('TEXTCOLOR', (coluna, inicio_faixa), (coluna, linha_inicial + deslocamento - 1), cor_faixa))
+            inicio_faixa, cor_faixa = linha_inicial + deslocamento, cor
+    if cor_faixa is not None:
+        comandos.append(('TEXTCOLOR', (coluna, inicio_faixa), (coluna, linha_inicial + len(valores) - 1), cor_faixa))
+    return comandos
+
+LARGURAS_COLUNAS_H2H = [1.8*inch, 1.8*inch, 0.8*inch, 0.8*inch, 1*inch, 1*inch]
+ROTULOS_ORDENACAO_PDF = {'score': "score", 'win_rate': "win rate", 'partidas': "partidas disputadas", 'vitorias': "vitórias"}
+LEGENDA_SCORE_PDF = ("Ordenado pelo score: limite inferior do intervalo de confiança de 95% (Wilson) do win rate. "
+                     "Uma taxa alta com poucas partidas tem intervalo largo e score baixo.")
+PADDING_HORIZONTAL_H2H = 3
+
+def create_h2h_table_reportlab(h2h_stats_df):
+    if h2h_stats_df is None or h2h_stats_df.empty:
+        return Paragraph("Não há dados de confrontos diretos (H2H) para exibir.", estilos_relatorio()['normal'])
+    largura_texto_comp = LARGURAS_COLUNAS_H2H[0] - 2 * PADDING_HORIZONTAL_H2H
+    win_rates = h2h_stats_df['win_rate_vs_adv_comp'].tolist()
+    data = [["Nossa Composição", "Composição Adversária", "Vitórias da Nossa Comp.", "Partidas Disputadas", "Win Rate vs Adv.", "IC 95%"]]
+    # Células como strings simples (pré-quebradas) em vez de um Paragraph por célula
+    data.extend(
+        [quebrar_texto_celula(str(nossa), largura_texto_comp), quebrar_texto_celula(str(adv), largura_texto_comp),
+         str(vitorias), str(partidas), f"{wr:.2f}%" if not pd.isna(wr) else "N/A", formatar_intervalo(intervalo)]
+        for nossa, adv, vitorias, partidas, wr, *intervalo in zip(
+            h2h_stats_df['nossa_composicao'], h2h_stats_df['composicao_adversaria'],
+            h2h_stats_df['total_vitorias_nossa_comp'], h2h_stats_df['total_partidas_disputadas'], win_rates,
+            h2h_stats_df['ic_inferior'], h2h_stats_df['ic_superior'])
+    )
+    # repeatRows repete o cabeçalho em cada página quando a tabela é dividida
+    table = Table(data, colWidths=LARGURAS_COLUNAS_H2H, repeatRows=1)
+    style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),('TOPPADDING', (0,0), (-1,0), 10),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('FONTSIZE', (0,0), (-1,-1), 8),
+        ('LEFTPADDING', (0,0), (-1,-1), PADDING_HORIZONTAL_H2H),('RIGHTPADDING', (0,0), (-1,-1), PADDING_HORIZONTAL_H2H),
+        # Composições e win rate mantêm a aparência de Paragraph (Normal: 10pt, alinhado à esquerda)
+        ('ALIGN', (0, 1), (1, -1), 'LEFT'), ('ALIGN', (4, 1), (4, -1), 'LEFT'),
+        ('FONTSIZE', (0, 1), (1, -1), 10), ('LEADING', (0, 1), (1, -1), 12),
+        ('FONTSIZE', (4, 1), (4, -1), 10), ('LEADING', (4, 1), (4, -1), 12),
+    ] + comandos_cor_por_faixa(win_rates, 4, 1))
+    table.setStyle(style)
+    return table
+
+def gerar_relatorio_pdf(metricas_globais, df_map_ranking, metricas_detalhadas_por_mapa, mapas_unicos_ordenados, callback_progresso=None,
+                        limite_h2h=None, min_partidas_h2h=1, ordenar_h2h='score'):
+    """Gera o relatório em PDF e retorna os bytes.
+
+    A tabela H2H de cada mapa traz os confrontos com pelo menos `min_partidas_h2h` partidas na
+    ordenação `ordenar_h2h` (uma de ORDENACOES_H2H), divididos entre páginas com o cabeçalho
+    repetido; `limite_h2h` corta a tabela nos primeiros confrontos (None = todos).
+
+    callback_progresso(fracao, etapa), se informado, recebe o andamento entre 0 e 1: a montagem
+    do conteúdo ocupa os primeiros 30% e a diagramação pelo ReportLab o restante.
+    """
+    def informar_progresso(fracao, etapa):
+        if callback_progresso is not None:
+            callback_progresso(min(fracao, 1.0), etapa)
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=(8.5*inch, 11*inch), leftMargin=0.5*inch, rightMargin=0.5*inch, topMargin=0.5*inch, bottomMargin=0.5*inch)
+    story = []
+    estilos = estilos_relatorio()
+    title_style, h2_style, h3_style, normal_style = estilos['title'], estilos['h2'], estilos['h3'], estilos['body']
+
+    story.append(Paragraph("Relatório Analítico de Partidas 📊", title_style))
+    story.append(Paragraph("🌎 Visão Geral Global", h2_style))
+    total_partidas_globais = metricas_globais.get('total_partidas_jogadas_nosso_time', 0)
+    add_metric_to_story(story, "Win Rate Lado CT", metricas_globais['win_rate_ct_rounds'], "partidas analisadas", total_partidas_globais,
+                        intervalo=metricas_globais['intervalos_taxas'].get('win_rate_ct_rounds'))
+    add_metric_to_story(story, "Win Rate Pistol CT", metricas_globais['win_rate_pistol_ct'], "partidas analisadas", total_partidas_globais,
+                        intervalo=metricas_globais['intervalos_taxas'].get('win_rate_pistol_ct'))
+    add_metric_to_story(story, "Win Rate Lado TR", metricas_globais['win_rate_tr_rounds'], "partidas analisadas", total_partidas_globais,
+                        intervalo=metricas_globais['intervalos_taxas'].get('win_rate_tr_rounds'))
+    add_metric_to_story(story, "Win Rate Pistol TR", metricas_globais['win_rate_pistol_tr'], "partidas analisadas", total_partidas_globais,
+                        intervalo=metricas_globais['intervalos_taxas'].get('win_rate_pistol_tr'))
+
+    story.append(Spacer(1, 0.2*inch))
+    story.append(Paragraph("🏆 Ranking de Mapas", h2_style))
+    if not df_map_ranking.empty:
+        ranking_data = [["Rank", "Mapa", "Win Rate (Partidas)", "Total Partidas", "IC 95%", "Melhor Composição Nossa"]] # Label ajustado
+        df_map_ranking_pdf = df_map_ranking.reset_index(drop=True)
+        for i, row in df_map_ranking_pdf.iterrows():
+            wr_partidas_text = f"{row['win_rate_geral_partidas_nosso_time']:.2f}%"
+            comp_info_mapa = metricas_detalhadas_por_mapa.get(row['mapa'], {}).get('melhor_nossa_composicao_info', {})
+
+            comp_str = comp_info_mapa.get('composicao', 'N/A')
+            wr_comp_partidas = comp_info_mapa.get('win_rate_partidas', 0) # Usar win_rate_partidas
+            partidas_jog_comp = comp_info_mapa.get('partidas_jogadas', 0) # Usar partidas_jogadas
+            intervalo_comp = (comp_info_mapa.get('ic_inferior'), comp_info_mapa.get('ic_superior'))
+            comp_details_str = f"{comp_str} (WR Partidas: {wr_comp_partidas:.2f}%, {partidas_jog_comp} partidas, IC 95%: {formatar_intervalo(intervalo_comp)})"
+
+            # Mapa e win rate não quebram linha: strings simples bastam; só a composição precisa de Paragraph
+            ranking_data.append([
+                str(i + 1),
+                str(row['mapa']),
+                wr_partidas_text,
+                str(row['total_partidas']),
+                formatar_intervalo((row['ic_inferior'], row['ic_superior'])),
+                Paragraph(comp_details_str, normal_style)
+            ])
+        map_ranking_table = Table(ranking_data, colWidths=[0.4*inch, 1.1*inch, 1.1*inch, 0.7*inch, 1.1*inch, 2.6*inch], repeatRows=1)
+        map_ranking_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.darkgrey),('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+            ('TOPPADDING', (0,0), (-1,0), 8),('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ('FONTSIZE', (0,0), (-1,-1), 7),
+            ('FONTSIZE', (1, 1), (2, -1), normal_style.fontSize), ('LEADING', (1, 1), (2, -1), normal_style.leading),
+            ('FONTSIZE', (4, 1), (4, -1), normal_style.fontSize), ('LEADING', (4, 1), (4, -1), normal_style.leading),
+        ] + comandos_cor_por_faixa(df_map_ranking_pdf['win_rate_geral_partidas_nosso_time'].tolist(), 2, 1)))
+        story.append(map_ranking_table)
+        story.append(Paragraph(LEGENDA_SCORE_PDF, normal_style))
+    else:
+        story.append(Paragraph("Não há dados suficientes para gerar o ranking de mapas.", normal_style))
+    story.append(PageBreak())
+
+    for indice_mapa, mapa_nome in enumerate(mapas_unicos_ordenados):
+        informar_progresso(0.3 * indice_mapa / len(mapas_unicos_ordenados), f"Montando mapa {mapa_nome}...")
+        metricas_mapa = metricas_detalhadas_por_mapa.get(mapa_nome)
+        if not metricas_mapa: continue
+        story.append(Paragraph(f"🗺️ Análise do Mapa: {mapa_nome}", h2_style))
+        total_partidas_mapa = metricas_mapa.get('total_partidas_jogadas_nosso_time', 0)
+        add_metric_to_story(story, f"Win Rate Geral no {mapa_nome}", metricas_mapa['win_rate_geral_partidas_nosso_time'], "partidas jogadas", total_partidas_mapa,
+                            intervalo=metricas_mapa['intervalos_taxas'].get('win_rate_geral_partidas_nosso_time'))
+        story.append(Spacer(1, 0.1*inch))
+        add_metric_to_story(story, "Win Rate Lado CT", metricas_mapa['win_rate_ct_rounds'], "partidas analisadas", total_partidas_mapa, indent=0.2*inch,
+                            intervalo=metricas_mapa['intervalos_taxas'].get('win_rate_ct_rounds'))
+        add_metric_to_story(story, "Win Rate Pistol CT", metricas_mapa['win_rate_pistol_ct'], "partidas analisadas", total_partidas_mapa, indent=0.2*inch,
+                            intervalo=metricas_mapa['intervalos_taxas'].get('win_rate_pistol_ct'))
+        add_metric_to_story(story, "Win Rate Lado TR", metricas_mapa['win_rate_tr_rounds'], "partidas analisadas", total_partidas_mapa, indent=0.2*inch,
+                            intervalo=metricas_mapa['intervalos_taxas'].get('win_rate_tr_rounds'))
+        add_metric_to_story(story, "Win Rate Pistol TR", metricas_mapa['win_rate_pistol_tr'], "partidas analisadas", total_partidas_mapa, indent=0.2*inch,
+                            intervalo=metricas_mapa['intervalos_taxas'].get('win_rate_pistol_tr'))
+
+        story.append(Spacer(1, 0.2*inch))
+        # Atualizar label para refletir que a melhor comp é por partida
+        story.append(Paragraph(f"✨ Melhor Composição no mapa {mapa_nome} (pelo score de ranking)", h3_style))
+        melhor_comp_info = metricas_mapa['melhor_nossa_composicao_info']
+        if melhor_comp_info['composicao'] != "N/A":
+            comp_text = f"Composição: {melhor_comp_info['composicao']}" # Lado não é mais relevante aqui
+            # Usar win_rate_partidas e partidas_jogadas
+            wr_text = (f"Win Rate (Partidas): {melhor_comp_info.get('win_rate_partidas', 0):.2f}% ({melhor_comp_info.get('partidas_jogadas', 0)} partidas jogadas, "
+                       f"IC 95%: {formatar_intervalo((melhor_comp_info['ic_inferior'], melhor_comp_info['ic_superior']))})")
+            story.append(Paragraph(comp_text, normal_style))
+            story.append(Paragraph(wr_text, estilo_paragrafo('CompWR', text_color=get_reportlab_color(melhor_comp_info.get('win_rate_partidas', 0)))))
+        else:
+            story.append(Paragraph("Não há dados suficientes de nossas composições neste mapa.", normal_style))
+
+        story.append(Spacer(1, 0.2*inch))
+        story.append(Paragraph(f"⚔️ Confrontos: Nossa Composição vs. Composição Adversária em {mapa_nome} (Resultado da Partida)", h3_style))
+        confrontos = ConfrontosH2H(metricas_mapa.get('h2h_stats'))
+        selecionados = confrontos.top(limite_h2h, ordenar_h2h, min_partidas_h2h)
+        story.append(create_h2h_table_reportlab(selecionados))
+        if len(selecionados) < len(confrontos):
+            story.append(Paragraph(
+                f"Exibindo {len(selecionados)} de {confrontos.contar(min_partidas_h2h)} confrontos com pelo menos {min_partidas_h2h} partida(s) "
+                f"({len(confrontos)} no total), por {ROTULOS_ORDENACAO_PDF[ordenar_h2h]}.", normal_style))
+        if mapa_nome != mapas_unicos_ordenados[-1]: story.append(PageBreak())
+
+    # O ReportLab informa a estimativa de flowables ('SIZE_EST') e quantos já foram diagramados ('PROGRESS')
+    total_flowables = [max(len(story), 1)]
+    def progresso_build(tipo, valor):
+        if tipo == 'SIZE_EST':
+            total_flowables[0] = max(valor, 1)
+        elif tipo == 'PROGRESS':
+            informar_progresso(0.3 + 0.7 * valor / total_flowables[0], "Diagramando páginas...")
+    doc.setProgressCallBack(progresso_build)
+    doc.build(story)
+    informar_progresso(1.0, "Relatório pronto")
+    buffer.seek(0)
+    return buffer.getvalue()
@@ -0,0 +1,341 @@
+"""API HTTP local com as métricas em JSON e o relatório PDF, para outras ferramentas (bot, planilhas...).
+
+Servidor asyncio só com a biblioteca padrão (HTTP/1.1 com keep-alive):
+
+    python -m valdash.servidor --porta 8765 --processos 2
+
+    POST /datasets?nome=partidas.csv       corpo = o arquivo (.csv, .xlsx ou .parquet, pelo nome);
+                                           devolve o mesmo que GET /datasets/{id}
+    GET  /datasets/{id}                    métricas globais e por mapa (taxas com IC 95%, melhor composição) e ranking de mapas
+    GET  /datasets/{id}/mapas/{mapa}       métricas de um mapa
+    GET  /datasets/{id}/composicoes        ?mapa=&tipo=Nossa|Adversária&min_partidas=  (por score de ranking)
+    GET  /datasets/{id}/h2h                ?mapa=&ordenar_por=score&min_partidas=&pagina=1&tamanho=50&nossa=
+    GET  /datasets/{id}/relatorio.pdf      relatório PDF
+    GET  /saude                            estado e estatísticas do cache
+
+O ID do dataset é o SHA-256 do conteúdo do arquivo. Leitura, métricas e PDF rodam em um pool
+de processos, fora do event loop; os resultados ficam em um ArmazemCompartilhado por dataset
+(LRU com limite de memória) e pedidos simultâneos do mesmo arquivo fazem um só cálculo. Sem
+`mapa`, as consultas usam as métricas globais.
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from .armazem import LIMITE_MB_PADRAO, ArmazemCompartilhado
+from .h2h import ORDENACOES_H2H, ConfrontosH2H
+
+PORTA_PADRAO = 8765
+LIMITE_UPLOAD_MB = 200
+TAMANHO_PAGINA_PADRAO = 50
+TAMANHO_PAGINA_MAXIMO = 1000
+TAXAS = ['win_rate_geral_partidas_nosso_time', 'win_rate_ct_rounds', 'win_rate_tr_rounds', 'win_rate_pistol_ct', 'win_rate_pistol_tr']
+MOTIVOS_HTTP = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class ErroHTTP(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+# --- Trabalho pesado: roda nos processos do pool ---
+def _aquecer():
+    """Importa o núcleo no processo de trabalho, para o primeiro pedido não pagar a importação."""
+    from . import leitura, metricas, relatorio_pdf  # noqa: F401
+
+def _calcular_dataset(conteudo, nome_arquivo):
+    """Lê o arquivo e monta o dashboard. Retorna (dashboard, {'linhas', 'linhas_invalidas'})."""
+    from .leitura import ler_partidas, resumir_validacao
+    from .metricas import montar_dashboard
+    df_processado = ler_partidas(io.BytesIO(conteudo), nome_arquivo)
+    if df_processado is None:
+        raise ValueError("arquivo sem linhas")
+    resumo = resumir_validacao(df_processado)
+    return montar_dashboard(df_processado), {'linhas': int(resumo['linhas']), 'linhas_invalidas': int(resumo['linhas_invalidas'])}
+
+def _gerar_pdf(dashboard):
+    from .relatorio_pdf import gerar_relatorio_pdf
+    mapas_unicos, metricas_globais, metricas_detalhadas_por_mapa, df_map_ranking = dashboard
+    return gerar_relatorio_pdf(metricas_globais, df_map_ranking, metricas_detalhadas_por_mapa, mapas_unicos)
+
+
+# --- Conversão para JSON ---
+def para_json(valor):
+    """Converte DataFrames, tipos do NumPy/pandas e NaN em valores que o json aceita (NaN/NA viram null)."""
+    if isinstance(valor, pd.DataFrame):
+        return [para_json(registro) for registro in valor.to_dict('records')]
+    if isinstance(valor, dict):
+        return {str(chave): para_json(item) for chave, item in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [para_json(item) for item in valor]
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    if valor is pd.NA or valor is pd.NaT:
+        return None
+    return valor
+
+def _codificar(dados):
+    return json.dumps(para_json(dados), ensure_ascii=False, allow_nan=False).encode('utf-8')
+
+def resumo_metricas(metricas):
+    """Taxas (com IC 95%), totais e melhor composição de um dict de métricas, sem as tabelas de composição e H2H."""
+    intervalos = metricas.get('intervalos_taxas') or {}
+    return {
+        'nome': metricas['nome_mapa_ou_contexto'],
+        'partidas': metricas['total_partidas_jogadas_nosso_time'],
+        'vitorias': metricas.get('vitorias_partidas_nosso_time', 0),
+        'taxas': {taxa: {'valor': metricas[taxa], 'ic_inferior': intervalos.get(taxa, (None, None))[0],
+                         'ic_superior': intervalos.get(taxa, (None, None))[1]} for taxa in TAXAS},
+        'melhor_composicao': {chave: valor for chave, valor in metricas['melhor_nossa_composicao_info'].items() if chave != 'raw_composicao'},
+    }
+
+
+class ServidorMetricas:
+    """Rotas da API sobre um pool de processos e um ArmazemCompartilhado."""
+
+    def __init__(self, processos=None, limite_mb=LIMITE_MB_PADRAO, limite_upload_mb=LIMITE_UPLOAD_MB, registrar_pedidos=True):
+        self.processos = processos or os.cpu_count() or 1
+        # 'spawn': o processo principal tem threads (pool abaixo), e fork com threads pode travar
+        self._processos = ProcessPoolExecutor(max_workers=self.processos, mp_context=multiprocessing.get_context('spawn'))
+        # Threads só esperam o pool de processos (ou montam índices leves); várias por processo
+        self._threads = ThreadPoolExecutor(max_workers=4 * (self.processos + 1), thread_name_prefix="valdash-api")
+        self.armazem = ArmazemCompartilhado(limite_mb=limite_mb)
+        self.limite_upload_bytes = int(limite_upload_mb * 1024 * 1024)
+        self.registrar_pedidos = registrar_pedidos
+        self.pedidos = 0
+
+    def aquecer(self):
+        for _ in range(self.processos):
+            self._processos.submit(_aquecer)
+
+    def encerrar(self):
+        # Espera os processos saírem (só terminam o cálculo em andamento) para não deixar órfãos
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        self._processos.shutdown(wait=True, cancel_futures=True)
+
+    async def _no_armazem(self, chave, calcular):
+        """armazem.obter em uma thread: esperar o cálculo (próprio ou de outro pedido) não bloqueia o event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._threads, self.armazem.obter, chave, calcular)
+
+    async def _em_thread(self, funcao, *argumentos):
+        """Trabalho de pandas/JSON de um pedido (filtrar, ordenar, codificar) fora do event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._threads, funcao, *argumentos)
+
+    def _no_pool(self, funcao, *argumentos):
+        return lambda: self._processos.submit(funcao, *argumentos).result()
+
+    # --- Dados de um dataset ---
+    async def _dataset(self, id_dataset):
+        def desconhecido():
+            raise ErroHTTP(404, f"dataset {id_dataset} desconhecido (ou descartado do cache): envie o arquivo em POST /datasets")
+        return await self._no_armazem(('dashboard', id_dataset), desconhecido)
+
+    async def _enviar_dataset(self, conteudo, nome_arquivo):
+        # Arquivos grandes levam dezenas de ms para o hash: fora do event loop também
+        id_dataset = await self._em_thread(lambda: hashlib.sha256(conteudo).hexdigest())
+        try:
+            await self._no_armazem(('dashboard', id_dataset), self._no_pool(_calcular_dataset, conteudo, nome_arquivo))
+        except ErroHTTP:
+            raise
+        except Exception as erro:
+            raise ErroHTTP(400, f"não foi possível processar {nome_arquivo}: {type(erro).__name__}: {erro}") from erro
+        return await self._resumo_dataset(id_dataset)
+
+    async def _resumo_dataset(self, id_dataset):
+        (mapas_unicos, metricas_globais, metricas_detalhadas_por_mapa, df_map_ranking), validacao = await self._dataset(id_dataset)
+        def codificar():
+            return _codificar({
+                'dataset': id_dataset, **validacao,
+                'global': resumo_metricas(metricas_globais),
+                'mapas': {mapa: resumo_metricas(metricas_detalhadas_por_mapa[mapa]) for mapa in mapas_unicos},
+                'ranking_mapas': df_map_ranking,
+            })
+        return await self._no_armazem(('resumo_json', id_dataset), codificar)
+
+    async def _metricas(self, id_dataset, mapa=None):
+        (_, metricas_globais, metricas_detalhadas_por_mapa, _), _ = await self._dataset(id_dataset)
+        if mapa is None:
+            return metricas_globais
+        if mapa not in metricas_detalhadas_por_mapa:
+            raise ErroHTTP(404, f"mapa {mapa} não encontrado no dataset")
+        return metricas_detalhadas_por_mapa[mapa]
+
+    async def _confrontos(self, id_dataset, mapa=None):
+        metricas = await self._metricas(id_dataset, mapa)
+        return await self._no_armazem(('confrontos_h2h', id_dataset, mapa), lambda: ConfrontosH2H(metricas.get('h2h_stats')))
+
+    async def _composicoes(self, id_dataset, parametros):
+        metricas = await self._metricas(id_dataset, parametros.get('mapa'))
+        composicoes = metricas['composicao_stats']
+        tipo = parametros.get('tipo', 'Nossa')
+        min_partidas = _inteiro(parametros, 'min_partidas', 1)
+        def selecionar():
+            if composicoes.empty:
+                return _codificar({'composicoes': []})
+            selecionadas = composicoes[(composicoes['tipo'] == tipo) & (composicoes['total_partidas_jogadas'] >= min_partidas)]
+            selecionadas = selecionadas.sort_values(['score_ranking', 'win_rate_partidas'], ascending=False, kind='stable')
+            return _codificar({'composicoes': selecionadas.drop(columns=['cor_win_rate'])})
+        return await self._em_thread(selecionar)
+
+    async def _h2h(self, id_dataset, parametros):
+        confrontos = await self._confrontos(id_dataset, parametros.get('mapa'))
+        min_partidas = _inteiro(parametros, 'min_partidas', 1)
+        if 'nossa' in parametros:
+            def da_composicao():
+                selecionados = confrontos.da_composicao(parametros['nossa'], min_partidas)
+                return _codificar({'total': len(selecionados), 'confrontos': selecionados})
+            return await self._em_thread(da_composicao)
+        ordenar_por = parametros.get('ordenar_por', 'score')
+        if ordenar_por not in ORDENACOES_H2H:
+            raise ErroHTTP(400, f"ordenar_por deve ser um de {', '.join(ORDENACOES_H2H)}")
+        pagina = _inteiro(parametros, 'pagina', 1)
+        tamanho = min(_inteiro(parametros, 'tamanho', TAMANHO_PAGINA_PADRAO), TAMANHO_PAGINA_MAXIMO)
+        def paginar():
+            return _codificar({'total': confrontos.contar(min_partidas), 'pagina': pagina, 'tamanho': tamanho,
+                               'confrontos': confrontos.pagina(pagina, tamanho, ordenar_por, min_partidas)})
+        return await self._em_thread(paginar)
+
+    async def _relatorio_pdf(self, id_dataset):
+        dashboard, _ = await self._dataset(id_dataset)
+        return await self._no_armazem(('pdf', id_dataset), self._no_pool(_gerar_pdf, dashboard))
+
+    # --- HTTP ---
+    async def rotear(self, metodo, alvo, corpo):
+        """Resposta (status, content-type, bytes) de um pedido."""
+        partes = urlsplit(alvo)
+        segmentos = [unquote(segmento) for segmento in partes.path.strip('/').split('/') if segmento]
+        parametros = {chave: valores[-1] for chave, valores in parse_qs(partes.query).items()}
+        json_tipo = 'application/json; charset=utf-8'
+
+        if segmentos == ['saude']:
+            if metodo != 'GET':
+                raise ErroHTTP(405, "use GET")
+            return 200, json_tipo, _codificar({'estado': 'ok', 'pedidos': self.pedidos, 'cache': self.armazem.estatisticas()})
+        if segmentos == ['datasets']:
+            if metodo != 'POST':
+                raise ErroHTTP(405, "use POST /datasets?nome=arquivo.csv com o arquivo no corpo")
+            if not corpo:
+                raise ErroHTTP(400, "corpo vazio: envie o conteúdo do arquivo")
+            return 200, json_tipo, await self._enviar_dataset(corpo, parametros.get('nome', 'partidas.csv'))
+        if len(segmentos) < 2 or segmentos[0] != 'datasets':
+            raise ErroHTTP(404, f"rota desconhecida: {partes.path}")
+        if metodo != 'GET':
+            raise ErroHTTP(405, "use GET")
+
+        id_dataset, resto = segmentos[1], segmentos[2:]
+        if not resto:
+            return 200, json_tipo, await self._resumo_dataset(id_dataset)
+        if resto[0] == 'mapas' and len(resto) == 2:
+            metricas = await self._metricas(id_dataset, resto[1])
+            return 200, json_tipo, await self._em_thread(lambda: _codificar(resumo_metricas(metricas)))
+        if resto == ['composicoes']:
+            return 200, json_tipo, await self._composicoes(id_dataset, parametros)
+        if resto == ['h2h']:
+            return 200, json_tipo, await self._h2h(id_dataset, parametros)
+        if resto == ['relatorio.pdf']:
+            return 200, 'application/pdf', await self._relatorio_pdf(id_dataset)
+        raise ErroHTTP(404, f"rota desconhecida: {partes.path}")
+
+    async def atender(self, leitor, escritor):
+        """Uma conexão: lê pedidos HTTP/1.1 em sequência (keep-alive) até o cliente fechar."""
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                metodo, alvo, versao = linha.decode('latin-1').split()
+                cabecalhos = {}
+                while (cabecalho := await leitor.readline()) not in (b'\r\n', b'\n', b''):
+                    nome, _, valor = cabecalho.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                manter = versao == 'HTTP/1.1' and cabecalhos.get('connection', '').lower() != 'close'
+                tamanho = int(cabecalhos.get('content-length', 0))
+
+                inicio = time.perf_counter()
+                self.pedidos += 1
+                if tamanho > self.limite_upload_bytes:
+                    status, tipo, dados = 413, 'application/json; charset=utf-8', _codificar({'erro': f"arquivo acima de {self.limite_upload_bytes // 1024 // 1024} MB"})
+                    manter = False
+                else:
+                    corpo = await leitor.readexactly(tamanho) if tamanho else b''
+                    try:
+                        status, tipo, dados = await self.rotear(metodo, alvo, corpo)
+                    except ErroHTTP as erro:
+                        status, tipo, dados = erro.status, 'application/json; charset=utf-8', _codificar({'erro': str(erro)})
+                    except Exception as erro:
+                        status, tipo, dados = 500, 'application/json; charset=utf-8', _codificar({'erro': f"{type(erro).__name__}: {erro}"})
+
+                escritor.write((f"HTTP/1.1 {status} {MOTIVOS_HTTP.get(status, '')}\r\nContent-Type: {tipo}\r\n"
+                                f"Content-Length: {len(dados)}\r\nConnection: {'keep-alive' if manter else 'close'}\r\n\r\n").encode('latin-1') + dados)
+                await escritor.drain()
+                if self.registrar_pedidos:
+                    print(f"{metodo} {alvo} {status} {(time.perf_counter() - inicio) * 1000:.1f}ms", file=sys.stderr, flush=True)
+                if not manter:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            escritor.close()
+
+def _inteiro(parametros, nome, padrao):
+    try:
+        valor = int(parametros.get(nome, padrao))
+    except ValueError:
+        raise ErroHTTP(400, f"{nome} deve ser um número inteiro") from None
+    if valor < 1:
+        raise ErroHTTP(400, f"{nome} deve ser pelo menos 1")
+    return valor
+
+
+async def servir(host="127.0.0.1", porta=PORTA_PADRAO, processos=None, limite_mb=LIMITE_MB_PADRAO, registrar_pedidos=True):
+    servidor_metricas = ServidorMetricas(processos, limite_mb, registrar_pedidos=registrar_pedidos)
+    servidor_metricas.aquecer()
+    servidor = await asyncio.start_server(servidor_metricas.atender, host, porta)
+    host_real, porta_real = servidor.sockets[0].getsockname()[:2]
+    print(f"Servindo em http://{host_real}:{porta_real}", flush=True)
+    # SIGTERM (ex.: `kill`, gerenciador de serviços) encerra como o Ctrl+C, passando pelo `finally`
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except (NotImplementedError, AttributeError):
+        pass  # Windows
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        servidor_metricas.encerrar()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m valdash.servidor", description="API HTTP local com as métricas em JSON e o relatório PDF.")
+    parser.add_argument("--host", default="127.0.0.1", help="endereço (padrão: 127.0.0.1, só a máquina local)")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO, help=f"porta (padrão: {PORTA_PADRAO}; 0 escolhe uma livre)")
+    parser.add_argument("--processos", "-j", type=int, default=None, help="processos de trabalho (padrão: número de núcleos)")
+    parser.add_argument("--cache-mb", type=float, default=LIMITE_MB_PADRAO, help=f"limite de memória do cache de resultados (padrão: {LIMITE_MB_PADRAO} MB)")
+    parser.add_argument("--silencioso", action="store_true", help="não registra cada pedido no stderr")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(servir(args.host, args.porta, args.processos, args.cache_mb, not args.silencioso))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Win rate por agente e por dupla de agentes, a partir das estatísticas de composição.
+
+Uma composição que difere de outra por um agente conta como outra amostra no nível de
+composição; por agente e por dupla as amostras se somam. As contagens saem de produtos de
+matrizes sobre a matriz one-hot composição x agente H, ponderada pelas partidas de cada
+composição (w): agentes = Hᵀw e duplas = Hᵀ diag(w) H. É o mesmo que montar a matriz
+partida x agente, mas com uma linha por composição distinta em vez de uma por partida.
+"""
+import numpy as np
+import pandas as pd
+
+COLUNAS_AGENTES = ['agente', 'partidas', 'vitorias', 'win_rate']
+COLUNAS_DUPLAS = ['agente_1', 'agente_2', 'partidas', 'vitorias', 'win_rate']
+
+
+def _taxa(vitorias, partidas):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(partidas > 0, vitorias / np.maximum(partidas, 1) * 100, np.nan)
+
+def matriz_agentes(composicoes):
+    """Matriz one-hot (composições x agentes) para textos 'A, B, C'. Retorna (matriz float, lista de agentes)."""
+    one_hot = pd.Series(composicoes, dtype=object).str.get_dummies(sep=", ")
+    return one_hot.to_numpy(dtype=np.float64), list(one_hot.columns)
+
+def sinergia_agentes(composicao_stats_df, tipo='Nossa'):
+    """Partidas, vitórias e win rate (em %) por agente e por dupla de agentes de um lado ('Nossa' ou 'Adversária').
+
+    `composicao_stats_df` é o composicao_stats das métricas (global ou de um mapa); a vitória é
+    sempre do lado que usou o agente, como em composicao_stats. Retorna um dict com 'agentes' e
+    'duplas' (DataFrames) e as matrizes agente x agente 'partidas' e 'vitorias' (na diagonal, o agente sozinho).
+    """
+    if composicao_stats_df is None or composicao_stats_df.empty:
+        vazio = pd.DataFrame(dtype=np.int64)
+        return {'agentes': pd.DataFrame(columns=COLUNAS_AGENTES), 'duplas': pd.DataFrame(columns=COLUNAS_DUPLAS),
+                'partidas': vazio, 'vitorias': vazio}
+    do_lado = composicao_stats_df[composicao_stats_df['tipo'] == tipo]
+    matriz, agentes = matriz_agentes(do_lado['composicao'].astype(str).to_numpy())
+    jogadas = do_lado['total_partidas_jogadas'].to_numpy(dtype=np.float64)
+    ganhas = do_lado['total_partidas_ganhas'].to_numpy(dtype=np.float64)
+
+    partidas_duplas = matriz.T @ (matriz * jogadas[:, None])
+    vitorias_duplas = matriz.T @ (matriz * ganhas[:, None])
+    partidas_agente = np.diag(partidas_duplas)
+    vitorias_agente = np.diag(vitorias_duplas)
+
+    tabela_agentes = pd.DataFrame({
+        'agente': agentes,
+        'partidas': partidas_agente.astype(np.int64),
+        'vitorias': vitorias_agente.astype(np.int64),
+        'win_rate': _taxa(vitorias_agente, partidas_agente),
+    }).sort_values(['win_rate', 'partidas'], ascending=False, kind='stable').reset_index(drop=True)
+
+    # Cada dupla uma vez (triângulo superior), só as que jogaram juntas
+    linhas, colunas = np.triu_indices(len(agentes), k=1)
+    juntas = partidas_duplas[linhas, colunas] > 0
+    linhas, colunas = linhas[juntas], colunas[juntas]
+    nomes = np.array(agentes, dtype=object)
+    tabela_duplas = pd.DataFrame({
+        'agente_1': nomes[linhas],
+        'agente_2': nomes[colunas],
+        'partidas': partidas_duplas[linhas, colunas].astype(np.int64),
+        'vitorias': vitorias_duplas[linhas, colunas].astype(np.int64),
+        'win_rate': _taxa(vitorias_duplas[linhas, colunas], partidas_duplas[linhas, colunas]),
+    }).sort_values(['win_rate', 'partidas'], ascending=False, kind='stable').reset_index(drop=True)
+
+    return {
+        'agentes': tabela_agentes,
+        'duplas': tabela_duplas,
+        'partidas': pd.DataFrame(partidas_duplas.astype(np.int64), index=agentes, columns=agentes),
+        'vitorias': pd.DataFrame(vitorias_duplas.astype(np.int64), index=agentes, columns=agentes),
+    }